@@ -135,6 +135,20 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by every worker process (api/profile_cache.py invalidates across workers, with plain
+# set/get_many calls, so no atomic incr is needed from the backend):
+# files under BASE_DIR/cache by default, or DJANGO_CACHE_BACKEND / DJANGO_CACHE_LOCATION
+# (e.g. django.core.cache.backends.redis.RedisCache / redis://127.0.0.1:6379) when several hosts serve the API.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
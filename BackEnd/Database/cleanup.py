@@ -1,63 +1,346 @@
+"""
+Cleanup job of the socials_mapping table: trims the TikTok usernames and clears the social
+URLs that are not profile URLs.
+
+The whole table is streamed by keyset pagination on tiktok_uid (no hand-edited .range()):
+    1. The key space [min uid, max uid] is split into one partition per worker, and the
+       partitions are paged in parallel (each page: uid > last key of the previous page)
+    2. Every row is checked with one precompiled pattern per column (clean_record)
+    3. Only the changed rows are written back, with ONE upsert per chunk
+    4. The last key written of every partition is checkpointed, an interrupted job resumes
+       from there (the checkpoint is removed once the whole table is done)
+With --dry-run nothing is written (nor checkpointed) and every change is reported as a
+JSON line {tiktok_uid, tiktok_username, changes: {column: {before, after}}}.
+
+Usage:
+    python cleanup.py --dry-run --report cleanup_report.jsonl
+    python cleanup.py --workers 4
+    python cleanup.py --demo   # benchmark against an in-memory stand-in of the Supabase client
+"""
+import argparse
+import json
+import os
 import re
 import sys
-import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TABLE = "socials_mapping"
+KEY_COLUMN = "tiktok_uid"
+
+PAGE_SIZE = 1000  # Rows per keyset page (PostgREST's default max-rows)
+UPSERT_CHUNK_SIZE = 500  # Changed rows per upsert round trip
+WORKERS = 4
+CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cleanup_checkpoint.json")
+
+# Valid profile URLs per column (any other value is cleared):
+#   https://www.instagram.com/<user>/ and https://www.instagram.com/<user>/?hl=en
+#   https://www.facebook.com/<user>/ and https://www.facebook.com/p/<user>/
+#   https://twitter.com/<user> or https://x.com/<user>, with or without ?lang=en
+URL_PATTERNS = {
+    "instagram_username": re.compile(r"^https://www\.instagram\.com/[^/]+/(?:\?hl=en)?$"),
+    "facebook_username": re.compile(r"^https://www\.facebook\.com/(?:p/)?[^/]+/$"),
+    "x_username": re.compile(r"^https://(?:twitter|x)\.com/[^/]+(?:\?lang=en)?$"),
+}
+
+
+def clean_record(record):
+    """
+    Cleaned values of a socials_mapping row.
+
+    Args:
+        record (dict): The row.
+
+    Returns:
+        dict: column -> cleaned value, only for the columns that change (empty if the row is clean).
+    """
+    changes = {}
+
+    username = record.get("tiktok_username")
+    if isinstance(username, str) and username != username.rstrip():
+        changes["tiktok_username"] = username.rstrip()
+
+    for column, pattern in URL_PATTERNS.items():
+        value = record.get(column)
+        if value and not (isinstance(value, str) and pattern.match(value)):
+            changes[column] = None
+    return changes
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def key_partitions(client, workers):
+    """
+    Split the key space of the table into `workers` ranges.
+
+    Returns:
+        list: {"after": exclusive low key, "high": inclusive high key, "done": False} per range
+            (empty when the table is).
+    """
+    lowest = client.table(TABLE).select(KEY_COLUMN).order(KEY_COLUMN).limit(1).execute().data
+    highest = client.table(TABLE).select(KEY_COLUMN).order(KEY_COLUMN, desc=True).limit(1).execute().data
+    if not lowest or not highest:
+        return []
+    low, high = lowest[0][KEY_COLUMN] - 1, highest[0][KEY_COLUMN]
+    workers = max(1, min(workers, high - low))
+    bounds = [low + (high - low) * index // workers for index in range(workers + 1)]
+    return [{"after": bounds[index], "high": bounds[index + 1], "done": False} for index in range(workers)]
+
+
+def load_checkpoint(path):
+    """The partitions of an interrupted job (None without a checkpoint)."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)["partitions"]
+
+
+def save_checkpoint(path, partitions):
+    # Written aside then renamed: an interrupted write never leaves a truncated checkpoint
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump({"partitions": partitions}, file)
+    os.replace(temporary_path, path)
+
+
+def clean_database(client, page_size=PAGE_SIZE, workers=WORKERS, checkpoint_path=CHECKPOINT_PATH,
+                   dry_run=False, report=None, chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    Clean the whole socials_mapping table.
+
+    Args:
+        client: Supabase client (SupaBaseClient.supabase or a stand-in).
+        page_size (int): Rows per keyset page.
+        workers (int): Partitions paged in parallel (only used when not resuming a checkpoint).
+        checkpoint_path (str): Checkpoint of the job (None: no checkpoint, no resume).
+        dry_run (bool): Report the changes without writing them.
+        report (file): Text file the changes are written to, as JSON lines (None: no report).
+        chunk_size (int): Changed rows per upsert round trip.
+
+    Returns:
+        dict: Counters "pages", "rows", "changed", "written", and "errors" (one message per
+            partition that stopped on an error, resume it by running the job again).
+    """
+    checkpoint_path = None if dry_run else checkpoint_path
+    partitions = load_checkpoint(checkpoint_path)
+    if partitions is None:
+        partitions = key_partitions(client, workers)
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, partitions)
+    stats = {"pages": 0, "rows": 0, "changed": 0, "written": 0, "errors": []}
+    lock = threading.Lock()  # Guards stats, partitions (and their checkpoint) and the report
+
+    def clean_partition(partition):
+        while not partition["done"]:
+            try:
+                rows = (client.table(TABLE).select("*")
+                        .gt(KEY_COLUMN, partition["after"]).lte(KEY_COLUMN, partition["high"])
+                        .order(KEY_COLUMN).limit(page_size).execute().data) or []
+
+                changed = []
+                for row in rows:
+                    changes = clean_record(row)
+                    if changes:
+                        changed.append((row, changes))
+                if not dry_run:
+                    for chunk in _chunks(changed, chunk_size):
+                        client.table(TABLE).upsert([dict(row, **changes) for row, changes in chunk],
+                                                   on_conflict=KEY_COLUMN).execute()
+            except Exception as e:
+                with lock:
+                    stats["errors"].append(f"Partition ({partition['after']}, {partition['high']}]: {str(e)}")
+                return
+
+            with lock:
+                stats["pages"] += 1
+                stats["rows"] += len(rows)
+                stats["changed"] += len(changed)
+                stats["written"] += 0 if dry_run else len(changed)
+                if report is not None:
+                    for row, changes in changed:
+                        report.write(json.dumps({
+                            KEY_COLUMN: row.get(KEY_COLUMN),
+                            "tiktok_username": row.get("tiktok_username"),
+                            "changes": {column: {"before": row.get(column), "after": value}
+                                        for column, value in changes.items()},
+                        }, ensure_ascii=False) + "\n")
+
+                if len(rows) < page_size:
+                    partition["done"] = True
+                else:
+                    partition["after"] = rows[-1][KEY_COLUMN]
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, partitions)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(partitions))) as executor:
+        list(executor.map(clean_partition, partitions))
+
+    if checkpoint_path and all(partition["done"] for partition in partitions) and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return stats
+
+
+def _demo():
+    # Against an in-memory stand-in of the Supabase client where every execute() costs
+    # one simulated network round trip: the former per-row upsert vs the job.
+    import random
+    import tempfile
+    import time
+
+    ROUND_TRIP = 0.005  # seconds
+
+    class FakeResponse:
+        def __init__(self, data):
+            self.data = data
+
+    class FakeQuery:
+        def __init__(self, client):
+            self.client = client
+            self.rows = client.rows
+            self.action = "select"
+            self.payload = None
+            self.filters = []
+            self.descending = False
+            self.limit_count = None
+
+        def select(self, *columns):
+            return self
+
+        def upsert(self, payload, on_conflict=None):
+            self.action, self.payload = "upsert", payload
+            return self
+
+        def gt(self, column, value):
+            self.filters.append(lambda row: row[column] > value)
+            return self
+
+        def lte(self, column, value):
+            self.filters.append(lambda row: row[column] <= value)
+            return self
+
+        def order(self, column, desc=False):
+            self.descending = desc
+            return self
+
+        def limit(self, count):
+            self.limit_count = count
+            return self
+
+        def range(self, start, end):
+            self.limit_count = (start, end)
+            return self
 
-# Add the parent directory to the system path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+        def execute(self):
+            time.sleep(ROUND_TRIP)
+            if self.action == "upsert":
+                if self.client.down:
+                    raise ConnectionError("Server disconnected")
+                for item in self.payload:
+                    self.rows[item[KEY_COLUMN]] = dict(item)
+                return FakeResponse(self.payload)
+            matched = [dict(self.rows[key]) for key in sorted(self.rows, reverse=self.descending)
+                       if all(check(self.rows[key]) for check in self.filters)]
+            if isinstance(self.limit_count, tuple):
+                return FakeResponse(matched[self.limit_count[0]:self.limit_count[1] + 1])
+            return FakeResponse(matched[:self.limit_count])
 
-from SupaBaseClient import supabase
+    class FakeClient:
+        def __init__(self, rows):
+            self.rows = {row[KEY_COLUMN]: dict(row) for row in rows}
+            self.down = False  # Every write fails
 
-def clean_database():
-    response = supabase.table("socials_mapping").select("*").range(3600,3771).execute()
+        def table(self, name):
+            return FakeQuery(self)
 
-    '''
-    if response.status_code != 200:
-        print("Can't load the db")
-        return
-    '''
+    random.seed(0)
+    rows = []
+    for uid in range(1, 5001):
+        rows.append({
+            KEY_COLUMN: uid,
+            "tiktok_username": f"creator_{uid}" + ("  " if random.random() < 0.05 else ""),
+            "instagram_username": random.choice([f"https://www.instagram.com/creator_{uid}/", None,
+                                                 f"https://www.instagram.com/creator_{uid}/?hl=en",
+                                                 f"https://www.instagram.com/p/{uid}/reel/"]),
+            "facebook_username": random.choice([f"https://www.facebook.com/creator_{uid}/", None,
+                                                f"https://www.facebook.com/p/creator_{uid}/"]),
+            "x_username": random.choice([f"https://x.com/creator_{uid}", f"https://twitter.com/creator_{uid}?lang=en",
+                                         None, "https://x.com/search?q=creator"]),
+        })
 
-    records = response.data
+    # Former clean_database pattern: one .range() page, one upsert per row
+    client = FakeClient(rows)
+    start = time.perf_counter()
+    page = client.table(TABLE).select("*").range(0, 999).execute().data
+    for record in page:
+        record.update(clean_record(record))
+        client.table(TABLE).upsert([record]).execute()
+    single = time.perf_counter() - start
 
-    # Regex for URLs
-    insta_pattern = r"^https://www\.instagram\.com/[^/]+/$"
-    insta_pattern_with_lang = r"^https://www\.instagram\.com/[^/]+/\?hl=en$"
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint_path = os.path.join(directory, "checkpoint.json")
 
-    fb_pattern = r"^https://www\.facebook\.com/[^/]+/$"
-    fb_pattern_with_p =  r"^https://www\.facebook\.com/p/[^/]+/$"
+        client = FakeClient(rows)
+        with open(os.devnull, "w") as report:
+            stats = clean_database(client, dry_run=True, report=report)
+        assert stats["written"] == 0 and client.rows == FakeClient(rows).rows
 
-    twitter_pattern = r"^https://twitter\.com/[^/]+$"
-    twitter_pattern_with_lang = r"^https://twitter\.com/[^/]+\?lang=en$"
-    x_pattern = r"^https://x\.com/[^/]+$"
-    x_pattern_with_lang = r"^https://x\.com/[^/]+\?lang=en$"
+        # Interrupted run (every upsert fails): nothing is lost, the next run resumes
+        client = FakeClient(rows)
+        client.down = True
+        stats = clean_database(client, page_size=500, checkpoint_path=checkpoint_path)
+        client.down = False
+        assert len(stats["errors"]) == WORKERS and os.path.exists(checkpoint_path)
 
-    for record in records:
+        start = time.perf_counter()
+        stats = clean_database(client, page_size=500, checkpoint_path=checkpoint_path)
+        bulk = time.perf_counter() - start
+        assert not stats["errors"] and not os.path.exists(checkpoint_path)
+        assert stats["rows"] == len(rows) and not any(clean_record(row) for row in client.rows.values())
 
-        if record.get('tiktok_username')[-2:] == '  ':
-            record['tiktok_username'] = record.get('tiktok_username')[:-2]
+    print(f"per-row upsert: {len(page) / single:,.0f} rows/s")
+    print(f"clean_database: {stats['rows'] / bulk:,.0f} rows/s ({(stats['rows'] / bulk) / (len(page) / single):.0f}x), "
+          f"{stats['changed']} of {stats['rows']} rows changed, {stats['pages']} pages")
 
-        instagram_username = record.get('instagram_username')
-        if instagram_username:
-            if re.match(insta_pattern, instagram_username) or re.match(insta_pattern_with_lang, instagram_username):
-                pass
-            else:
-                record['instagram_username'] = None
 
-        facebook_username = record.get('facebook_username')
-        if facebook_username:
-            if re.match(fb_pattern, facebook_username) or re.match(fb_pattern_with_p, facebook_username):
-                pass
-            else:
-                record['facebook_username'] = None
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the socials_mapping table.")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them.")
+    parser.add_argument("--report", help="Write the changes to this file (JSON lines, '-' for stdout).")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Partitions of the table paged in parallel.")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Rows per keyset page.")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Checkpoint file of the job.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted job.")
+    parser.add_argument("--demo", action="store_true", help="Benchmark against an in-memory stand-in client.")
+    args = parser.parse_args()
 
-        x_username = record.get('x_username')
-        if x_username:
-            if re.match(twitter_pattern, x_username) or re.match(twitter_pattern_with_lang, x_username) or re.match(x_pattern, x_username) or re.match(x_pattern_with_lang, x_username):
-                pass
-            else:
-                record['x_username'] = None
+    if args.demo:
+        _demo()
+        sys.exit(0)
 
-        # Insert cleaned data into table
-        supabase.table("socials_mapping").upsert([record]).execute()
+    # Add the parent directory to the system path
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from SupaBaseClient import supabase
 
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    report = None
+    if args.report == "-":
+        report = sys.stdout
+    elif args.report:
+        report = open(args.report, "w", encoding="utf-8")
+    try:
+        stats = clean_database(supabase, page_size=args.page_size, workers=args.workers,
+                               checkpoint_path=args.checkpoint, dry_run=args.dry_run, report=report)
+    finally:
+        if report is not None and report is not sys.stdout:
+            report.close()
 
-clean_database()
+    print(f"{stats['rows']} rows in {stats['pages']} pages, {stats['changed']} to clean, {stats['written']} written")
+    for error in stats["errors"]:
+        print(f"ERROR {error}")
+    if stats["errors"]:
+        print(f"Run again to resume from {args.checkpoint}")
+    sys.exit(1 if stats["errors"] else 0)
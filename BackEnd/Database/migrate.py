@@ -0,0 +1,89 @@
+"""
+Applies the SQL migrations of the Supabase database (migrations/*.sql, in name order).
+
+Each file runs in its own transaction and is recorded in the schema_migrations table, a file
+already recorded there is skipped: run it after every pull that adds a migration.
+
+Usage:
+    python migrate.py                      # DATABASE_URL = the Supabase Postgres connection string
+    python migrate.py --dsn postgresql://... --list
+"""
+import argparse
+import os
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name text PRIMARY KEY,
+    applied_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+
+def migration_files(directory=MIGRATIONS_DIR):
+    """Names of the migration files, in the order they are applied."""
+    return sorted(name for name in os.listdir(directory) if name.endswith(".sql"))
+
+
+def applied_migrations(connection):
+    with connection, connection.cursor() as cursor:
+        cursor.execute(MIGRATIONS_TABLE_SQL)
+        cursor.execute("SELECT name FROM schema_migrations")
+        return {name for (name,) in cursor.fetchall()}
+
+
+def apply_migrations(connection, directory=MIGRATIONS_DIR):
+    """
+    Apply the migrations not recorded yet.
+
+    Returns:
+        list: Names of the migrations applied by this call.
+    """
+    applied = applied_migrations(connection)
+    newly_applied = []
+    for name in migration_files(directory):
+        if name in applied:
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as file:
+            sql = file.read()
+        # One transaction per file: a failing migration leaves nothing half applied
+        with connection, connection.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+        newly_applied.append(name)
+    return newly_applied
+
+
+def connect(dsn=None):
+    """psycopg2 connection to `dsn` (default: the DATABASE_URL environment variable)."""
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+    dsn = dsn or os.getenv('DATABASE_URL')
+    if not dsn:
+        raise ValueError("No database DSN, pass --dsn or set DATABASE_URL.")
+    return psycopg2.connect(dsn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the SQL migrations of the Supabase database.")
+    parser.add_argument("--dsn", help="PostgreSQL connection string (default: DATABASE_URL).")
+    parser.add_argument("--list", action="store_true", help="Only list the migrations and whether they are applied.")
+    args = parser.parse_args()
+
+    connection = connect(args.dsn)
+    try:
+        if args.list:
+            applied = applied_migrations(connection)
+            for name in migration_files():
+                print(f"{'applied' if name in applied else 'pending'}  {name}")
+        else:
+            names = apply_migrations(connection)
+            for name in names:
+                print(f"applied  {name}")
+            if not names:
+                print("Nothing to apply")
+    finally:
+        connection.close()
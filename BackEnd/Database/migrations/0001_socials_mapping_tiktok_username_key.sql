@@ -0,0 +1,44 @@
+-- Unique tiktok_username on socials_mapping: the batched creator writes
+-- (api/creator_ingest.py, Database/queries.py) upsert with on_conflict = tiktok_username,
+-- which PostgREST only accepts with a unique index on that column.
+--
+-- Rows sharing the exact same username are merged first: the oldest row (lowest tiktok_uid)
+-- is kept, its empty social columns are filled from the newest duplicate that has them, and
+-- the user profiles linked to a duplicate are linked to the kept row.
+
+CREATE TEMP TABLE socials_mapping_duplicates ON COMMIT DROP AS
+SELECT tiktok_uid, kept_uid
+FROM (
+    SELECT tiktok_uid, min(tiktok_uid) OVER (PARTITION BY tiktok_username) AS kept_uid
+    FROM socials_mapping
+    WHERE tiktok_username IS NOT NULL
+) ranked
+WHERE tiktok_uid <> kept_uid;
+
+UPDATE socials_mapping AS kept
+SET profile_picture_url = COALESCE(NULLIF(kept.profile_picture_url, ''), merged.profile_picture_url),
+    instagram_username = COALESCE(NULLIF(kept.instagram_username, ''), merged.instagram_username),
+    x_username = COALESCE(NULLIF(kept.x_username, ''), merged.x_username),
+    facebook_username = COALESCE(NULLIF(kept.facebook_username, ''), merged.facebook_username)
+FROM (
+    SELECT duplicates.kept_uid,
+           (array_agg(duplicate.profile_picture_url ORDER BY duplicate.tiktok_uid DESC) FILTER (WHERE duplicate.profile_picture_url <> ''))[1] AS profile_picture_url,
+           (array_agg(duplicate.instagram_username ORDER BY duplicate.tiktok_uid DESC) FILTER (WHERE duplicate.instagram_username <> ''))[1] AS instagram_username,
+           (array_agg(duplicate.x_username ORDER BY duplicate.tiktok_uid DESC) FILTER (WHERE duplicate.x_username <> ''))[1] AS x_username,
+           (array_agg(duplicate.facebook_username ORDER BY duplicate.tiktok_uid DESC) FILTER (WHERE duplicate.facebook_username <> ''))[1] AS facebook_username
+    FROM socials_mapping_duplicates AS duplicates
+    JOIN socials_mapping AS duplicate ON duplicate.tiktok_uid = duplicates.tiktok_uid
+    GROUP BY duplicates.kept_uid
+) AS merged
+WHERE kept.tiktok_uid = merged.kept_uid;
+
+UPDATE user_profile
+SET reference_creator = duplicates.kept_uid
+FROM socials_mapping_duplicates AS duplicates
+WHERE user_profile.reference_creator = duplicates.tiktok_uid;
+
+DELETE FROM socials_mapping
+USING socials_mapping_duplicates AS duplicates
+WHERE socials_mapping.tiktok_uid = duplicates.tiktok_uid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS socials_mapping_tiktok_username_key ON socials_mapping (tiktok_username);
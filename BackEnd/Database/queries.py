@@ -1,89 +1,342 @@
-import requests
+"""
+Enrichment of the socials_mapping table with the Instagram / Twitter / Facebook links of the
+Top2000_USA.csv creators, found with the Google Custom Search API (first result of
+"<username> Instagram account", ...).
+
+The creators used to be taken from a hand-edited slice of the CSV, with a select and three
+sequential searches per creator and one insert each. enrich_creators instead:
+    1. Skips the creators already in the table, fetched with ONE select per chunk of usernames
+    2. Runs the searches of a batch of creators concurrently, under a rate limiter (the API
+       quota is per second and per day), through one keep-alive session
+    3. Caches every answered search on disk (SearchCache): a re-run does not spend quota on
+       the queries it already made
+    4. Writes each batch with ONE upsert (on_conflict = tiktok_username, existing rows kept,
+       needs the unique index of migrations/0001_socials_mapping_tiktok_username_key.sql)
+    5. Checkpoints the position in the CSV after each batch, and the creators whose searches
+       failed; the next run retries those, then resumes where the last one stopped
+
+Usage:
+    python queries.py --limit 100   # enrich the next 100 creators of the CSV
+"""
+import argparse
 import csv
-from dotenv import load_dotenv
-import sys
+import json
 import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Add the parent directory to the system path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
-from SupaBaseClient import supabase
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-load_dotenv('../.env')
+load_dotenv(os.path.join(BASE_DIR, '..', '.env'))
 
 # Google Custom Search API key + Search Engine Id
 api_key = os.getenv('GOOGLE_SEARCH_KEY')
 cse_id = os.getenv('SEARCH_ENGINE_KEY')
 
+SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+SEARCH_TIMEOUT = (5, 15)  # connect / read seconds
+SEARCH_RATE = 5  # searches per second
+SEARCH_WORKERS = 8  # searches in flight
+SEARCH_CACHE_PATH = os.path.join(BASE_DIR, ".search_cache.sqlite3")
+SEARCH_CACHE_TTL = 30 * 24 * 3600  # seconds
+NO_RESULTS = "No results found."
+
+CSV_FILE_PATH = os.path.join(BASE_DIR, "Top2000_USA.csv")
+CHECKPOINT_PATH = os.path.join(BASE_DIR, ".enrich_checkpoint.json")
+BATCH_SIZE = 50  # Creators per upsert (and per checkpoint)
+LOOKUP_CHUNK_SIZE = 500  # Usernames per existence select (keeps the PostgREST URL small)
+
+# socials_mapping column -> search query of a TikTok username
+SOCIAL_QUERIES = {
+    "instagram_username": "{} Instagram account",
+    "x_username": "{} Twitter account",
+    "facebook_username": "{} Facebook account",
+}
+
+
 def get_subscribers_list_from_csv(csv_file_path):
     with open(csv_file_path, mode='r', encoding='utf-8') as file:
         reader = csv.DictReader(file)
-        
-        # Extract and return the Subscribers Count as a list
+
+        # Extract and return the usernames (without the @) as a list
         return [row["Username"][1:] for row in reader]
 
 
-def google_search(query):
-    url = f"https://www.googleapis.com/customsearch/v1"
-    params = {
-        'q': query,
-        'key': api_key,
-        'cx': cse_id,
-        'num': 1,  # First result of search
-    }
-    
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
+class RateLimiter:
+    """
+    At most `rate` acquisitions per second, spaced evenly, across threads.
+
+    Args:
+        rate (float): Acquisitions per second.
+        clock (callable): Time source (seconds), injectable for tests.
+        sleep (callable): Injectable for tests.
+    """
+
+    def __init__(self, rate=SEARCH_RATE, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # Each caller books the next free slot, then waits for it outside the lock
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+class SearchCache:
+    """
+    SQLite-backed cache of the answered searches (query -> first link, or NO_RESULTS).
+
+    Args:
+        path (str): SQLite file (':memory:' for a throwaway cache).
+        ttl (float): Seconds an answer is reused.
+        clock (callable): Time source (seconds), injectable for tests.
+    """
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS searches (query TEXT PRIMARY KEY, result TEXT NOT NULL, stored_at REAL)"
+        )
+        self._connection.commit()
+
+    def get(self, query):
+        """The cached answer of query, or None when missing or expired."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result, stored_at FROM searches WHERE query = ?", (query,)
+            ).fetchone()
+        if row is None or self.clock() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def put(self, query, result):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO searches (query, result, stored_at) VALUES (?, ?, ?)",
+                (query, result, self.clock())
+            )
+            self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+
+class GoogleSearch:
+    """
+    First result link of Google Custom Search queries, rate limited and cached.
+
+    Args:
+        key (str): API key (GOOGLE_SEARCH_KEY).
+        engine (str): Search engine id (SEARCH_ENGINE_KEY).
+        url (str): API endpoint (a local stand-in in tests).
+        limiter (RateLimiter): Shared by the searches (None: unlimited).
+        cache (SearchCache): Answered searches (None: no cache).
+        session (requests.Session): Injectable (default: a keep-alive session).
+    """
+
+    def __init__(self, key=None, engine=None, url=SEARCH_URL, limiter=None, cache=None, session=None,
+                 timeout=SEARCH_TIMEOUT):
+        self.key = key
+        self.engine = engine
+        self.url = url
+        self.limiter = limiter
+        self.cache = cache
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SEARCH_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.requests = 0  # API calls made (cache misses)
+        self._lock = threading.Lock()
+
+    def search(self, query):
+        """
+        The link of the first result of query, NO_RESULTS, or "Error: <status> - <body>"
+        (errors are not cached).
+        """
+        if self.cache is not None:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return cached
+
+        if self.limiter is not None:
+            self.limiter.acquire()
+        params = {
+            'q': query,
+            'key': self.key,
+            'cx': self.engine,
+            'num': 1,  # First result of search
+        }
+        with self._lock:
+            self.requests += 1
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            return f"Error: {str(e)}"
+        if response.status_code != 200:
+            return f"Error: {response.status_code} - {response.text}"
+
         results = response.json().get('items', [])
-        if results:
-            first_result = results[0]
-            return first_result.get('link')
-        else:
-            return "No results found."
-    else:
-        return f"Error: {response.status_code} - {response.text}"
-    
-
-csv_file_path = './Top2000_USA.csv'
-subscribers_list = get_subscribers_list_from_csv(csv_file_path)
-
-current_list = subscribers_list[933:966] # PROGRESSIVELY CHANGE !!!!!!!!! 468 is missing, midastouchart, mar.milne!!!!
-print(current_list)
-
-for tiktok_username in current_list:
-
-    existing_record = supabase.table("socials_mapping").select("*").eq("tiktok_username", tiktok_username).execute()
-        
-    # CHeck if the record already exists
-    if existing_record.data:
-        print(f"Instance with tiktok username '{tiktok_username}' already exists.")
-        continue
-
-    insta_query = f"{tiktok_username} Instagram account"
-    insta_link = google_search(insta_query)
-    print(f"Instagram of {tiktok_username}\nLink: {insta_link}")
-
-    twitter_query = f"{tiktok_username} Twitter account"
-    twitter_link = google_search(twitter_query)
-    print(f"Twitter of {tiktok_username}\nLink: {twitter_link}")
-
-    facebook_query = f"{tiktok_username} Facebook account"
-    facebook_link = google_search(facebook_query)
-    print(f"Facebook of {tiktok_username}\nLink: {facebook_link}")
-
-    # Insert a new record
-    try:
-        response = supabase.table("socials_mapping").insert({
-        "tiktok_username": tiktok_username,
-        "instagram_username": insta_link,
-        "x_username": twitter_link,
-        "facebook_username": facebook_link
-    }).execute()
-    
-    except Exception as e:
-        print(response({"error": e}, status=500))
-
-    if not response or not response.data:
-        print(response({"error": f"Invalid Insertion in database for {tiktok_username} ."}, status=404))
+        result = results[0].get('link') if results else NO_RESULTS
+        if self.cache is not None:
+            self.cache.put(query, result)
+        return result
+
+    def close(self):
+        self.session.close()
+
+
+def google_search(query):
+    """First result link of query with the .env credentials (uncached, unlimited)."""
+    return GoogleSearch(api_key, cse_id).search(query)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_usernames(client, usernames, chunk_size=LOOKUP_CHUNK_SIZE):
+    """The usernames already in socials_mapping (one select per chunk)."""
+    existing = set()
+    for chunk in _chunks(list(usernames), chunk_size):
+        response = client.table("socials_mapping").select("tiktok_username").in_("tiktok_username", chunk).execute()
+        existing.update(row.get("tiktok_username") for row in (response.data or []))
+    return existing
+
+
+def load_checkpoint(path):
+    """{"position": next CSV index, "failed": usernames to retry} of the previous runs."""
+    if not path or not os.path.exists(path):
+        return {"position": 0, "failed": []}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_checkpoint(path, checkpoint):
+    # Written aside then renamed: an interrupted write never leaves a truncated checkpoint
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary_path, path)
+
+
+def enrich_creators(client, searcher, usernames, checkpoint_path=CHECKPOINT_PATH, limit=None,
+                    batch_size=BATCH_SIZE, workers=SEARCH_WORKERS):
+    """
+    Insert the creators of `usernames` missing from socials_mapping, with their searched links.
+
+    Args:
+        client: Supabase client (SupaBaseClient.supabase or a stand-in).
+        searcher (GoogleSearch): Runs the searches.
+        usernames (list): TikTok usernames, in CSV order (the checkpoint position indexes it).
+        checkpoint_path (str): Checkpoint of the job (None: start at the top, no checkpoint).
+        limit (int): Creators taken this run, retried ones included (None: all the remaining ones).
+        batch_size (int): Creators per upsert and checkpoint.
+        workers (int): Searches in flight.
+
+    Returns:
+        dict: Counters "inserted", "existing", "failed" (usernames whose searches failed, retried
+            on the next run) and "searches" (API calls made).
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    start_position, retried = checkpoint["position"], checkpoint["failed"]
+    pending = retried + usernames[start_position:]
+    if limit is not None:
+        pending = pending[:limit]
+
+    existing = existing_usernames(client, pending)
+    stats = {"inserted": 0, "existing": 0, "failed": [], "searches": 0}
+    searches_before = searcher.requests
+    seen = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch_start in range(0, len(pending), batch_size):
+            batch = []
+            for username in pending[batch_start:batch_start + batch_size]:
+                if username in existing:
+                    stats["existing"] += 1
+                elif username not in seen:
+                    seen.add(username)
+                    batch.append(username)
+
+            # Every search of the batch in flight at once (bounded by workers and the rate limiter)
+            futures = {
+                (username, column): executor.submit(searcher.search, query.format(username))
+                for username in batch for column, query in SOCIAL_QUERIES.items()
+            }
+            rows = []
+            for username in batch:
+                links = {column: futures[(username, column)].result() for column in SOCIAL_QUERIES}
+                errors = [link for link in links.values() if link.startswith("Error:")]
+                if errors:
+                    print(f"Search failed for {username}: {errors[0]}")
+                    stats["failed"].append(username)
+                    continue
+                rows.append(dict(links, tiktok_username=username))
+
+            if rows:
+                # Existing rows are kept: a batch written before a crash can be written again
+                client.table("socials_mapping").upsert(rows, on_conflict="tiktok_username",
+                                                       ignore_duplicates=True).execute()
+            stats["inserted"] += len(rows)
+
+            # Done up to the end of the batch: the retried creators first, then the CSV ones
+            done = min(batch_start + batch_size, len(pending))
+            checkpoint = {
+                "position": start_position + max(0, done - len(retried)),
+                "failed": retried[done:] + stats["failed"],
+            }
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, checkpoint)
+
+    stats["searches"] = searcher.requests - searches_before
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrich socials_mapping with the social links of the CSV creators.")
+    parser.add_argument("--csv", default=CSV_FILE_PATH, help="Creators CSV (Ranking,Username).")
+    parser.add_argument("--limit", type=int, help="Creators taken this run (the search quota is daily).")
+    parser.add_argument("--rate", type=float, default=SEARCH_RATE, help="Searches per second.")
+    parser.add_argument("--workers", type=int, default=SEARCH_WORKERS, help="Searches in flight.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Creators per upsert and checkpoint.")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Checkpoint file of the job.")
+    parser.add_argument("--restart", action="store_true", help="Start again from the top of the CSV.")
+    args = parser.parse_args()
+
+    # Add the parent directory to the system path
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from SupaBaseClient import supabase
 
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    searcher = GoogleSearch(api_key, cse_id, limiter=RateLimiter(args.rate), cache=SearchCache())
+    stats = enrich_creators(supabase, searcher, get_subscribers_list_from_csv(args.csv), args.checkpoint,
+                            limit=args.limit, batch_size=args.batch_size, workers=args.workers)
+    searcher.close()
 
+    checkpoint = load_checkpoint(args.checkpoint)
+    print(f"{stats['inserted']} creators inserted, {stats['existing']} already there, {stats['searches']} searches")
+    for username in stats["failed"]:
+        print(f"FAILED {username} (retried on the next run)")
+    print(f"Next run starts at CSV row {checkpoint['position']} ({args.checkpoint})")
@@ -0,0 +1,284 @@
+"""
+Tests of the creator enrichment job (queries.py) against local stand-ins of the Google Custom
+Search API (an HTTP server) and of the Supabase client (in memory).
+
+    python -m unittest test_queries   (from Database/)
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from queries import (
+    NO_RESULTS, SOCIAL_QUERIES, GoogleSearch, RateLimiter, SearchCache, enrich_creators, load_checkpoint
+)
+
+USERNAMES = [f"creator_{index}" for index in range(1, 31)]
+LINKS = {
+    "Instagram": "https://www.instagram.com/{}/",
+    "Twitter": "https://x.com/{}",
+    "Facebook": "https://www.facebook.com/{}/",
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class SearchStandIn(BaseHTTPRequestHandler):
+    """
+    Answers "<username> <Platform> account" with the platform profile URL (no result for
+    usernames ending in 0); the queries in server.flaky fail once with a 503.
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        with server.lock:
+            server.queries.append(query)
+            fail = query in server.flaky
+            server.flaky.discard(query)
+        username, platform = query.split(" ")[:2]
+        items = [] if username.endswith("0") else [{"link": LINKS[platform].format(username)}]
+        answer = json.dumps({"items": items}).encode()
+        self.send_response(503 if fail else 200)
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.action = "select"
+        self.payload = None
+        self.filters = []
+        self.ignore_duplicates = False
+
+    def select(self, *columns):
+        return self
+
+    def upsert(self, payload, on_conflict=None, ignore_duplicates=False):
+        self.action, self.payload, self.ignore_duplicates = "upsert", payload, ignore_duplicates
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, list(values)))
+        return self
+
+    def execute(self):
+        self.client.calls.append(self.action)
+        if self.action == "select":
+            return FakeResponse([dict(row) for row in self.client.rows.values()
+                                 if all(row.get(column) in values for column, values in self.filters)])
+        if self.client.down:
+            raise ConnectionError("Server disconnected")
+        for item in self.payload:
+            if item["tiktok_username"] in self.client.rows and self.ignore_duplicates:
+                continue
+            self.client.rows[item["tiktok_username"]] = dict(item)
+        return FakeResponse(self.payload)
+
+
+class FakeClient:
+    def __init__(self, usernames=()):
+        self.rows = {username: {"tiktok_username": username} for username in usernames}
+        self.calls = []
+        self.down = False  # Every write fails
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_spaces_acquisitions(self):
+        clock, sleeps = FakeClock(), []
+        limiter = RateLimiter(rate=2, clock=clock, sleep=sleeps.append)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(sleeps, [0.5, 1.0])
+
+    def test_idle_time_is_not_banked(self):
+        clock, sleeps = FakeClock(), []
+        limiter = RateLimiter(rate=2, clock=clock, sleep=sleeps.append)
+        limiter.acquire()
+        clock.now += 10
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual(sleeps, [0.5])
+
+    def test_bounds_concurrent_callers(self):
+        limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+        threads = [threading.Thread(target=limiter.acquire) for _ in range(11)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+
+class SearchCacheTests(unittest.TestCase):
+    def test_answers_expire_after_the_ttl(self):
+        clock = FakeClock()
+        cache = SearchCache(":memory:", ttl=60, clock=clock)
+        cache.put("a Instagram account", "https://www.instagram.com/a/")
+        self.assertEqual(cache.get("a Instagram account"), "https://www.instagram.com/a/")
+        clock.now += 61
+        self.assertIsNone(cache.get("a Instagram account"))
+        self.assertIsNone(cache.get("b Instagram account"))
+
+    def test_answers_persist_on_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "searches.sqlite3")
+            cache = SearchCache(path)
+            cache.put("a Twitter account", NO_RESULTS)
+            cache.close()
+            cache = SearchCache(path)
+            self.assertEqual(cache.get("a Twitter account"), NO_RESULTS)
+            cache.close()
+
+
+class StandInTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SearchStandIn)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/customsearch/v1"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.queries = []
+        self.server.flaky = set()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SearchCache(os.path.join(self.directory.name, "searches.sqlite3"))
+        self.searcher = GoogleSearch(url=self.url, limiter=RateLimiter(500), cache=self.cache)
+
+    def tearDown(self):
+        self.searcher.close()
+        self.cache.close()
+        self.directory.cleanup()
+
+
+class GoogleSearchTests(StandInTestCase):
+    def test_first_result_link(self):
+        self.assertEqual(self.searcher.search("creator_1 Instagram account"), "https://www.instagram.com/creator_1/")
+        self.assertEqual(self.searcher.search("creator_10 Instagram account"), NO_RESULTS)
+
+    def test_answers_are_cached(self):
+        self.searcher.search("creator_1 Twitter account")
+        self.searcher.search("creator_10 Twitter account")
+        self.searcher.search("creator_1 Twitter account")
+        self.searcher.search("creator_10 Twitter account")
+        self.assertEqual(len(self.server.queries), 2)
+        self.assertEqual(self.searcher.requests, 2)
+
+    def test_errors_are_not_cached(self):
+        self.server.flaky = {"creator_1 Facebook account"}
+        self.assertTrue(self.searcher.search("creator_1 Facebook account").startswith("Error: 503"))
+        self.assertEqual(self.searcher.search("creator_1 Facebook account"), "https://www.facebook.com/creator_1/")
+        self.assertEqual(len(self.server.queries), 2)
+
+
+class EnrichCreatorsTests(StandInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.checkpoint_path = os.path.join(self.directory.name, "checkpoint.json")
+        self.client = FakeClient(USERNAMES[::5])  # creator_1, creator_6, ... already there
+
+    def enrich(self, **options):
+        return enrich_creators(self.client, self.searcher, USERNAMES, self.checkpoint_path, **options)
+
+    def test_inserts_the_missing_creators_in_batches(self):
+        stats = self.enrich(batch_size=10)
+        self.assertEqual((stats["inserted"], stats["existing"], stats["failed"]), (24, 6, []))
+        self.assertEqual(stats["searches"], 24 * len(SOCIAL_QUERIES))
+        self.assertEqual(set(self.client.rows), set(USERNAMES))
+        self.assertEqual(self.client.rows["creator_2"], {
+            "tiktok_username": "creator_2",
+            "instagram_username": "https://www.instagram.com/creator_2/",
+            "x_username": "https://x.com/creator_2",
+            "facebook_username": "https://www.facebook.com/creator_2/",
+        })
+        self.assertEqual(self.client.rows["creator_20"]["x_username"], NO_RESULTS)
+        # One existence select, one upsert per batch
+        self.assertEqual(self.client.calls, ["select"] + ["upsert"] * 3)
+        self.assertEqual(load_checkpoint(self.checkpoint_path), {"position": 30, "failed": []})
+
+    def test_existing_creators_are_not_searched(self):
+        self.enrich()
+        searched = {query.split(" ")[0] for query in self.server.queries}
+        self.assertFalse(searched & set(USERNAMES[::5]))
+
+    def test_limit_then_resume(self):
+        stats = self.enrich(limit=12, batch_size=5)
+        self.assertEqual(stats["inserted"] + stats["existing"], 12)
+        self.assertEqual(load_checkpoint(self.checkpoint_path), {"position": 12, "failed": []})
+        self.assertNotIn("creator_13", self.client.rows)
+
+        stats = self.enrich(batch_size=5)
+        self.assertEqual(stats["inserted"] + stats["existing"], 18)
+        self.assertEqual(load_checkpoint(self.checkpoint_path), {"position": 30, "failed": []})
+        self.assertEqual(set(self.client.rows), set(USERNAMES))
+
+        # Nothing left to do
+        self.assertEqual(self.enrich()["searches"], 0)
+
+    def test_failed_searches_are_retried_on_the_next_run(self):
+        self.server.flaky = {"creator_3 Twitter account", "creator_17 Facebook account"}
+        stats = self.enrich(batch_size=10)
+        self.assertEqual(stats["failed"], ["creator_3", "creator_17"])
+        self.assertNotIn("creator_3", self.client.rows)
+        self.assertEqual(load_checkpoint(self.checkpoint_path), {"position": 30, "failed": ["creator_3", "creator_17"]})
+
+        self.server.queries = []
+        stats = self.enrich(batch_size=10)
+        self.assertEqual((stats["inserted"], stats["failed"]), (2, []))
+        # Only the failed searches are made again, the answered ones come from the cache
+        self.assertEqual(sorted(self.server.queries), ["creator_17 Facebook account", "creator_3 Twitter account"])
+        self.assertEqual(self.client.rows["creator_3"]["x_username"], "https://x.com/creator_3")
+        self.assertEqual(load_checkpoint(self.checkpoint_path), {"position": 30, "failed": []})
+
+    def test_interrupted_run_resumes_from_the_last_written_batch(self):
+        self.client.down = True
+        with self.assertRaises(ConnectionError):
+            self.enrich(batch_size=10)
+        self.assertEqual(load_checkpoint(self.checkpoint_path), {"position": 0, "failed": []})
+
+        self.client.down = False
+        self.server.queries = []
+        stats = self.enrich(batch_size=10)
+        self.assertEqual(stats["inserted"], 24)
+        # The 8 creators of the batch that failed to write come from the search cache
+        self.assertEqual(stats["searches"], 16 * len(SOCIAL_QUERIES))
+        self.assertEqual(len(self.server.queries), 16 * len(SOCIAL_QUERIES))
+        self.assertEqual(set(self.client.rows), set(USERNAMES))
+
+
+if __name__ == "__main__":
+    unittest.main()
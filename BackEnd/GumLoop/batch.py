@@ -0,0 +1,282 @@
+"""
+Batch mode of the GumLoop metadata nodes (views.py / enhanced_views.py), for backfills.
+
+Calling main() once per file re-runs its imports and setup for every video. Here the files
+of a directory, a glob or a manifest are split into chunks, the chunks are processed by a
+pool of worker processes (the extractor is loaded once per worker), and the rows are
+streamed to an output file as chunks complete. Every JSON document of a file gets its row
+(dumps often hold several), files over STREAM_FILE_BYTES are streamed document by document.
+Files / documents that fail are written to a separate error log (one JSON line each)
+instead of only being printed.
+
+Usage:
+    python batch.py scraped_vids/ rows.jsonl
+    python batch.py "crawl/**/*.txt" rows.csv --workers 8 --chunk-size 200
+    python batch.py --manifest files.txt rows.jsonl --extractor enhanced
+    python batch.py crawl/ videos.copy        (typed records for bulk_loader.py)
+"""
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Workers import the engine by name
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metadata_engine import (
+    ROW_FIELDS, basic_record, basic_row, enhanced_record, enhanced_row, extract_basic, extract_enhanced
+)
+from bulk_loader import CopyWriter
+from document_stream import iter_documents
+
+BATCH_CHUNK_SIZE = 100  # files per work unit
+PROGRESS_INTERVAL = 5  # seconds between progress lines
+STREAM_FILE_BYTES = 64 * 1024 ** 2  # bigger dumps are streamed by the parent, not loaded by a worker
+
+# extractor name -> (extract fields, format output row, typed record)
+EXTRACTORS = {
+    'views': (extract_basic, basic_row, basic_record),
+    'enhanced': (extract_enhanced, enhanced_row, enhanced_record),
+}
+
+# Output formats: rows as returned by the nodes (jsonl / csv), or typed records as a
+# PostgreSQL COPY file (copy-csv / copy-binary) for bulk_loader.py
+OUTPUT_FORMATS = ('jsonl', 'csv', 'copy-csv', 'copy-binary')
+
+
+def iter_source_files(source=None, manifest=None):
+    """
+    Yield the metadata files to process, sorted within a directory or glob.
+
+    Args:
+        source (str): A directory (walked recursively) or a glob pattern ('**' allowed).
+        manifest (str): A text file listing one path per line (relative to the manifest's directory).
+    """
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as file:
+            for line in file:
+                path = line.strip()
+                if path and not path.startswith('#'):
+                    yield os.path.join(base_dir, path)
+        return
+
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.startswith('.'):
+                    yield os.path.join(root, name)
+        return
+
+    for path in sorted(glob.iglob(source, recursive=True)):
+        if os.path.isfile(path):
+            yield path
+
+
+def iter_file_results(path, extractor='views', records=False):
+    """
+    Yield (True, (path, document index), row or typed record) for every document of a file,
+    or (False, (path, document index), error message) for the ones that fail.
+    """
+    extract, format_row, make_record = EXTRACTORS[extractor]
+    documents = 0
+    try:
+        for index, metadata in enumerate(iter_documents(path)):
+            documents += 1
+            try:
+                yield True, (path, index), make_record(metadata) if records else format_row(extract(metadata))
+            except Exception as e:
+                yield False, (path, index), f"{type(e).__name__}: {e}"
+    except Exception as e:  # Reading the file
+        yield False, (path, None), f"{type(e).__name__}: {e}"
+        return
+
+    if not documents:
+        yield False, (path, None), "ValueError: No JSON object found in file"
+
+
+def process_files(paths, extractor='views', records=False):
+    """
+    Process a chunk of files (runs in a worker process).
+
+    Returns:
+        tuple: ([((path, document), row or typed record)], [((path, document), error message)])
+    """
+    rows, errors = [], []
+    for path in paths:
+        for ok, source, value in iter_file_results(path, extractor, records):
+            (rows if ok else errors).append((source, value))
+    return rows, errors
+
+
+class RowSink:
+    """Write ((path, document), row) results as JSON lines ({"file": ..., "document": ..., <field>: ...}) or CSV."""
+
+    def __init__(self, path, output_format='jsonl'):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = None
+        if output_format == 'csv':
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(('file', 'document') + ROW_FIELDS)
+
+    def write(self, rows):
+        for (path, document), row in rows:
+            if self.writer:
+                self.writer.writerow((path, document) + tuple(row))
+            else:
+                self.file.write(json.dumps(
+                    {'file': path, 'document': document, **dict(zip(ROW_FIELDS, row))}, ensure_ascii=False
+                ) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class RecordSink(CopyWriter):
+    """Write ((path, document), typed record) results to a COPY file."""
+
+    def write(self, rows):
+        super().write([record for _, record in rows])
+
+
+def open_sink(path, output_format=None):
+    """Sink for `output_format` (default: from the extension, .csv -> csv, .copy -> copy-binary, else jsonl)."""
+    if output_format is None:
+        output_format = 'csv' if path.endswith('.csv') else 'copy-binary' if path.endswith('.copy') else 'jsonl'
+    if output_format == 'copy-csv':
+        return RecordSink(path)
+    if output_format == 'copy-binary':
+        return RecordSink(path, binary=True)
+    return RowSink(path, output_format)
+
+
+def print_progress(done, failed, elapsed):
+    rate = done / elapsed if elapsed else 0
+    # Counts documents (a file can hold several), unreadable files count as one failed document
+    print(f"{done} documents processed ({failed} failed), {rate:.0f} documents/s", file=sys.stderr)
+
+
+def run_batch(paths, output, error_log=None, extractor='views', workers=None,
+              chunk_size=BATCH_CHUNK_SIZE, progress=print_progress, output_format=None):
+    """
+    Extract the rows of many metadata files with a process pool.
+
+    Args:
+        paths (iterable): Files to process (consumed lazily, chunk by chunk).
+        output (str): Output file (.jsonl, .csv, or .copy for typed records).
+        error_log (str): Failed files log (JSON lines), defaults to '<output>.errors.jsonl'.
+        extractor (str): 'views' or 'enhanced'.
+        workers (int): Worker processes (default: CPU count), 1 runs in this process.
+        chunk_size (int): Files per work unit.
+        progress (callable): progress(done, failed, elapsed seconds), or None.
+        output_format (str): One of OUTPUT_FORMATS (default: from the output extension).
+
+    Returns:
+        dict: {'processed': documents (and unreadable files), 'failed': ..., 'seconds': ...}
+    """
+    if extractor not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{extractor}', expected one of {sorted(EXTRACTORS)}.")
+
+    error_log = error_log or f"{output}.errors.jsonl"
+    workers = workers or os.cpu_count() or 1
+
+    sink = open_sink(output, output_format)
+    records = not isinstance(sink, RowSink)
+    errors_file = open(error_log, 'w', encoding='utf-8')
+    done = failed = 0
+    start = last_report = time.perf_counter()
+
+    def collect(result):
+        nonlocal done, failed, last_report
+        rows, errors = result
+        sink.write(rows)
+        for (path, document), error in errors:
+            errors_file.write(json.dumps({'file': path, 'document': document, 'error': error}, ensure_ascii=False) + '\n')
+        errors_file.flush()
+        done += len(rows) + len(errors)
+        failed += len(errors)
+        if progress and time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.perf_counter()
+            progress(done, failed, last_report - start)
+
+    def stream_file(path):
+        # Big dumps: documents are extracted here as they are read, flushed every chunk_size rows
+        rows, errors = [], []
+        for ok, source, value in iter_file_results(path, extractor, records):
+            (rows if ok else errors).append((source, value))
+            if len(rows) + len(errors) >= chunk_size:
+                collect((rows, errors))
+                rows, errors = [], []
+        collect((rows, errors))
+
+    def small_chunks():
+        # Chunks of the files a worker can load whole, the big ones are streamed on the way
+        chunk = []
+        for path in paths:
+            try:
+                big = os.path.getsize(path) > STREAM_FILE_BYTES
+            except OSError:
+                big = False  # Reported by the worker
+            if big:
+                stream_file(path)
+                continue
+            chunk.append(path)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    try:
+        if workers == 1:
+            for chunk in small_chunks():
+                collect(process_files(chunk, extractor, records))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Keep a bounded number of chunks in flight, the file list may be huge
+                pending = set()
+                for chunk in small_chunks():
+                    pending.add(pool.submit(process_files, chunk, extractor, records))
+                    if len(pending) >= workers * 2:
+                        completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in completed:
+                            collect(future.result())
+                for future in wait(pending).done:
+                    collect(future.result())
+    finally:
+        sink.close()
+        errors_file.close()
+
+    elapsed = time.perf_counter() - start
+    if progress:
+        progress(done, failed, elapsed)
+    return {'processed': done, 'failed': failed, 'seconds': round(elapsed, 3)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract tiktok_video_data rows from many scraped metadata files.")
+    parser.add_argument('source', nargs='?', help="Directory or glob pattern of metadata files.")
+    parser.add_argument('output', help="Output file (.jsonl, .csv, or .copy for bulk_loader.py).")
+    parser.add_argument('--manifest', help="File listing the metadata files (one path per line).")
+    parser.add_argument('--errors', help="Failed files log (default: <output>.errors.jsonl).")
+    parser.add_argument('--extractor', choices=sorted(EXTRACTORS), default='views')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default=None, help="Default: from the output extension.")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if not args.source and not args.manifest:
+        parser.error("a source directory/glob or --manifest is required")
+
+    summary = run_batch(
+        iter_source_files(args.source, args.manifest), args.output, args.errors,
+        extractor=args.extractor, workers=args.workers, chunk_size=args.chunk_size, output_format=args.format
+    )
+    print(json.dumps(summary))
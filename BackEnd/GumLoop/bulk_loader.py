@@ -0,0 +1,402 @@
+"""
+Bulk loading of extracted video records into tiktok_video_data (PostgreSQL).
+
+The GumLoop nodes return one tuple of stringified values per video, spliced into one
+INSERT per video. For backfills the extractors emit typed records instead
+(metadata_engine.basic_record / enhanced_record), which are loaded here with either:
+    - COPY (CSV or binary) into a temporary staging table, merged with one
+      INSERT ... SELECT ... ON CONFLICT (video_id) statement
+    - batched multi-row upserts (INSERT ... VALUES (...), (...) ON CONFLICT (video_id))
+
+Rows are keyed on video_id (the number in the TikTok URL); the table needs a unique
+video_id column, see VIDEO_ID_MIGRATION. Within one load the last record of a video wins.
+
+Usage:
+    python bulk_loader.py load rows.copy --binary [--dsn postgresql://...]
+    python bulk_loader.py bench [--rows 1000000] [--dsn postgresql://...]
+"""
+import io
+import os
+import struct
+import sys
+import time
+
+VIDEO_TABLE = "tiktok_video_data"
+
+# Column -> PostgreSQL type of the staging table (the binary COPY format is typed),
+# video_id then metadata_engine.ROW_FIELDS
+VIDEO_COLUMNS = {
+    'video_id': 'bigint',
+    'tiktok_url': 'text',
+    'creator_name': 'text',
+    'creator_handle': 'text',
+    'title': 'text',
+    'description': 'text',
+    'hashtags': 'text[]',
+    'likes_count': 'bigint',
+    'comments_count': 'bigint',
+    'keywords': 'text[]',
+}
+
+VIDEO_ID_MIGRATION = f"""
+ALTER TABLE {VIDEO_TABLE} ADD COLUMN IF NOT EXISTS video_id bigint;
+UPDATE {VIDEO_TABLE} SET video_id = substring(tiktok_url from '/video/([0-9]+)')::bigint WHERE video_id IS NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS {VIDEO_TABLE}_video_id_key ON {VIDEO_TABLE} (video_id);
+"""
+
+UPSERT_PAGE_SIZE = 1000
+COPY_READ_SIZE = 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# COPY encoders
+# ---------------------------------------------------------------------------
+
+def _text(value):
+    # PostgreSQL text can't hold NUL characters
+    text = value if isinstance(value, str) else str(value)
+    return text.replace('\x00', '') if '\x00' in text else text
+
+
+def _csv_quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _csv_array(values):
+    elements = (
+        'NULL' if value is None else '"' + _text(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+        for value in values
+    )
+    return _csv_quote('{' + ','.join(elements) + '}')
+
+
+def encode_copy_csv(record, columns=VIDEO_COLUMNS):
+    """One record as a line of COPY ... WITH (FORMAT csv) (NULL is an unquoted empty field)."""
+    fields = []
+    for column, column_type in columns.items():
+        value = record.get(column)
+        if value is None:
+            fields.append('')
+        elif column_type == 'bigint':
+            fields.append(str(int(value)))
+        elif column_type == 'text[]':
+            fields.append(_csv_array(value))
+        else:
+            fields.append(_csv_quote(_text(value)))
+    return ','.join(fields) + '\n'
+
+
+COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_BINARY_TRAILER = struct.pack('>h', -1)
+TEXT_OID = 25
+
+_NULL = struct.pack('>i', -1)
+_BIGINT = struct.Struct('>iq')
+_FIELD_COUNT = struct.pack('>h', len(VIDEO_COLUMNS))
+
+
+def _binary_text(value):
+    data = _text(value).encode('utf-8')
+    return struct.pack('>i', len(data)) + data
+
+
+def _binary_array(values):
+    if not values:
+        body = struct.pack('>iii', 0, 0, TEXT_OID)
+    else:
+        has_null = any(value is None for value in values)
+        body = struct.pack('>iiiii', 1, int(has_null), TEXT_OID, len(values), 1) + b''.join(
+            _NULL if value is None else _binary_text(value) for value in values
+        )
+    return struct.pack('>i', len(body)) + body
+
+
+def encode_copy_binary(record):
+    """One record as a tuple of COPY ... WITH (FORMAT binary) (without the file header/trailer)."""
+    parts = [_FIELD_COUNT]
+    for column, column_type in VIDEO_COLUMNS.items():
+        value = record.get(column)
+        if value is None:
+            parts.append(_NULL)
+        elif column_type == 'bigint':
+            parts.append(_BIGINT.pack(8, int(value)))
+        elif column_type == 'text[]':
+            parts.append(_binary_array(list(value)))
+        else:
+            parts.append(_binary_text(value))
+    return b''.join(parts)
+
+
+class CopyWriter:
+    """Write records to a COPY file (CSV or binary), e.g. as the output sink of batch.py."""
+
+    def __init__(self, path, binary=False):
+        self.binary = binary
+        self.file = open(path, 'wb')
+        if binary:
+            self.file.write(COPY_BINARY_HEADER)
+
+    def write(self, records):
+        if self.binary:
+            self.file.write(b''.join(encode_copy_binary(record) for record in records))
+        else:
+            self.file.write(''.join(encode_copy_csv(record) for record in records).encode('utf-8'))
+        self.file.flush()
+
+    def close(self):
+        if self.binary:
+            self.file.write(COPY_BINARY_TRAILER)
+        self.file.close()
+
+
+class CopyStream(io.RawIOBase):
+    """File-like view of encoded records, so COPY streams them without building the whole payload."""
+
+    def __init__(self, records, binary=False):
+        self.records = iter(records)
+        self.binary = binary
+        self.buffer = bytearray(COPY_BINARY_HEADER if binary else b'')
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def read(self, size=COPY_READ_SIZE):
+        if size is None or size < 0:
+            size = COPY_READ_SIZE
+        while len(self.buffer) < size and not self.done:
+            record = next(self.records, None)
+            if record is None:
+                self.done = True
+                if self.binary:
+                    self.buffer += COPY_BINARY_TRAILER
+            elif self.binary:
+                self.buffer += encode_copy_binary(record)
+            else:
+                self.buffer += encode_copy_csv(record).encode('utf-8')
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+# ---------------------------------------------------------------------------
+# Loaders (psycopg2 connections)
+# ---------------------------------------------------------------------------
+
+def _upsert_sql(source_sql, table=VIDEO_TABLE, on_conflict='update'):
+    columns = ', '.join(VIDEO_COLUMNS)
+    if on_conflict == 'update':
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in VIDEO_COLUMNS if column != 'video_id')
+        conflict = f"ON CONFLICT (video_id) DO UPDATE SET {updates}"
+    elif on_conflict == 'ignore':
+        conflict = "ON CONFLICT (video_id) DO NOTHING"
+    else:
+        raise ValueError("on_conflict must be 'update' or 'ignore'.")
+    # xmax is 0 for freshly inserted rows, set for updated ones
+    return f"INSERT INTO {table} ({columns}) {source_sql} {conflict} RETURNING (xmax = 0) AS inserted"
+
+
+def _create_staging(cursor, staging):
+    columns = ', '.join(f"{column} {column_type}" for column, column_type in VIDEO_COLUMNS.items())
+    cursor.execute(f"CREATE TEMP TABLE {staging} (seq bigserial, {columns}) ON COMMIT DROP")
+
+
+def _merge_staging(cursor, staging, table, on_conflict):
+    columns = ', '.join(VIDEO_COLUMNS)
+    source_sql = (
+        f"SELECT DISTINCT ON (video_id) {columns} FROM {staging} "
+        f"WHERE video_id IS NOT NULL ORDER BY video_id, seq DESC"
+    )
+    cursor.execute(
+        f"WITH merged AS ({_upsert_sql(source_sql, table, on_conflict)}) "
+        f"SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged"
+    )
+    inserted, updated = cursor.fetchone()
+    cursor.execute(
+        f"SELECT count(*), count(*) FILTER (WHERE video_id IS NULL), count(DISTINCT video_id) FROM {staging}"
+    )
+    received, skipped, distinct = cursor.fetchone()
+    return {'received': received, 'inserted': inserted, 'updated': updated,
+            'ignored': distinct - inserted - updated, 'skipped': skipped,
+            'duplicates': received - skipped - distinct}
+
+
+def load_copy(connection, records=None, binary=False, path=None, table=VIDEO_TABLE, on_conflict='update'):
+    """
+    COPY records (or an existing COPY file written by CopyWriter) into a staging table, then
+    upsert them into `table` in one statement. Runs in one transaction (committed here).
+
+    Returns:
+        dict: received / inserted / updated / ignored (conflicts with on_conflict='ignore') /
+              skipped (no video_id) / duplicates (same video_id in the load)
+    """
+    staging = f"{table}_staging"
+    copy_format = 'binary' if binary else "csv, ENCODING 'UTF8'"
+    with connection.cursor() as cursor:
+        _create_staging(cursor, staging)
+        copy_sql = f"COPY {staging} ({', '.join(VIDEO_COLUMNS)}) FROM STDIN WITH (FORMAT {copy_format})"
+        if path:
+            with open(path, 'rb') as file:
+                cursor.copy_expert(copy_sql, file, size=COPY_READ_SIZE)
+        else:
+            cursor.copy_expert(copy_sql, CopyStream(records, binary), size=COPY_READ_SIZE)
+        result = _merge_staging(cursor, staging, table, on_conflict)
+    connection.commit()
+    return result
+
+
+def _upsert_row(record):
+    row = []
+    for column, column_type in VIDEO_COLUMNS.items():
+        value = record.get(column)
+        if value is not None and column_type == 'text':
+            value = _text(value)
+        elif value is not None and column_type == 'text[]':
+            value = [None if item is None else _text(item) for item in value]
+        row.append(value)
+    return tuple(row)
+
+
+def load_upsert(connection, records, table=VIDEO_TABLE, on_conflict='update', page_size=UPSERT_PAGE_SIZE):
+    """
+    Upsert records with multi-row INSERT statements of `page_size` rows, committed at the end.
+
+    Returns:
+        dict: same counts as load_copy
+    """
+    from psycopg2.extras import execute_values
+
+    sql = _upsert_sql("VALUES %s", table, on_conflict)
+    counts = {'received': 0, 'inserted': 0, 'updated': 0, 'ignored': 0, 'skipped': 0, 'duplicates': 0}
+
+    def flush(cursor, page):
+        # One statement can't touch the same row twice, the last record of a video wins
+        rows = list(page.values())
+        counts['duplicates'] += page_received - len(rows)
+        returned = execute_values(cursor, sql, rows, page_size=len(rows), fetch=True)
+        for (inserted,) in returned:
+            counts['inserted' if inserted else 'updated'] += 1
+        counts['ignored'] += len(rows) - len(returned)
+
+    with connection.cursor() as cursor:
+        page, page_received = {}, 0
+        for record in records:
+            counts['received'] += 1
+            if record.get('video_id') is None:
+                counts['skipped'] += 1
+                continue
+            page[record['video_id']] = _upsert_row(record)
+            page_received += 1
+            if page_received >= page_size:
+                flush(cursor, page)
+                page, page_received = {}, 0
+        if page:
+            flush(cursor, page)
+    connection.commit()
+    return counts
+
+
+def connect(dsn=None):
+    """psycopg2 connection to `dsn` (default: the DATABASE_URL environment variable)."""
+    import psycopg2
+
+    dsn = dsn or os.getenv('DATABASE_URL')
+    if not dsn:
+        raise ValueError("No database DSN, pass --dsn or set DATABASE_URL.")
+    return psycopg2.connect(dsn)
+
+
+def synthetic_records(count, start=0):
+    """Records shaped like real extractions, for the benchmark."""
+    for index in range(start, start + count):
+        yield {
+            'video_id': 7_400_000_000_000_000_000 + index,
+            'tiktok_url': f"https://www.tiktok.com/@creator{index % 5000}/video/{7_400_000_000_000_000_000 + index}",
+            'creator_name': f"Creator {index % 5000}",
+            'creator_handle': f"@creator{index % 5000}",
+            'title': f"Video {index} | TikTok",
+            'description': f"{index % 900}K Likes, {index % 7000} Comments. TikTok video from Creator \"{index}\"",
+            'hashtags': ['#fyp', '#foryou', f"#tag{index % 100}"],
+            'likes_count': (index % 900) * 1000,
+            'comments_count': index % 7000,
+            'keywords': ['comedy', 'work'],
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load extracted video records into tiktok_video_data.")
+    parser.add_argument('command', choices=('load', 'bench'))
+    parser.add_argument('path', nargs='?', help="COPY file written by batch.py (load).")
+    parser.add_argument('--binary', action='store_true', help="The COPY file is in binary format (load).")
+    parser.add_argument('--dsn', help="PostgreSQL DSN (default: DATABASE_URL).")
+    parser.add_argument('--table', default=VIDEO_TABLE)
+    parser.add_argument('--on-conflict', choices=('update', 'ignore'), default='update')
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Records per method (bench).")
+    args = parser.parse_args()
+
+    if args.command == 'load':
+        if not args.path:
+            parser.error("load needs the path of a COPY file")
+        start = time.perf_counter()
+        result = load_copy(connect(args.dsn), binary=args.binary, path=args.path,
+                           table=args.table, on_conflict=args.on_conflict)
+        print(result, f"in {time.perf_counter() - start:.1f}s")
+        sys.exit(0)
+
+    # Benchmark: encoding throughput, then (with a database) the load methods into a scratch table
+    for name, encode in (('copy csv', encode_copy_csv), ('copy binary', encode_copy_binary)):
+        start = time.perf_counter()
+        size = sum(len(encode(record)) for record in synthetic_records(args.rows))
+        elapsed = time.perf_counter() - start
+        print(f"encode {name:<12} {args.rows} records in {elapsed:6.1f}s ({args.rows / elapsed:,.0f}/s, {size / 1e6:.0f} MB)")
+
+    if not (args.dsn or os.getenv('DATABASE_URL')):
+        print("No --dsn / DATABASE_URL, skipping the load benchmark.")
+        sys.exit(0)
+
+    connection = connect(args.dsn)
+    scratch = f"{VIDEO_TABLE}_bench"
+    columns = ', '.join(f"{column} {column_type}" for column, column_type in VIDEO_COLUMNS.items())
+
+    def reset_table():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {scratch}")
+            cursor.execute(f"CREATE TABLE {scratch} ({columns}, UNIQUE (video_id))")
+        connection.commit()
+
+    # Row-at-a-time baseline (one INSERT per video, as the nodes' output is used), on a sample
+    sample = min(args.rows, 5000)
+    reset_table()
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        for record in synthetic_records(sample):
+            cursor.execute(
+                f"INSERT INTO {scratch} ({', '.join(VIDEO_COLUMNS)}) VALUES ({', '.join(['%s'] * len(VIDEO_COLUMNS))})",
+                tuple(record.get(column) for column in VIDEO_COLUMNS)
+            )
+            connection.commit()
+    per_row = (time.perf_counter() - start) / sample
+    print(f"row-at-a-time  {sample} records ({1 / per_row:,.0f}/s), projected {per_row * 1_000_000 / 60:.0f} min per 1M")
+
+    methods = (
+        ('upsert', lambda records: load_upsert(connection, records, table=scratch)),
+        ('copy csv', lambda records: load_copy(connection, records, table=scratch)),
+        ('copy binary', lambda records: load_copy(connection, records, binary=True, table=scratch)),
+    )
+    for name, load in methods:
+        reset_table()
+        start = time.perf_counter()
+        result = load(synthetic_records(args.rows))
+        elapsed = time.perf_counter() - start
+        # Second run over the same videos: every row is a conflict (update)
+        start = time.perf_counter()
+        rerun = load(synthetic_records(args.rows))
+        conflict_elapsed = time.perf_counter() - start
+        print(f"{name:<14} {args.rows} records in {elapsed:6.1f}s ({args.rows / elapsed:,.0f}/s) "
+              f"inserted={result['inserted']}, re-load (all conflicts) {conflict_elapsed:6.1f}s updated={rerun['updated']}")
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {scratch}")
+    connection.commit()
@@ -0,0 +1,88 @@
+"""
+Streaming reader of the JSON documents in a GumLoop dump.
+
+Dumps often start with log lines and contain several concatenated JSON objects (with more
+log lines in between). Instead of slicing from the first '{' and json.loads-ing the rest
+(which fails or keeps only one document), the file is read in buffered chunks and every
+JSON object is decoded in turn with JSONDecoder.raw_decode. Text that doesn't decode is
+skipped (a truncated last document is dropped), and memory stays bounded by the chunk size
+and the largest document.
+"""
+import json
+
+DOCUMENT_CHUNK_SIZE = 1024 * 1024  # characters read at a time
+MAX_DOCUMENT_SIZE = 256 * 1024 * 1024  # a '{' that doesn't close within this is noise
+
+# Errors this close to the end of the buffer may just be a document cut by the chunk boundary
+_BOUNDARY_MARGIN = 16
+
+_decoder = json.JSONDecoder()
+
+
+def _is_incomplete(error, buffer_length):
+    return error.msg.startswith("Unterminated string") or buffer_length - error.pos <= _BOUNDARY_MARGIN
+
+
+def iter_documents(source, chunk_size=DOCUMENT_CHUNK_SIZE, max_document_size=MAX_DOCUMENT_SIZE):
+    """
+    Yield each JSON object of a dump, in file order (noise between them is skipped).
+
+    Args:
+        source (str | file): Path of the dump, or a text file object.
+        chunk_size (int): Characters read at a time.
+        max_document_size (int): Give up on a '{' after buffering this many characters.
+
+    Yields:
+        dict: The decoded documents (nested objects are part of their document, not yielded).
+    """
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8', errors='replace') as file:
+            yield from iter_documents(file, chunk_size, max_document_size)
+        return
+
+    buffer, position, eof = "", 0, False
+
+    def fill(minimum):
+        # Drop what was consumed, then read at least `minimum` more characters (or up to EOF)
+        nonlocal buffer, position, eof
+        parts, read = [buffer[position:]], 0
+        while read < minimum and not eof:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                eof = True
+            parts.append(chunk)
+            read += len(chunk)
+        buffer, position = "".join(parts), 0
+
+    fill(chunk_size)
+    while True:
+        start = buffer.find('{', position)
+        if start == -1:
+            if eof:
+                return
+            position = len(buffer)
+            fill(chunk_size)
+            continue
+
+        try:
+            document, end = _decoder.raw_decode(buffer, start)
+        except json.JSONDecodeError as error:
+            pending = len(buffer) - start
+            if not eof and _is_incomplete(error, len(buffer)) and pending < max_document_size:
+                # Possibly cut by the chunk boundary, read as much again and retry
+                position = start
+                fill(max(chunk_size, pending))
+                continue
+            if eof and _is_incomplete(error, len(buffer)):
+                return  # The dump ends with a truncated document (its nested objects aren't documents)
+            # Not a document, what decoded before the error belongs to it too
+            position = max(error.pos, start + 1)
+            continue
+
+        yield document
+        position = end
+
+
+def first_document(source):
+    """The first JSON object of a dump, or None (what the single-document nodes process)."""
+    return next(iter_documents(source), None)
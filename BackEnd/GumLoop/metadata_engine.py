@@ -0,0 +1,409 @@
+"""
+Shared extraction engine for the GumLoop TikTok metadata nodes (views.py and enhanced_views.py).
+
+The original extractors turned the parsed metadata back into text once per field
+(json.dumps / str(metadata) for the URL, hashtags, likes, comments and every fallback),
+then ran one regex search per field over it. Here every document is serialized once, the
+field patterns are compiled once at import, and each pattern is only tried where its
+literal marker occurs (one scan per marker, shared by the fields on it).
+
+Outputs are identical to the original per-field extraction, see golden/golden_outputs.json
+(checked by test_metadata_engine.py) and `python metadata_engine.py` (benchmark).
+"""
+import json
+import re
+
+
+class FieldPattern:
+    """
+    One field of a MarkerScanner.
+
+    Args:
+        name (str): Field name in the scan result.
+        pattern (str): Regex of the field.
+        marker (str): Regex of a literal every match starts with (or ends with, see `before`).
+        flags (int): re flags of the pattern.
+        find_all (bool): Collect every non-overlapping match (re.findall) instead of the first (re.search).
+        before (str): Characters a match may have BEFORE its marker, for patterns ending with
+            their marker (e.g. '(\\d+) Comments' ends with ' Comments', preceded by digits).
+    """
+
+    def __init__(self, name, pattern, marker, flags=0, find_all=False, before=None):
+        self.name = name
+        self.regex = re.compile(pattern, flags)
+        self.marker = marker
+        self.find_all = find_all
+        self.before = before
+
+
+class MarkerScanner:
+    """
+    Match several field patterns over a text, each one only where its marker occurs.
+
+    Every distinct marker is located once (a plain literal search, which the re module does
+    much faster than trying a whole field pattern at every offset, e.g. '(\\d+) Comments'
+    restarts on every digit) and shared by all the fields anchored on it. This gives, for
+    every field, the same result as the separate searches:
+        - re.search: the first match object (or None)
+        - re.findall: the list of matches (find_all fields)
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        by_marker = {}  # (marker, ignore case) -> fields anchored on it
+        for field in fields:
+            key = (field.marker, bool(field.regex.flags & re.IGNORECASE))
+            by_marker.setdefault(key, []).append(field)
+
+        self._markers = [
+            (re.compile(marker, re.IGNORECASE if ignore_case else 0), marker_fields)
+            for (marker, ignore_case), marker_fields in by_marker.items()
+        ]
+
+    @staticmethod
+    def _match(field, text, marker_match):
+        if field.before is None:
+            return field.regex.match(text, marker_match.start())
+
+        # Back up over the characters allowed before the marker, the match can't start earlier
+        start = marker_match.start()
+        while start > 0 and text[start - 1] in field.before:
+            start -= 1
+        return field.regex.search(text, start, marker_match.end())
+
+    def scan(self, text, names=None):
+        """Return {field name: first match (or None) / findall list}, for all fields or only `names`."""
+        results = {}
+        for marker, marker_fields in self._markers:
+            if names is not None:
+                marker_fields = [field for field in marker_fields if field.name in names]
+                if not marker_fields:
+                    continue
+            pending = [field for field in marker_fields if not field.find_all]
+            collecting = [field for field in marker_fields if field.find_all]
+            for field in marker_fields:
+                results[field.name] = [] if field.find_all else None
+            next_start = {field.name: 0 for field in collecting}  # findall matches don't overlap
+
+            for marker_match in marker.finditer(text):
+                for field in pending:
+                    match = self._match(field, text, marker_match)
+                    if match is not None:
+                        results[field.name] = match
+                pending = [field for field in pending if results[field.name] is None]
+
+                for field in collecting:
+                    match = self._match(field, text, marker_match)
+                    if match is not None and match.start() >= next_start[field.name]:
+                        next_start[field.name] = max(match.end(), match.start() + 1)
+                        groups = match.groups()
+                        results[field.name].append(
+                            match.group(0) if not groups else groups[0] if len(groups) == 1 else groups
+                        )
+
+                if not pending and not collecting:
+                    break
+
+        return results
+
+
+# Columns of a tiktok_video_data row, in the order of both nodes' output tuples
+ROW_FIELDS = ('tiktok_url', 'creator_name', 'creator_handle', 'title', 'description',
+              'hashtags', 'likes_count', 'comments_count', 'keywords')
+
+
+VIDEO_ID_PATTERN = re.compile(r"/video/(\d+)")
+
+
+def video_record(fields):
+    """
+    Typed tiktok_video_data record (for the bulk loader) from extracted fields.
+
+    Args:
+        fields (dict): ROW_FIELDS -> extracted value (lists for hashtags/keywords, ints for counts).
+
+    Returns:
+        dict: The fields plus 'video_id' (int from the TikTok URL, None if there is no URL).
+    """
+    match = VIDEO_ID_PATTERN.search(fields['tiktok_url'] or '')
+    record = {'video_id': int(match.group(1)) if match else None}
+    record.update((field, fields[field]) for field in ROW_FIELDS)
+    return record
+
+
+# ---------------------------------------------------------------------------
+# views.py extractor (fields matched against str(metadata), URL against json.dumps(metadata))
+# ---------------------------------------------------------------------------
+
+CREATOR_NAME_PATTERN = re.compile(r"TikTok video from (.+?) \(@")
+CREATOR_HANDLE_PATTERN = re.compile(r"\(@(.+?)\)")
+TIKTOK_URL_PATTERN = re.compile(r"https://www\.tiktok[^\s\"']*")
+TIKTOK_URL_MARKER = "https://www.tiktok"
+
+DIGITS = "0123456789"
+
+BASIC_SCANNER = MarkerScanner([
+    FieldPattern("creator_name", CREATOR_NAME_PATTERN.pattern, r"TikTok video from "),
+    FieldPattern("creator_handle", CREATOR_HANDLE_PATTERN.pattern, r"\(@"),
+    FieldPattern("hashtags", r"#\w+", r"#", find_all=True),
+    FieldPattern("likes_count", r"(\d+(?:\.\d+)?)([km]?) Likes", r" Likes", re.IGNORECASE, before=DIGITS + ".kmKM"),
+    FieldPattern("comments_count", r"(\d+) Comments", r" Comments", before=DIGITS),
+])
+
+
+def _likes_from_match(match):
+    """Convert a '7k' / '2.5m' likes match into an int (0 if no match)."""
+    if not match:
+        return 0
+    number = float(match.group(1))
+    suffix = match.group(2).lower()
+    if suffix == 'k':
+        number *= 1_000
+    elif suffix == 'm':
+        number *= 1_000_000
+    return int(number)
+
+
+def _first_string_with(value, marker):
+    """First string of a parsed JSON value containing `marker` (keys included, in json.dumps order)."""
+    if isinstance(value, str):
+        return value if marker in value else None
+    if isinstance(value, dict):
+        items = (item for pair in value.items() for item in pair)
+    elif isinstance(value, (list, tuple)):
+        items = value
+    else:
+        return None
+    for item in items:
+        found = _first_string_with(item, marker)
+        if found is not None:
+            return found
+    return None
+
+
+def _tiktok_url_match(metadata, metadata_str):
+    """
+    TIKTOK_URL_PATTERN.search(json.dumps(metadata)), without serializing the document a second time.
+
+    The pattern starts with a plain literal and stops at the closing quote of its JSON string, so
+    its first match is the one in the JSON of the first string containing the literal (looked up
+    in metadata_str first, the walk is skipped when the document has no URL).
+    """
+    if TIKTOK_URL_MARKER not in metadata_str:
+        return None
+    source = _first_string_with(metadata, TIKTOK_URL_MARKER)
+    return TIKTOK_URL_PATTERN.search(json.dumps(source)) if source is not None else None
+
+
+def _keywords(metadata):
+    keywords = metadata.get("basic", {}).get("keywords", None)
+    if not keywords:
+        keywords = metadata.get("search_engine", {}).get("keywords", None)
+    if not keywords:
+        return []
+    return [keyword.strip() for keyword in keywords.split(",")]
+
+
+def extract_basic(metadata, sql_escape=True):
+    """
+    Extraction of GumLoop/views.py::main.
+
+    Args:
+        metadata (dict): Parsed metadata.
+        sql_escape (bool): Double the quotes of the creator name (the node's output is spliced into SQL).
+
+    Returns:
+        list: [tiktok_url, creator_name, creator_handle, title, description,
+               hashtags, likes_count, comments_count, keywords]
+    """
+    description = metadata.get("basic", {}).get("description", "")
+
+    # Description first (small), the full metadata is only needed for the fallbacks
+    name_match = CREATOR_NAME_PATTERN.search(str(description))
+    handle_match = CREATOR_HANDLE_PATTERN.search(description)
+
+    # Serialized once, the URL is taken from the JSON of its own string
+    metadata_str = str(metadata)
+    found = BASIC_SCANNER.scan(metadata_str)
+    url_match = _tiktok_url_match(metadata, metadata_str)
+
+    if name_match:
+        creator_name = name_match.group(1)
+    else:
+        creator_name = found["creator_name"].group(1) if found["creator_name"] else None
+
+    if handle_match:
+        creator_handle = handle_match.group(1)
+    else:
+        creator_handle = found["creator_handle"].group(1) if found["creator_handle"] else None
+
+    return [
+        url_match.group(0) if url_match else None,
+        creator_name.replace("'", "''") if creator_name is not None and sql_escape else creator_name,
+        f"@{creator_handle}" if creator_handle is not None else None,
+        metadata.get("basic", {}).get("title", ""),
+        description,
+        found["hashtags"],
+        _likes_from_match(found["likes_count"]),
+        int(found["comments_count"].group(1)) if found["comments_count"] else 0,
+        _keywords(metadata),
+    ]
+
+
+def basic_record(metadata):
+    """Typed record of the views.py extraction (unescaped name, lists and ints kept as is)."""
+    return video_record(dict(zip(ROW_FIELDS, extract_basic(metadata, sql_escape=False))))
+
+
+def basic_row(values):
+    """Format extract_basic values as the views.py output tuple ('NULL' for missing values)."""
+    return tuple(
+        (value if index < 2 else str(value)) if value is not None else 'NULL'
+        for index, value in enumerate(values)
+    )
+
+
+# ---------------------------------------------------------------------------
+# enhanced_views.py extractor (every field matched against json.dumps(metadata))
+# ---------------------------------------------------------------------------
+
+ENHANCED_FIELDS = {
+    # field -> (pattern, marker, characters allowed before the marker), tried in order
+    'tiktok_url': [(r'https://www\.tiktok\.com/[@\w/\-]+', r'https://www\.tiktok', None)],
+    'creator_name': [(r'TikTok video from (.+?) \(@', r'TikTok video from ', None),
+                     (r'og:title": "(.+?) on TikTok"', r'og:title": "', None)],
+    'creator_handle': [(r'\(@(.+?)\)', r'\(@', None),
+                       (r'/@([\w\.]+)/', r'/@', None)],
+    'likes_count': [(r'(\d+(?:\.\d+)?[KkMm]?) Likes', r' Likes', DIGITS + '.kmKM'),
+                    (r'(\d+) Likes', r' Likes', DIGITS)],
+    'comments_count': [(r'(\d+) Comments', r' Comments', DIGITS)],
+}
+
+ENHANCED_SCANNER = MarkerScanner(
+    [FieldPattern("hashtags", r"#\w+", r"#", find_all=True)] + [
+        FieldPattern(f"{field}:{index}", pattern, marker, re.IGNORECASE, before=before)
+        for field, patterns in ENHANCED_FIELDS.items()
+        for index, (pattern, marker, before) in enumerate(patterns)
+    ]
+)
+
+ENHANCED_FIELD_ORDER = ROW_FIELDS
+
+
+def convert_count(count_str):
+    """Convert count strings like '1.5K' or '2M' to integers."""
+    if not count_str:
+        return 0
+
+    multipliers = {'k': 1000, 'm': 1000000}
+    count_str = count_str.lower().strip()
+
+    try:
+        if count_str[-1] in multipliers:
+            number = float(count_str[:-1])
+            return int(number * multipliers[count_str[-1]])
+        return int(float(count_str))
+    except (ValueError, IndexError):
+        return 0
+
+
+def _enhanced_keywords(metadata):
+    for parent, child in (('seo', 'keywords'), ('basic', 'keywords'), ('search_engine', 'keywords')):
+        keywords = metadata.get(parent, {}).get(child)
+        if keywords:
+            if isinstance(keywords, str):
+                return [kw.strip() for kw in keywords.split(',')]
+            elif isinstance(keywords, list):
+                return keywords
+    return []
+
+
+def extract_enhanced(metadata):
+    """
+    Extraction of GumLoop/enhanced_views.py::main.
+
+    Returns:
+        dict: tiktok_url, creator_name, creator_handle, title, description,
+              hashtags, likes_count, comments_count, keywords (None when not found)
+    """
+    fields = {field: None for field in ENHANCED_FIELD_ORDER}
+    fields['title'] = metadata.get('basic', {}).get('title')
+
+    for parent, child in (('seo', 'description'), ('opengraph', 'description'), ('twitter', 'description')):
+        desc = metadata.get(parent, {}).get(child)
+        if desc:
+            fields['description'] = desc
+            break
+
+    # One scan for the hashtags and every pattern of the deep searched fields
+    found = ENHANCED_SCANNER.scan(json.dumps(metadata))
+    fields['hashtags'] = found['hashtags']
+    fields['keywords'] = _enhanced_keywords(metadata)
+
+    # Remaining fields, in the original deep search order (the first pattern of a field that matched)
+    for field in ENHANCED_FIELD_ORDER:
+        if fields[field] is not None or field not in ENHANCED_FIELDS:
+            continue
+        for index in range(len(ENHANCED_FIELDS[field])):
+            match = found[f"{field}:{index}"]
+            if match:
+                # NB: the URL pattern has no group, group(1) raises like the original extractor did
+                value = match.group(1)
+                break
+        else:
+            value = None
+        if value:
+            fields[field] = convert_count(value) if field in ('likes_count', 'comments_count') else value
+
+    return fields
+
+
+def enhanced_record(metadata):
+    """Typed record of the enhanced_views.py extraction."""
+    return video_record(extract_enhanced(metadata))
+
+
+def enhanced_row(fields):
+    """Format extract_enhanced fields as the enhanced_views.py output tuple ('NULL' for missing values)."""
+    return (
+        fields['tiktok_url'] or 'NULL',
+        fields['creator_name'] or 'NULL',
+        fields['creator_handle'] or 'NULL',
+        str(fields['title']) if fields['title'] else 'NULL',
+        str(fields['description']) if fields['description'] else 'NULL',
+        str(fields['hashtags']) if fields['hashtags'] else 'NULL',
+        str(fields['likes_count']) if fields['likes_count'] is not None else 'NULL',
+        str(fields['comments_count']) if fields['comments_count'] is not None else 'NULL',
+        str(fields['keywords']) if fields['keywords'] else 'NULL'
+    )
+
+
+if __name__ == "__main__":
+    # Benchmark of both GumLoop nodes on the golden files (the outputs are checked by test_metadata_engine.py):
+    #   python metadata_engine.py            -> us per file and node
+    #   python metadata_engine.py --update   -> rewrite golden/golden_outputs.json (only after an intended output change)
+    import sys
+    import time
+
+    from test_metadata_engine import GOLDEN_PATH, NODES, load_golden, run_node
+
+    golden = load_golden()
+    if "--update" in sys.argv:
+        outputs = {name: {node_name: run_node(node, name) for node_name, node in NODES.items()} for name in golden}
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as file:
+            json.dump(outputs, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+        print(f"Updated {GOLDEN_PATH}")
+        sys.exit(0)
+
+    print(f"{'file':<28}{'views':>12}{'enhanced':>12}   (us per file, read + parse + extract)")
+    for name in golden:
+        timings = []
+        for node in NODES.values():
+            # ~0.2s per file and node, at least 3 runs (the big exports take ~0.1s each)
+            runs, start = 0, time.perf_counter()
+            while runs < 3 or time.perf_counter() - start < 0.2:
+                run_node(node, name)
+                runs += 1
+            timings.append((time.perf_counter() - start) / runs * 1e6)
+        print(f"{name:<28}{timings[0]:>12.0f}{timings[1]:>12.0f}")
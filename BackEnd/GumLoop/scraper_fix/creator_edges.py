@@ -0,0 +1,195 @@
+"""
+Structured parsing of the TikTok "You may like" recommendations into creator edges.
+
+extract_tiktok_post_info keeps only the hashtags of the text after "You may like", but that
+text lists the recommended videos, each as "<caption><creator handle><likes>·<age>", e.g.
+"A Chinese robot dog celebrates the Chinese new year. kagan_dunlap1318·10h ago". Here the
+tail is parsed (one regex pass, linear in its length) into (creator, likes, age, hashtags)
+records, and the (page creator -> recommended creator) edges are appended to a COPY CSV file
+that loads straight into creator_edges (load_edges), so discovery doesn't need recrawls.
+
+Handles are glued to the caption before them ("#geometryveritasium196.6K·2024-11-19") and to
+the likes after them, so a handle is resolved against the handles known for the page (the
+one in the URL, and the ones that stand alone as a word); when none fits, the lowercase
+suffix of the glued word is used.
+"""
+import datetime
+import os
+import re
+import sys
+
+# COPY encoders shared with the video loader (GumLoop/bulk_loader.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_loader import connect, encode_copy_csv
+
+EDGE_TABLE = "creator_edges"
+EDGE_COLUMNS = {
+    'source_creator': 'text',
+    'target_creator': 'text',
+    'source_url': 'text',
+    'likes': 'bigint',
+    'age': 'text',
+    'hashtags': 'text[]',
+    'seen_at': 'timestamptz',
+}
+EDGE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {EDGE_TABLE} (
+    {', '.join(f'{column} {column_type}' for column, column_type in EDGE_COLUMNS.items())}
+);
+CREATE INDEX IF NOT EXISTS {EDGE_TABLE}_source_idx ON {EDGE_TABLE} (source_creator);
+"""
+
+# "<handle><likes>·<age>": likes as TikTok prints them (exact below 10K, then 12.3K / 1.2M),
+# age as "9h ago" or a posting date ("2024-11-19", "1-15")
+_ENTRY = re.compile(
+    r'(?<![\w.])([\w.]+?)(\d{1,3}(?:\.\d)?[KMB]|\d{1,4})·(\d+[smhdw] ago|\d{4}-\d{1,2}-\d{1,2}|\d{1,2}-\d{1,2})'
+)
+_LIKES = re.compile(r'\d{1,3}(?:\.\d)?[KMB]|\d{1,4}')
+_HANDLE = re.compile(r'[a-z0-9_][a-z0-9_.]*')
+_URL_HANDLE = re.compile(r'tiktok\.com/@([\w.]+)', re.IGNORECASE)
+_HASHTAG = re.compile(r'#(\w+)')
+_HAS_LETTER = re.compile(r'[^\W\d_]')
+_MULTIPLIERS = {'K': 1000, 'M': 1000000, 'B': 1000000000}
+
+
+def url_handle(url):
+    """Creator handle of a TikTok URL (https://www.tiktok.com/@handle/video/...), or None."""
+    match = _URL_HANDLE.search(url or "")
+    return match.group(1).lower() if match else None
+
+
+def _likes(text):
+    if text[-1] in _MULTIPLIERS:
+        return int(float(text[:-1]) * _MULTIPLIERS[text[-1]])
+    return int(text)
+
+
+def _resolve(word, likes, known_handles):
+    """(offset of the handle in word, handle, likes) for a glued "<noise><handle><likes>" word."""
+    token = word + likes
+    best = None
+    for handle in known_handles:
+        index = token.rfind(handle)
+        if index != -1 and _LIKES.fullmatch(token, index + len(handle)) and (best is None or len(handle) > len(best[1])):
+            best = (index, handle, token[index + len(handle):])
+    if best:
+        return best
+
+    # Unknown handle: the longest lowercase handle-like suffix of the word
+    index = len(word)
+    while index > 0 and (word[index - 1].islower() or word[index - 1].isdigit() or word[index - 1] in '_.'):
+        index -= 1
+    while index < len(word) and word[index] == '.':
+        index += 1
+    return index, word[index:] or word, likes
+
+
+def parse_recommendations(tail, known_handles=()):
+    """
+    Parse the text after "You may like" into the recommended videos.
+
+    Args:
+        tail (str): Text from "You may like" on.
+        known_handles (iterable): Handles expected in the tail (e.g. the page creator's).
+
+    Returns:
+        list: {'creator', 'likes', 'age', 'hashtags', 'pinned'} per recommended video, in page order.
+    """
+    matches = list(_ENTRY.finditer(tail))
+
+    # Handles written as a word of their own are known for the whole tail (unless a given
+    # handle ends them: "... about entropyveritasium7887·5d ago")
+    given = {handle.lower() for handle in known_handles if handle}
+    known = set(given)
+    for match in matches:
+        start, word = match.start(1), match.group(1)
+        if ((start == 0 or tail[start - 1].isspace()) and _HANDLE.fullmatch(word)
+                and not any(word.endswith(handle) for handle in given)):
+            known.add(word)
+
+    records = []
+    previous_end = tail.find("You may like")
+    previous_end = previous_end + len("You may like") if previous_end != -1 else 0
+    for match in matches:
+        offset, handle, likes = _resolve(match.group(1), match.group(2), known)
+        if not _HAS_LETTER.search(handle):
+            continue  # Digits cut out of a count or a date (shortened logs), not a handle
+        caption = tail[previous_end:match.start(1) + offset].strip()
+        pinned = caption.startswith("Pinned")
+        records.append({
+            'creator': handle,
+            'likes': _likes(likes),
+            'age': match.group(3),
+            'hashtags': sorted(set(_HASHTAG.findall(caption))),
+            'pinned': pinned,
+        })
+        previous_end = match.end()
+    return records
+
+
+def recommendation_edges(source_creator, source_url, records, seen_at=None):
+    """
+    Creator -> recommended creator edges of a page (recommendations of the creator's own
+    videos aren't edges).
+    """
+    seen_at = seen_at or datetime.datetime.now(datetime.timezone.utc).isoformat()
+    return [
+        {
+            'source_creator': source_creator,
+            'target_creator': record['creator'],
+            'source_url': source_url,
+            'likes': record['likes'],
+            'age': record['age'],
+            'hashtags': record['hashtags'],
+            'seen_at': seen_at,
+        }
+        for record in records if source_creator and record['creator'] != source_creator
+    ]
+
+
+def append_edges(path, edges):
+    """Append edges to the COPY CSV file at path (one write per page, the file is append-only)."""
+    if edges:
+        with open(path, 'a', encoding='utf-8', newline='') as file:
+            file.write(''.join(encode_copy_csv(edge, EDGE_COLUMNS) for edge in edges))
+
+
+def load_edges(connection, path, table=EDGE_TABLE):
+    """COPY an edge file into `table` (created if needed). Returns the number of edges loaded."""
+    columns = ', '.join(EDGE_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(EDGE_TABLE_SQL.replace(EDGE_TABLE, table))
+        with open(path, 'r', encoding='utf-8') as file:
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", file)
+        loaded = cursor.rowcount
+    connection.commit()
+    return loaded
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import time
+
+    parser = argparse.ArgumentParser(description="Parse / load TikTok 'You may like' creator edges.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    parse = subparsers.add_parser('parse', help="Print the recommendations of scrape files (URL on the first line).")
+    parse.add_argument('files', nargs='+')
+    load = subparsers.add_parser('load', help="COPY an edge file into creator_edges.")
+    load.add_argument('path')
+    load.add_argument('--dsn', help="Default: DATABASE_URL.")
+    args = parser.parse_args()
+
+    if args.command == 'load':
+        print(f"Loaded {load_edges(connect(args.dsn), args.path)} edges")
+    else:
+        for path in [path for pattern in args.files for path in glob.glob(pattern)]:
+            with open(path, 'r', encoding='utf-8') as file:
+                url, _, page = file.read().partition('\n')
+            tail = page[page.find("You may like"):] if "You may like" in page else ""
+            start = time.perf_counter()
+            records = parse_recommendations(tail, [url_handle(url)])
+            print(f"{path}: {len(records)} recommendations ({(time.perf_counter() - start) * 1000:.2f} ms)")
+            for record in records:
+                print("   ", record)
@@ -0,0 +1,20 @@
+"""
+Post extraction from scraped TikTok / Instagram pages, shared by the GumLoop nodes
+(RegExNode.py with AI pattern generation, RegExNodeNoAI.py without).
+
+Importing the package registers the platform extractors once per process; a node call only
+builds an ExtractionContext and dispatches on the URL host (registry.py). The sibling modules
+of scraper_fix (page_markers, regex_plan, ...) must be importable (the nodes add the folder
+to sys.path). The .env file (GEMINI_API_KEY, API_URL, HEADER, BEARER, PAYLOAD) is loaded once,
+on import.
+"""
+import dotenv
+
+dotenv.load_dotenv()
+
+from .common import ExtractionContext, apply_custom_regex, convert_number
+from .instagram import InstagramExtractor, extract_instagram_post_info, iter_instagram_posts
+from .node import INVALID_OUTPUT, GenericExtractor, extract_post, retrigger_pipeline
+from .providers import GeminiLLM, LLMPatternProvider, build_pattern_prompt, get_gemini_provider
+from .registry import EXTRACTORS, HOSTS, Extractor, get_extractor, register, url_domain
+from .tiktok import TikTokExtractor, extract_tiktok_post_info
@@ -0,0 +1,118 @@
+"""
+Helpers shared by the platform extractors: the per-call context, number parsing and the
+custom regex fields (regex_params, with the AI_Prompt ones resolved by a pattern provider).
+"""
+import re
+
+from pattern_cache import AI_PATTERN_CONCURRENCY, AI_PATTERN_TIMEOUT, get_pattern_cache, iter_resolved_ai_patterns
+from regex_guard import get_guarded_matcher
+from regex_plan import get_regex_plan, match_field
+
+
+class ExtractionContext:
+    """
+    What one node call extracts with (built per call, the extractors themselves are shared).
+
+    Attributes:
+        url (str): Scraped URL.
+        regex_params (list): Custom regex params.
+        platform (str): Platform of the extractor handling the URL (None when unsupported).
+        pattern_provider (PatternProvider): Generates the AI_Prompt patterns (None: AI fields are skipped).
+        pattern_cache (PatternCache): Generated patterns cache (None disables it).
+        ai_concurrency (int): LLM calls in flight per scrape.
+        ai_timeout (float): Seconds allowed per LLM call.
+        matcher (GuardedMatcher): Match the custom patterns in guarded mode (regex_guard.py).
+        all_posts (bool): Every post of an Instagram scrape (a list) instead of the first one.
+        recommendations (bool): Add the parsed TikTok "You may like" videos.
+        edge_log (str): Append the TikTok creator edges to this file (creator_edges.py).
+        empty_recommended_hashtags (callable): Value factory of an empty "Recommended Hashtags" (None: None).
+    """
+    __slots__ = ('url', 'regex_params', 'platform', 'pattern_provider', 'pattern_cache', 'ai_concurrency',
+                 'ai_timeout', 'matcher', 'all_posts', 'recommendations', 'edge_log', 'empty_recommended_hashtags')
+
+    def __init__(self, url, regex_params, params=None, pattern_provider=None, empty_recommended_hashtags=None):
+        params = params or {}
+        self.url = url
+        self.regex_params = regex_params
+        self.platform = None
+        self.pattern_provider = pattern_provider
+        self.pattern_cache = None
+        if pattern_provider is not None:
+            self.pattern_cache = params["pattern_cache"] if "pattern_cache" in params else get_pattern_cache()
+        self.ai_concurrency = params.get("ai_concurrency", AI_PATTERN_CONCURRENCY)
+        self.ai_timeout = params.get("ai_timeout", AI_PATTERN_TIMEOUT)
+        self.matcher = get_guarded_matcher() if params.get("guarded_regex") else None
+        self.all_posts = params.get("all_posts", False)
+        self.recommendations = params.get("recommendations", False)
+        self.edge_log = params.get("edge_log")
+        self.empty_recommended_hashtags = empty_recommended_hashtags
+
+
+def convert_number(num_str):
+    """
+    Convert number string with commas, 'K', or 'M' into int.
+    """
+    if not num_str:
+        return None
+    num_str = num_str.strip()
+
+    if 'M' in num_str:
+        try:
+            return int(float(num_str.replace('M', '')) * 1000000)
+        except ValueError:
+            return None
+
+    if 'K' in num_str:
+        try:
+            return int(float(num_str.replace('K', '')) * 1000)
+        except ValueError:
+            return None
+    try:
+        return int(num_str.replace(',', ''))
+    except ValueError:
+        return num_str
+
+
+def apply_custom_regex(text, info_dict, context):
+    """
+    Apply the custom regex params of the call to text and add the results to info_dict (in place).
+
+    Fields with a pattern are matched with the shared regex plan (regex_plan.py). AI_Prompt
+    fields (with a pattern provider only) get a cached pattern or a generated one, generated
+    concurrently, and each field is matched as soon as its pattern arrives (a timed out one
+    stays None).
+    """
+    # Parsed / compiled once per distinct regex_params (see regex_plan.py)
+    plan = get_regex_plan(context.regex_params, allow_ai=context.pattern_provider is not None)
+    ai_fields = plan.apply(text, info_dict, context.matcher)
+    if not ai_fields:
+        return
+
+    matcher, pattern_cache, platform = context.matcher, context.pattern_cache, context.platform
+    ai_requests = [(field.field_name, field.all_matches, field.ai_prompt) for field in ai_fields]
+    resolved = iter_resolved_ai_patterns(
+        pattern_cache, ai_requests, text, platform,
+        lambda field_name, all_matches, AI_Prompt: context.pattern_provider.generate(field_name, text, all_matches, AI_Prompt),
+        max_workers=context.ai_concurrency, timeout=context.ai_timeout, matcher=matcher
+    )
+    for (field_name, all_matches, AI_Prompt), compiled, response, from_cache in resolved:
+        if compiled is None:
+            print(f"Error generating regex pattern for field '{field_name}': {response}")
+            info_dict[field_name] = None
+            continue
+
+        if matcher is not None:
+            ok, value = matcher.match_many(text, [(compiled.pattern, compiled.flags, all_matches)])[0]
+            if not ok:
+                print(f"Error processing pattern for field '{field_name}': {value}")
+            info_dict[field_name] = value if ok else None
+        else:
+            try:
+                info_dict[field_name] = match_field(compiled, all_matches, text)
+            except re.error as e:
+                print(f"Error processing pattern for field '{field_name}': {e}")
+                info_dict[field_name] = None
+
+        if from_cache:
+            # Patterns that stop matching get invalidated after a few runs
+            pattern_cache.record_result(field_name, AI_Prompt, all_matches, platform, info_dict[field_name] is not None)
@@ -0,0 +1,143 @@
+"""
+Instagram reel / post pages.
+"""
+import re
+
+from page_markers import INSTAGRAM_MUTED_MARKER, INSTAGRAM_REQUIRED_MARKERS
+
+from .common import apply_custom_regex, convert_number
+from .registry import Extractor, register
+
+_CREATOR_PATTERN = re.compile(r'([\w\.\d_]+)•Follow')
+_CAPTION_PATTERN = re.compile(r'•Follow(.*?)… more', re.DOTALL)
+_LIKES_PATTERN = re.compile(r'Like([\d,\.K]+)')
+_COMMENTS_PATTERN = re.compile(r'Comment([\d,\.K]+)')
+_HASHTAG_PATTERN = re.compile(r'#(\w+)')
+_SOUND_PATTERN = re.compile(r'moreAudio(.*?)(?=Play button)')
+
+
+def extract_instagram_post_info(block, cached_scraped_data, context, custom_fields=None):
+    """
+    Extract information from a single post block.
+    Returns a dictionary with keys:
+    #TODO: Check language conversion
+    - creator handle
+    - video caption --> Try to check language conversion
+    - likes
+    - comments --> Try to check language conversion
+    - reshares
+    - hashtags
+    - sound used
+    """
+    info = {}
+
+    # Extract creator handle (e.g., "brianpils" in "brianpils•Follow") --> before .Follow
+    # WARNING: what if already followed? --> WebScraper never has anyone followed
+    creator_match = _CREATOR_PATTERN.search(block)
+    info['creator handle'] = creator_match.group(1).replace("\n", " ") if creator_match else None
+
+    # Extract video caption: take text after '•Follow' and before '… more'
+    # WARNING what if already followed? --> WebScraper never has anyone followed
+    caption_match = _CAPTION_PATTERN.search(block)
+    caption = caption_match.group(1).strip() if caption_match else None
+    info['video caption'] = caption.replace("\n", " ") if caption else None
+
+    # Extract likes ( first occurrence of "Like" followed by number)
+    likes_match = _LIKES_PATTERN.search(block)
+    info['likes'] = convert_number(likes_match.group(1)) if likes_match else None
+
+    # Extract comments (first occurrence of "Comment" followed by number)
+    comments_match = _COMMENTS_PATTERN.search(block)
+    info['comments'] = convert_number(comments_match.group(1)) if comments_match else None
+
+    # Extract hashtags from the caption text (if any)
+    if caption:
+        hashtags = set(_HASHTAG_PATTERN.findall(caption))
+        info['hashtags'] = hashtags if hashtags else None
+    else:
+        info['hashtags'] = []
+
+    # Extract sound used:
+    # Look for text between moreAudio and Play button
+    sound_match = _SOUND_PATTERN.search(block)
+    if sound_match:
+        sound = sound_match.group(1).strip()
+        info['sound used'] = sound.replace("\n", " ")
+    else:
+        info['sound used'] = None
+
+    # Apply custom regex patterns if provided in params
+    if custom_fields is not None:
+        # Already matched on the page (shared by all its posts)
+        info.update({key: set(value) if isinstance(value, set) else value for key, value in custom_fields.items()})
+    elif context.regex_params:
+        apply_custom_regex(cached_scraped_data, info, context)
+
+    return info
+
+
+def iter_instagram_posts(scraped_data, markers, context):
+    """
+    Yield the info of every post of an Instagram scrape (the reel, then the reels listed
+    after it): the page is cut at each " is muted" (every reel starts muted), and each
+    block is extracted with extract_instagram_post_info.
+    """
+    # Custom patterns run on the whole page, match them once for all the posts
+    custom_fields = {}
+    if context.regex_params:
+        apply_custom_regex(scraped_data, custom_fields, context)
+
+    seen = set()
+    for start, end in markers.blocks(INSTAGRAM_MUTED_MARKER):
+        block = scraped_data[start:end]
+        if "•Follow" not in block:
+            continue  # Not a post (page footer)
+        post_info = extract_instagram_post_info(block, scraped_data, context, custom_fields)
+
+        # Scrapes often hold the page twice, keep each post once. The two copies of a block differ
+        # (the sound runs into the next section), the key is the fields read before it: the caption
+        # alone is None without a "… more", two such reels of a creator are different posts
+        post_key = tuple(post_info[field] for field in ('creator handle', 'video caption', 'likes', 'comments'))
+        if post_key in seen:
+            continue
+        seen.add(post_key)
+        yield post_info
+
+
+class InstagramExtractor(Extractor):
+    platform = "instagram"
+    hosts = ("instagram.com", "instagr.am")
+
+    def invalid(self, scraped_data, markers):
+        """
+        Invalid when "Audio is muted", "•Follow", "Like", "Comment" or "Share" is missing.
+        """
+        return markers.missing(INSTAGRAM_REQUIRED_MARKERS)
+
+    def extract(self, scraped_data, markers, context):
+        url = context.url
+        if context.all_posts:
+            # One record per post of the page, the first one is the scraped URL
+            posts = []
+            for index, post_info in enumerate(iter_instagram_posts(scraped_data, markers, context)):
+                post_info['video_url'] = url if index == 0 else None
+                post_info['source_url'] = url
+                post_info['platform'] = self.platform
+                posts.append(post_info)
+            return posts
+
+        # Use known "is muted" point to delimit the single
+        # post that we are extracting data for--> Checked that Instagram reels
+        # Always start out as muted:
+        # (https://www.pcmag.com/how-to/how-to-turn-off-autoplay-videos#:~:text=Instagram,-(Credit%3A%20Instagram)&text=When%20you%20open%20Instagram%2C%20the,time%20you%20open%20the%20app.)
+        first_muted = markers.first(INSTAGRAM_MUTED_MARKER)
+        second_muted = markers.next(INSTAGRAM_MUTED_MARKER, first_muted + 1)
+        block = scraped_data[first_muted + len(INSTAGRAM_MUTED_MARKER):second_muted]
+
+        post_info = extract_instagram_post_info(block, scraped_data, context)
+        post_info['video_url'] = url
+        post_info['platform'] = self.platform
+        return post_info
+
+
+register(InstagramExtractor())
@@ -0,0 +1,108 @@
+"""
+The node call (RegExNode.py / RegExNodeNoAI.py main): cached record lookup, platform dispatch,
+validation and extraction.
+"""
+import json
+import os
+import sqlite3
+
+from page_markers import PageMarkers
+from pipeline_client import enable_advanced_scraping, get_pipeline_client
+from scrape_cache import get_scrape_cache, normalize_url, record_variant
+
+from .common import ExtractionContext, apply_custom_regex
+from .registry import Extractor, get_extractor, register
+
+INVALID_OUTPUT = "Invalid scraped data"
+
+
+class GenericExtractor(Extractor):
+    """Unsupported platforms: only the custom regex fields are extracted."""
+
+    def extract(self, scraped_data, markers, context):
+        print("Unsupported platform, Automated Extraction will be disblaed for this URL")
+        print("You can always use Custom regex patterns or the LLM to extract data")
+
+        info = {}
+        if context.regex_params:
+            apply_custom_regex(scraped_data, info, context)
+        return info
+
+
+register(GenericExtractor())
+
+
+def retrigger_pipeline(url, scraped_data, payload=None, markers=None):
+    """
+    Checks the scraped_data for required markers. If the data is invalid,
+    turns on the "Use Advanced Scraping?" parameter and re-triggers the pipeline API call
+    (see pipeline_client.py, the same URL is re-triggered at most once per de-dup window).
+
+    Returns the API response if re-triggered, or None if the scraped_data appears valid.
+    """
+    if not get_extractor(url).invalid(scraped_data, markers or PageMarkers(scraped_data)):
+        return None
+
+    print("Invalid scraped data detected. Re-triggering API with advanced scraping.")
+    # If no payload is provided, use the PAYLOAD env one.
+    if payload is None:
+        payload = json.loads(os.getenv("PAYLOAD") or "{}")
+    api_response = get_pipeline_client().trigger(enable_advanced_scraping(payload), dedup_key=normalize_url(url).key)
+    return {"api_response": api_response, "note": "Invalid scraped data; re-triggered pipeline."}
+
+
+def extract_post(url, scraped_data, regex_params, params=None, pattern_provider=None, empty_recommended_hashtags=None):
+    """
+    Extract the post info of a scraped page.
+
+    Args:
+        url (str): Scraped URL (its host picks the extractor).
+        scraped_data (str): The scraped page (may be empty when the URL has a fresh cached record).
+        regex_params (list): Custom regex params.
+        params (dict): Node params (see ExtractionContext). The record cache is opt-in: "scrape_cache"
+            True (process-wide cache) or a ScrapeCache, and "fresh_fields" the output fields that must
+            be fresh for a cached record to be reused (default: every field of the record).
+        pattern_provider (PatternProvider): Generates the AI_Prompt patterns (None: AI fields are skipped).
+        empty_recommended_hashtags (callable): Value factory of an empty "Recommended Hashtags".
+
+    Returns:
+        dict or list: The post info (a list of posts in all_posts mode), or "Invalid scraped data".
+    """
+    params = params or {}
+    context = ExtractionContext(url, regex_params, params, pattern_provider, empty_recommended_hashtags)
+
+    # When the caller opts in, a post extracted recently (same normalized URL, same params) is
+    # returned as is, the flow can then skip the scraper and pass no scraped_data (see scrape_cache.py)
+    scrape_cache = params.get("scrape_cache")
+    if scrape_cache is True:
+        scrape_cache = get_scrape_cache()
+    elif not scrape_cache:
+        scrape_cache = None
+    cache_variant = record_variant(
+        regex_params, pattern_provider is not None, all_posts=context.all_posts, recommendations=context.recommendations
+    )
+    if scrape_cache is not None:
+        try:
+            cached_output = scrape_cache.get(url, cache_variant, fields=params.get("fresh_fields"))
+        except sqlite3.Error as e:
+            # The cache file became unusable (read-only, locked, corrupt): extract uncached
+            print(f"Scrape cache unavailable: {str(e)}")
+            cached_output, scrape_cache = None, None
+        if cached_output is not None:
+            return cached_output
+    scraped_data = scraped_data or ""
+
+    extractor = get_extractor(url)
+    context.platform = extractor.platform
+    markers = PageMarkers(scraped_data)
+    if extractor.invalid(scraped_data, markers):
+        # The flow can re-trigger the scrape here: retrigger_pipeline(url, scraped_data, markers=markers)
+        return INVALID_OUTPUT
+
+    output = extractor.extract(scraped_data, markers, context)
+    if scrape_cache is not None:
+        try:
+            scrape_cache.put(url, output, cache_variant)
+        except sqlite3.Error as e:
+            print(f"Scrape cache unavailable: {str(e)}")
+    return output
@@ -0,0 +1,96 @@
+"""
+Pattern providers: generate the regex pattern of an AI_Prompt custom field with an LLM.
+
+A provider is optional (RegExNodeNoAI runs without one, AI_Prompt fields are then skipped) and
+pluggable: any object with generate(field_name, text, all_matches, ai_prompt) -> raw response,
+or an LLMPatternProvider around any prompt -> response callable (a local stand-in, another model).
+"""
+import json
+import os
+import threading
+
+import requests
+
+from pattern_cache import AI_PATTERN_TIMEOUT
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1/models/gemini-pro:generateContent?key={key}"
+PROMPT_SNIPPET_LENGTH = 500  # characters of the scraped text given as context
+
+
+def build_pattern_prompt(field_name, text, all_matches, ai_prompt):
+    """
+    Prompt asking for the regex pattern of a field, with a snippet of the text for context.
+    """
+    text_snippet = text[:PROMPT_SNIPPET_LENGTH]
+
+    # We include the field name, the context (snippet), whether we want all matches or not,
+    # and the AI prompt provided by the user.
+    return (
+        f"<System Prompt>\n"
+        f"Generate a regex pattern to extract a field that we will call '{field_name}' from some text.\n"
+        f"You should only generate the regex pattern to pattern match with without any additional commentary (evn without the r before the pattern).\n"
+        f"The regex pattern should a string, that if applied correctly answers to the user requirement that you will find below.\n"
+        f"Context (NOT THE FULL FILE, JUST THE A SNIPPET FOR CONTEXT): {text_snippet}\n"
+        f"User Requirement: {ai_prompt}\n"
+        f"This pattern will be called using {'re.findall' if all_matches else 're.search'} mode, so try to optimize for that.\n"
+        f"Return only the regex pattern as output, with no additional commentary."
+        f"\n</System Prompt>"
+    )
+
+
+class LLMPatternProvider:
+    """
+    Generates patterns with a prompt -> raw response callable.
+
+    Args:
+        llm (callable): llm(prompt) -> response text (or an "Error: ..." string).
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def generate(self, field_name, text, all_matches, ai_prompt):
+        return self.llm(build_pattern_prompt(field_name, text, all_matches, ai_prompt))
+
+
+class GeminiLLM:
+    """
+    Gemini generateContent calls over a keep-alive session.
+
+    Args:
+        api_key (str): GEMINI_API_KEY.
+        timeout (float): Seconds per request.
+    """
+
+    def __init__(self, api_key, timeout=AI_PATTERN_TIMEOUT):
+        self.url = GEMINI_API_URL.format(key=api_key)
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def __call__(self, prompt):
+        """
+        Send a prompt to Gemini, return the text of the first candidate.
+        """
+        data = {"contents": [{"parts": [{"text": prompt}]}]}
+        response = self.session.post(
+            self.url, headers={"Content-Type": "application/json"}, data=json.dumps(data), timeout=self.timeout
+        )
+
+        if response.status_code == 200:
+            result = response.json()
+            return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response")
+        else:
+            return f"Error: {response.status_code}, {response.text}"
+
+
+_gemini_provider = None
+_gemini_provider_lock = threading.Lock()
+
+
+def get_gemini_provider():
+    """Process-wide Gemini provider on GEMINI_API_KEY (created on first use)."""
+    global _gemini_provider
+    with _gemini_provider_lock:
+        if _gemini_provider is None:
+            _gemini_provider = LLMPatternProvider(GeminiLLM(os.getenv("GEMINI_API_KEY")))
+        return _gemini_provider
@@ -0,0 +1,65 @@
+"""
+Registry of the platform extractors, looked up by the host of the scraped URL.
+
+Extractors are created and registered once, when their module is imported (tiktok.py,
+instagram.py); a URL is dispatched with one dict lookup on its domain ("vm.tiktok.com" and
+"www.tiktok.com" both map to "tiktok.com"). Unregistered hosts get the generic extractor
+(custom regex fields only).
+"""
+import urllib.parse
+
+EXTRACTORS = {}  # platform -> extractor
+HOSTS = {}  # domain -> extractor
+
+
+class Extractor:
+    """
+    Base of the platform extractors.
+
+    Attributes:
+        platform (str): Platform name (None for the generic extractor).
+        hosts (tuple): Domains served ("tiktok.com").
+    """
+    platform = None
+    hosts = ()
+
+    def invalid(self, scraped_data, markers):
+        """Whether the scraped page is unusable (see the platform's required markers)."""
+        return False
+
+    def extract(self, scraped_data, markers, context):
+        """
+        Extract the post info of a valid page.
+
+        Args:
+            scraped_data (str): The scraped page.
+            markers (PageMarkers): Marker index of the page.
+            context (ExtractionContext): The call's URL, params and custom fields.
+
+        Returns:
+            dict or list: The node output.
+        """
+        raise NotImplementedError
+
+
+def register(extractor):
+    """Register an extractor (an instance) for its platform and hosts. Returns it."""
+    EXTRACTORS[extractor.platform] = extractor
+    for host in extractor.hosts:
+        HOSTS[host] = extractor
+    return extractor
+
+
+def url_domain(url):
+    """Domain of a URL, without subdomains ("https://vm.tiktok.com/x" -> "tiktok.com")."""
+    url = (url or "").strip()
+    try:
+        host = urllib.parse.urlsplit(url if "//" in url else "//" + url).hostname or ""
+    except ValueError:
+        return ""
+    return ".".join(host.lower().rsplit(".", 2)[-2:])
+
+
+def get_extractor(url):
+    """The extractor of a URL (the generic one when its host isn't registered)."""
+    return HOSTS.get(url_domain(url)) or EXTRACTORS[None]
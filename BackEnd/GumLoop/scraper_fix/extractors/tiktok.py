@@ -0,0 +1,235 @@
+"""
+TikTok post pages.
+"""
+import re
+
+from creator_edges import append_edges, parse_recommendations, recommendation_edges, url_handle
+from page_markers import (
+    TIKTOK_POLICY_MARKER, TIKTOK_RECOMMENDATIONS_MARKER, TIKTOK_REQUIRED_MARKERS, TIKTOK_TIMER_PATTERN, PageMarkers
+)
+
+from .common import apply_custom_regex, convert_number
+from .registry import Extractor, register
+
+_SOUND_PATTERN = re.compile(r'original\s+sound\s*-\s*(.*?)(?=You may like)', re.IGNORECASE | re.DOTALL)
+_LIKES_PATTERN = re.compile(r'\d+(?:\.\d+)?[KM]')
+_HASHTAG_PATTERN = re.compile(r'#(\w+)')
+
+
+def extract_tiktok_sound_used(block):
+    """
+    Extracts the TikTok video's sound used from a block of text.
+
+    The function first looks for a pattern such as:
+        "original sound - <sound details> You may like"
+
+    If the pattern is found, it returns the captured <sound details> (trimmed).
+
+    If the pattern is not found, it falls back to:
+    - Taking the part of the block before the phrase "You may like"
+    - Splitting it into lines
+    - Returning the first non-empty line that is not just punctuation (like dots)
+
+    :param block: The full text block from which to extract the sound used.
+    :return: The extracted sound used string, or None if nothing is found.
+    """
+    # Attempt 1: Pattern match "original sound" up to "You may like"
+    match = _SOUND_PATTERN.search(block)
+    if match:
+        sound_text = match.group().strip()
+        if sound_text:
+            return sound_text
+
+    # Fallback: Look for "You may like" and use the text before it.
+    you_may_like_index = block.find("You may like")
+
+    if you_may_like_index != -1:
+        # Reverse iterate until newline character before "You may like"
+        line_start_index = block.rfind("\n", 0, you_may_like_index)
+
+        if line_start_index == -1:
+            # If no newline was found, the sound name starts from the beginning of the block
+            sound_name = block[:you_may_like_index].strip()
+        else:
+            # Capture everything from the first character after the newline to "You may like"
+            sound_name = block[line_start_index + 1:you_may_like_index].strip()
+
+        return sound_name  # Return the extracted sound name
+
+    return None  # Return None if "You may like" was not found
+
+
+def extract_tiktok_interactions(txt, info):
+    """
+    Extracts the number of likes, only if K/.M is found, else
+    the rest of the string is returned as "post interactions".
+    """
+    match = _LIKES_PATTERN.search(txt)
+
+    # Ensure we are capturing K and M of likes and nothing else
+    if match and match.start() <= 5:
+        likes = convert_number(match[0])
+        remaining = txt.replace(match.group(0), "", 1).strip()
+
+        info["likes"] = likes
+        info["post interactions"] = remaining
+
+    else:
+        info["post interactions"] = txt
+
+
+def extract_tiktok_post_info(block, context, markers=None):
+    """
+    Extract TikTok post information from the scraped block.
+    Returns a dictionary with the following keys:
+    - creator handle
+    - video caption
+    - likes
+    - comments
+    - reshares
+    - hashtags
+    - sound used
+    """
+    info = {}
+    markers = markers or PageMarkers(block)
+
+    # Divide data into Video and Recommendations
+    you_may_like_index = markers.first(TIKTOK_RECOMMENDATIONS_MARKER)
+
+    if you_may_like_index != -1:
+        cached_block = block
+        block = block[:you_may_like_index]
+        you_may_like = cached_block[you_may_like_index:]
+    else:
+        cached_block = block
+        you_may_like = ""
+
+    # 1. Extract the first entry:
+    #    Everything from the beginning until the marker "& Policies© 2025 TikTok"
+    policy_marker = TIKTOK_POLICY_MARKER
+    idx = markers.first(policy_marker)
+    if you_may_like_index != -1 and idx + len(policy_marker) > you_may_like_index:
+        idx = -1  # Only in the recommendations
+    if idx != -1:
+        first_entry = block[:idx + len(policy_marker)]
+        remainder = block[idx + len(policy_marker):].strip()
+    else:
+        first_entry = block.strip()
+        remainder = block
+    block = remainder
+
+    # Clean up first_entry:
+    # Remove newline characters/spaces/"output"
+    first_entry = " ".join(first_entry.split())
+    if first_entry.lower().strip().strip("\"").startswith(" output:") or first_entry.lower().strip().strip("\"").startswith("output:"):
+        first_entry = first_entry[len(" output:"):].strip()
+
+    # Extract the video caption from first entry.
+    # The caption is everything from the beginning until the substring "| TikTok"
+    if "| TikTok" in first_entry:
+        caption = first_entry.split("| TikTok")[0].strip()
+    else:
+        caption = first_entry
+    info['video caption'] = caption.replace("\n", " ")
+
+    # Extract the timer from the remaining block.
+    timer_match = TIKTOK_TIMER_PATTERN.search(block)
+
+    if timer_match:
+        # Define the start of the second entry.
+        start_index = timer_match.start()
+        # Find the marker " · " after the timer match.
+        end_index = block.find(" · ", start_index)
+
+        if end_index == -1:
+            # If no marker is found, assume the second entry is from the timer match to the end.
+            second_entry = block[:].strip()
+            block = block[end_index:]
+        else:
+            # Capture the second entry: from the beginning until the marker.
+            second_entry = block[:end_index].strip()
+            # Remove the extracted second_entry and the marker from block.
+            part_before = block[:start_index]
+            part_after = block[end_index + len(" · "):]
+            # TODO Maybe remove more strings from this block? Maybe check for 5 no sound appearing
+            block = (part_before + part_after).strip()
+    else:
+        second_entry = ""
+
+    # Expected pattern in second_entry:
+    #   [likes][comments][bookmarks][shares][timer][creator handle]
+    # For EX:
+    #   "12.4K31224980500:03 / 00:18daily..motiv8tiondailymotiv8tion"
+    #
+    # First, find the timer within second_entry.
+    timer_match = TIKTOK_TIMER_PATTERN.search(second_entry)
+    if timer_match:
+        # Split second_entry into pre_timer and post_timer parts.
+        pre_timer = second_entry[:timer_match.start()].strip()
+        post_timer = second_entry[timer_match.end():].strip()
+    else:
+        pre_timer = second_entry
+        post_timer = ""
+
+    # Now, extract number-like tokens from pre_timer.
+    # Format: [likes][comments][bookmarks][shares][timer]
+    extract_tiktok_interactions(pre_timer, info)
+
+    # The creator handle should be in the post_timer part.
+    info['creator handle'] = post_timer.replace("\n", " ") if post_timer else None
+
+    # Sound Used: Look for a line containing "original sound -"
+    sound_match = extract_tiktok_sound_used(block)
+    if not sound_match:
+        sound_match = extract_tiktok_sound_used(cached_block)
+    info['sound used'] = sound_match.replace("\n", " ") if sound_match else None
+
+    # Hashtags: Collect all hashtags from the entire block.
+    hashtag_matches = set(_HASHTAG_PATTERN.findall(block))
+    info['hashtags'] = hashtag_matches if hashtag_matches else None
+
+    # TikTok Recommendations: Capture everything after "You may like", if present.
+    if you_may_like:
+        # Extract hashtags from recommendations
+        recommended_hashtags = set(_HASHTAG_PATTERN.findall(you_may_like))
+        empty = context.empty_recommended_hashtags
+        info["Recommended Hashtags"] = recommended_hashtags if recommended_hashtags else (empty() if empty else None)
+
+        # Recommended videos as records, and creator -> recommended creator edges
+        if context.recommendations or context.edge_log:
+            handle = url_handle(context.url)
+            records = parse_recommendations(you_may_like, [handle])
+            if context.recommendations:
+                info["Recommendations"] = records
+            if context.edge_log:
+                append_edges(context.edge_log, recommendation_edges(handle, context.url, records))
+
+    # Apply custom regex patterns if provided in params
+    if context.regex_params:
+        apply_custom_regex(cached_block, info, context)
+
+    return info
+
+
+class TikTokExtractor(Extractor):
+    platform = "tiktok"
+    hosts = ("tiktok.com",)
+
+    def invalid(self, scraped_data, markers):
+        """
+        Invalid when "& Policies© 2025 TikTok", "| TikTok" or a timer "XX:XX / XX:XX" is missing
+        (no timer: the URL points to an image post).
+        """
+        if markers.missing(TIKTOK_REQUIRED_MARKERS):
+            return True
+
+        if not markers.search(TIKTOK_TIMER_PATTERN):
+            print("URL points to a TikTok Image")
+            return True
+        return False
+
+    def extract(self, scraped_data, markers, context):
+        return extract_tiktok_post_info(scraped_data, context, markers)
+
+
+register(TikTokExtractor())
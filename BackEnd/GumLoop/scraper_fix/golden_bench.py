@@ -0,0 +1,253 @@
+"""
+Golden-corpus regression check and benchmark of the extractors (extractors/).
+
+The corpus is the recorded scrapes of tiktok/ and instagram/ (URL on the first line, the page
+after it). For every page the node output of each mode (default, TikTok recommendations,
+Instagram all_posts) is compared to the golden output stored in golden/<platform>/<name>.json,
+then each extractor (extract_post, extract_tiktok_post_info, extract_instagram_post_info,
+convert_number) is timed over the corpus: pages/s, µs per extracted field, and the peak
+memory allocated during one pass (tracemalloc).
+
+The check fails (exit status 1) on any output diff, or when an extractor's throughput drops
+more than --threshold below golden/benchmark_baseline.json. Throughput depends on the
+machine: record the baseline where the check runs.
+
+Usage:
+    python golden_bench.py                 # check outputs and throughput
+    python golden_bench.py --update        # rewrite the golden outputs and the baseline
+    python golden_bench.py --outputs-only  # no benchmark
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from extractors import ExtractionContext, convert_number, extract_instagram_post_info, extract_post, extract_tiktok_post_info
+from page_markers import INSTAGRAM_MUTED_MARKER, PageMarkers
+
+GOLDEN_DIR = os.path.join(BASE_DIR, "golden")
+BASELINE_PATH = os.path.join(GOLDEN_DIR, "benchmark_baseline.json")
+CORPUS_PLATFORMS = ("tiktok", "instagram")
+THROUGHPUT_THRESHOLD = 0.25  # Fail below 75% of the baseline pages/s
+BENCH_SECONDS = 1.5  # Minimum timed duration per extractor
+BENCH_ROUNDS = 3
+
+# Custom fields every corpus page is extracted with
+GOLDEN_REGEX_PARAMS = [
+    '{"field_name": "mentions","pattern": "@([\\w\\.-]+)","all_matches": True, "AI_Prompt": None}',
+    '{"field_name": "timer","pattern": "(\\d\\d:\\d\\d) / \\d\\d:\\d\\d","all_matches": False, "AI_Prompt": None}',
+]
+# Modes checked per platform: mode -> node params
+GOLDEN_MODES = {
+    "tiktok": {"default": {}, "recommendations": {"recommendations": True}},
+    "instagram": {"default": {}, "all_posts": {"all_posts": True}},
+}
+NUMBER_SAMPLES = ["198.6K", "1,904", "86", "5.9M", "12K", "", "1.2B", "3,210,000", "K", "12.4K"]
+
+
+def load_corpus():
+    """(platform, name, url, scraped_data) of every recorded scrape, in a stable order."""
+    corpus = []
+    for platform in CORPUS_PLATFORMS:
+        directory = os.path.join(BASE_DIR, platform)
+        for name in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as file:
+                url, _, scraped_data = file.read().partition('\n')
+            corpus.append((platform, name, url.strip(), scraped_data))
+    return corpus
+
+
+def to_json(value):
+    """Node output in a stable JSON form (sets as sorted lists)."""
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(to_json(item) for item in value)
+    return value
+
+
+def run_node(url, scraped_data, params):
+    # Quiet (the nodes print their warnings) and uncached
+    with contextlib.redirect_stdout(io.StringIO()):
+        return extract_post(url, scraped_data, GOLDEN_REGEX_PARAMS, dict(params, scrape_cache=None))
+
+
+def golden_path(platform, name):
+    return os.path.join(GOLDEN_DIR, platform, f"{name}.json")
+
+
+def check_outputs(corpus, update=False):
+    """
+    Compare the node outputs to the golden ones (or rewrite them with update).
+
+    Returns:
+        list: (platform, name, mode, what differs) of every diff.
+    """
+    diffs = []
+    for platform, name, url, scraped_data in corpus:
+        outputs = {mode: to_json(run_node(url, scraped_data, params)) for mode, params in GOLDEN_MODES[platform].items()}
+        path = golden_path(platform, name)
+        if update:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({"url": url, "outputs": outputs}, file, ensure_ascii=False, indent=2, sort_keys=True)
+                file.write('\n')
+            continue
+
+        if not os.path.exists(path):
+            diffs.append((platform, name, None, "no golden output (run with --update)"))
+            continue
+        with open(path, 'r', encoding='utf-8') as file:
+            golden = json.load(file)["outputs"]
+        for mode, output in outputs.items():
+            if output != golden.get(mode):
+                diffs.append((platform, name, mode, describe_diff(golden.get(mode), output)))
+    return diffs
+
+
+def describe_diff(expected, actual):
+    """Short description of how an output differs from its golden one."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        changed = [key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)]
+        return "; ".join(
+            f"{key}: {json.dumps(expected.get(key), ensure_ascii=False)[:80]} -> {json.dumps(actual.get(key), ensure_ascii=False)[:80]}"
+            for key in sorted(changed)
+        )
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        return " | ".join(
+            f"post {index}: {describe_diff(old, new)}" for index, (old, new) in enumerate(zip(expected, actual)) if old != new
+        )
+    return f"{json.dumps(expected, ensure_ascii=False)[:120]} -> {json.dumps(actual, ensure_ascii=False)[:120]}"
+
+
+def _count_fields(output):
+    if isinstance(output, list):
+        return sum(_count_fields(post) for post in output)
+    return len(output) if isinstance(output, dict) else 0
+
+
+def benchmark_cases(corpus):
+    """
+    The timed extractors: name -> calls. A call extracts one page (one number for
+    convert_number) and returns its output.
+    """
+    def context(url):
+        return ExtractionContext(url, GOLDEN_REGEX_PARAMS, {"scrape_cache": None})
+
+    node_calls, tiktok_calls, instagram_calls = [], [], []
+    for platform, name, url, scraped_data in corpus:
+        node_calls.append(lambda url=url, scraped_data=scraped_data: run_node(url, scraped_data, {}))
+        markers = PageMarkers(scraped_data)
+        if platform == "tiktok":
+            tiktok_calls.append(lambda url=url, scraped_data=scraped_data: extract_tiktok_post_info(
+                scraped_data, context(url), PageMarkers(scraped_data)))
+        else:
+            first_muted = markers.first(INSTAGRAM_MUTED_MARKER)
+            second_muted = markers.next(INSTAGRAM_MUTED_MARKER, first_muted + 1)
+            block = scraped_data[first_muted + len(INSTAGRAM_MUTED_MARKER):second_muted]
+            instagram_calls.append(lambda url=url, block=block, scraped_data=scraped_data: extract_instagram_post_info(
+                block, scraped_data, context(url)))
+    number_calls = [lambda text=text: {"value": convert_number(text)} for text in NUMBER_SAMPLES]
+    return {
+        "extract_post": node_calls,
+        "extract_tiktok_post_info": tiktok_calls,
+        "extract_instagram_post_info": instagram_calls,
+        "convert_number": number_calls,
+    }
+
+
+def benchmark(calls, seconds=BENCH_SECONDS):
+    """
+    Time calls (repeated passes for at least `seconds`, best of BENCH_ROUNDS rounds).
+
+    Returns:
+        dict: {'pages_per_second', 'us_per_field', 'peak_kb'} ('pages' are calls).
+    """
+    # Warm up (regex plans, compiled patterns), and count the fields of a pass
+    fields = sum(_count_fields(call()) for call in calls)
+
+    tracemalloc.start()
+    for call in calls:
+        call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Best of BENCH_ROUNDS rounds (the fastest is the least disturbed by the rest of the machine)
+    best = None
+    for _ in range(BENCH_ROUNDS):
+        passes, start = 0, time.perf_counter()
+        while True:
+            for call in calls:
+                call()
+            passes += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds / BENCH_ROUNDS:
+                break
+        if best is None or elapsed / passes < best:
+            best = elapsed / passes
+    return {
+        "pages_per_second": round(len(calls) / best, 1),
+        "us_per_field": round(best / fields * 1e6, 3) if fields else None,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def check_throughput(results, baseline, threshold=THROUGHPUT_THRESHOLD):
+    """Extractors slower than (1 - threshold) x their baseline pages/s: [(name, pages/s, baseline)]."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name, {}).get("pages_per_second")
+        if expected and result["pages_per_second"] < expected * (1 - threshold):
+            regressions.append((name, result["pages_per_second"], expected))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Golden-corpus regression check and benchmark of the extractors.")
+    parser.add_argument("--update", action="store_true", help="Rewrite the golden outputs and the throughput baseline.")
+    parser.add_argument("--outputs-only", action="store_true", help="Only check the outputs.")
+    parser.add_argument("--threshold", type=float, default=THROUGHPUT_THRESHOLD,
+                        help="Allowed throughput drop under the baseline (0.25: 25%%).")
+    parser.add_argument("--seconds", type=float, default=BENCH_SECONDS, help="Timed duration per extractor.")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failed = False
+
+    diffs = check_outputs(corpus, update=args.update)
+    if args.update:
+        print(f"Golden outputs of {len(corpus)} pages written to {GOLDEN_DIR}")
+    for platform, name, mode, difference in diffs:
+        print(f"DIFF {platform}/{name} [{mode}]: {difference}")
+    if not args.update:
+        print(f"{len(corpus)} pages, {len(diffs)} output diff(s)")
+    failed |= bool(diffs)
+
+    if not args.outputs_only:
+        results = {name: benchmark(calls, args.seconds) for name, calls in benchmark_cases(corpus).items()}
+        for name, result in results.items():
+            print(f"{name:30} {result['pages_per_second']:>10} pages/s  {result['us_per_field']:>8} us/field  "
+                  f"{result['peak_kb']:>8} KB peak")
+
+        if args.update:
+            with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+                file.write('\n')
+            print(f"Baseline written to {BASELINE_PATH}")
+        elif os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH, 'r', encoding='utf-8') as file:
+                baseline = json.load(file)
+            for name, pages_per_second, expected in check_throughput(results, baseline, args.threshold):
+                print(f"REGRESSION {name}: {pages_per_second} pages/s, baseline {expected} pages/s")
+                failed = True
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,133 @@
+"""
+Offsets of the fixed markers of a scraped page (RegExNode.py / RegExNodeNoAI.py).
+
+Validation (invalid_output) and segmentation (extract_tiktok_post_info, the Instagram
+" is muted" blocks) used to rescan the whole page for the same markers, and a missing
+marker costs a scan of the full text every time it is looked for. A PageMarkers index is
+built once per page and shared: each marker (or marker regex) is searched at most once,
+its offsets are kept and reused by every later check.
+
+Markers are located with str.find rather than a multi-pattern automaton: on 1 MB scrapes a
+single re alternation pass (or a pure-Python Aho-Corasick) is several times slower than
+CPython's C-level substring search, so a find per distinct marker is the fastest "one pass".
+"""
+import bisect
+import re
+
+TIKTOK_POLICY_MARKER = "& Policies© 2025 TikTok"
+TIKTOK_TITLE_MARKER = "| TikTok"
+TIKTOK_RECOMMENDATIONS_MARKER = "You may like"
+INSTAGRAM_MUTED_MARKER = " is muted"
+TIKTOK_TIMER_PATTERN = re.compile(r'\d\d:\d\d\s*/\s*\d\d:\d\d')  # Video pages only (not images)
+
+# invalid_output checks, per platform
+TIKTOK_REQUIRED_MARKERS = (TIKTOK_POLICY_MARKER, TIKTOK_TITLE_MARKER)
+INSTAGRAM_REQUIRED_MARKERS = ("Audio is muted", "•Follow", "Like", "Comment", "Share")
+
+
+class PageMarkers:
+    """
+    Lazily built index of marker offsets in a page.
+
+    Args:
+        text (str): The scraped page.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._first = {}  # marker -> first offset (-1 if missing)
+        self._all = {}  # marker -> every (non-overlapping) offset
+        self._searches = {}  # compiled regex -> first match (or None)
+
+    def first(self, marker):
+        """Offset of the first occurrence of marker, -1 if missing (str.find)."""
+        offset = self._first.get(marker)
+        if offset is None:
+            offset = self._first[marker] = self.text.find(marker)
+        return offset
+
+    def __contains__(self, marker):
+        return self.first(marker) != -1
+
+    def all(self, marker):
+        """Offsets of every occurrence of marker, in order."""
+        offsets = self._all.get(marker)
+        if offsets is None:
+            offsets, find = [], self.text.find
+            offset = self.first(marker)
+            while offset != -1:
+                offsets.append(offset)
+                offset = find(marker, offset + len(marker))
+            self._all[marker] = offsets
+        return offsets
+
+    def next(self, marker, start):
+        """Offset of the first occurrence of marker at or after start, -1 if none."""
+        offsets = self._all.get(marker)
+        if offsets is None:
+            first = self.first(marker)
+            return first if first == -1 or first >= start else self.text.find(marker, start)
+        index = bisect.bisect_left(offsets, start)
+        return offsets[index] if index < len(offsets) else -1
+
+    def blocks(self, marker):
+        """
+        Yield the (start, end) offsets of the text after each occurrence of marker, up to the
+        next one (the last block runs to the end of the page).
+        """
+        offsets = self.all(marker)
+        for index, offset in enumerate(offsets):
+            yield offset + len(marker), offsets[index + 1] if index + 1 < len(offsets) else len(self.text)
+
+    def search(self, regex):
+        """First match of a compiled regex in the page (cached)."""
+        if regex not in self._searches:
+            self._searches[regex] = regex.search(self.text)
+        return self._searches[regex]
+
+    def missing(self, markers):
+        """Whether any of markers is missing from the page."""
+        return any(marker not in self for marker in markers)
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    # Benchmark on ~1 MB pages recorded from the sample scrapes (tiktok/, instagram/)
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def rescans(page):
+        # What validation + segmentation did before: every check scans the page again
+        tiktok_invalid = (TIKTOK_POLICY_MARKER not in page or TIKTOK_TITLE_MARKER not in page
+                          or not TIKTOK_TIMER_PATTERN.search(page))
+        recommendations = page.find(TIKTOK_RECOMMENDATIONS_MARKER)
+        policy = page[:recommendations if recommendations != -1 else len(page)].find(TIKTOK_POLICY_MARKER)
+        instagram_invalid = any(marker not in page for marker in INSTAGRAM_REQUIRED_MARKERS)
+        first_muted = page.find(INSTAGRAM_MUTED_MARKER)
+        second_muted = page.find(INSTAGRAM_MUTED_MARKER, first_muted + 1)
+        return tiktok_invalid, policy, instagram_invalid, first_muted, second_muted
+
+    def indexed(page):
+        markers = PageMarkers(page)
+        tiktok_invalid = markers.missing(TIKTOK_REQUIRED_MARKERS) or not markers.search(TIKTOK_TIMER_PATTERN)
+        recommendations = markers.first(TIKTOK_RECOMMENDATIONS_MARKER)
+        policy = markers.first(TIKTOK_POLICY_MARKER)
+        if recommendations != -1 and policy >= recommendations:
+            policy = -1
+        instagram_invalid = markers.missing(INSTAGRAM_REQUIRED_MARKERS)
+        first_muted = markers.first(INSTAGRAM_MUTED_MARKER)
+        second_muted = markers.next(INSTAGRAM_MUTED_MARKER, first_muted + 1)
+        return tiktok_invalid, policy, instagram_invalid, first_muted, second_muted
+
+    for platform in ("tiktok", "instagram"):
+        with open(os.path.join(base_dir, platform, "test-1"), encoding="utf-8") as file:
+            sample = file.read()
+        page = (sample * (1024 * 1024 // len(sample) + 1))[:1024 * 1024]
+        assert rescans(page) == indexed(page)
+        for function in (rescans, indexed):
+            runs = 20
+            start = time.perf_counter()
+            for _ in range(runs):
+                function(page)
+            print(f"{platform} 1 MB page, {function.__name__}: {(time.perf_counter() - start) / runs * 1000:.2f} ms/page")
@@ -0,0 +1,369 @@
+"""
+Persistent cache of the regex patterns generated by the LLM for AI_Prompt fields (RegExNode.py).
+
+Generating a pattern is a blocking Gemini call, for every AI_Prompt field of every run, even
+when the same prompt produced a working pattern many times before. Patterns are cached here
+by (field name, prompt, findall/search mode, platform), in a small SQLite file shared by
+the runs on this machine:
+    - only patterns that compile and match the text they were generated for are stored
+    - the compiled pattern is kept in memory, a hit costs no network call and no re.compile
+    - least recently used entries are evicted past MAX_PATTERNS, entries expire after PATTERN_TTL
+    - a cached pattern that keeps matching nothing (MAX_PATTERN_MISSES runs in a row) is
+      invalidated, and any entry can be invalidated by hand (invalidate / `python pattern_cache.py`)
+The misses of one scrape are generated concurrently (iter_resolved_ai_patterns), with a timeout
+per call and a process-wide cap on the calls in flight (timed out calls count until they return).
+"""
+import collections
+import hashlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+PATTERN_CACHE_PATH = os.getenv(
+    "REGEX_PATTERN_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".regex_pattern_cache.sqlite3")
+)
+MAX_PATTERNS = 1000
+PATTERN_TTL = 30 * 24 * 3600  # seconds
+MAX_PATTERN_MISSES = 3
+AI_PATTERN_CONCURRENCY = 4  # LLM calls in flight per scrape
+AI_PATTERN_TIMEOUT = 30  # seconds per LLM call
+SLOT_POLL_INTERVAL = 0.05  # seconds
+
+# LLM calls in flight in the process, timed out ones included (released when the call returns)
+_generation_slots = threading.BoundedSemaphore(AI_PATTERN_CONCURRENCY)
+
+
+def clean_generated_pattern(text):
+    """
+    Strip what LLMs wrap a pattern in (code fences, backticks, quotes, a leading r).
+    Returns None for empty / error responses.
+    """
+    if not text or not isinstance(text, str) or text == "No response" or text.startswith("Error: "):
+        return None
+    pattern = text.strip()
+    fence = re.fullmatch(r"```[\w-]*\s*\n?(.*?)\n?\s*```", pattern, re.DOTALL)
+    if fence:
+        pattern = fence.group(1).strip()
+    pattern = pattern.strip("`").strip()
+    quoted = re.fullmatch(r"r?(['\"])(.*)\1", pattern, re.DOTALL)
+    if quoted:
+        pattern = quoted.group(2)
+    return pattern or None
+
+
+def validate_pattern(pattern, text, all_matches, matcher=None):
+    """
+    Compiled pattern if it compiles and matches `text` (the sample it was generated for), else None.
+    With a GuardedMatcher (regex_guard.py) the sample is matched in guarded mode.
+    """
+    try:
+        compiled = re.compile(pattern)
+    except (re.error, TypeError):
+        return None
+    if matcher is not None:
+        ok, value = matcher.match_many(text, [(compiled.pattern, compiled.flags, all_matches)])[0]
+        return compiled if ok and value is not None else None
+    matched = compiled.findall(text) if all_matches else compiled.search(text)
+    return compiled if matched else None
+
+
+class PatternCache:
+    """
+    SQLite-backed cache of generated patterns, with an in-process map of compiled patterns.
+
+    Args:
+        path (str): SQLite file (':memory:' for a throwaway cache).
+        max_entries (int): LRU bound (by last use).
+        ttl (int): Seconds an entry is trusted after being generated.
+        clock (callable): Time source (seconds), injectable for tests.
+    """
+
+    def __init__(self, path=PATTERN_CACHE_PATH, max_entries=MAX_PATTERNS, ttl=PATTERN_TTL, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+
+        self._compiled = {}  # key -> compiled pattern
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS patterns (
+                key TEXT PRIMARY KEY,
+                field_name TEXT, prompt TEXT, mode TEXT, platform TEXT,
+                pattern TEXT NOT NULL,
+                created_at REAL, last_used REAL,
+                hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0
+            )
+        """)
+        self._connection.commit()
+
+    @staticmethod
+    def key(field_name, prompt, all_matches, platform):
+        mode = "findall" if all_matches else "search"
+        raw = json.dumps([field_name, prompt, mode, platform or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, field_name, prompt, all_matches, platform):
+        """Return the cached compiled pattern, or None."""
+        key = self.key(field_name, prompt, all_matches, platform)
+        now = self.clock()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT pattern, created_at FROM patterns WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._compiled.pop(key, None)
+                return None
+            pattern, created_at = row
+            if now - created_at > self.ttl:
+                self._delete(key)
+                return None
+
+            self._connection.execute(
+                "UPDATE patterns SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+
+            compiled = self._compiled.get(key)
+            if compiled is None or compiled.pattern != pattern:
+                compiled = self._compiled[key] = re.compile(pattern)
+            return compiled
+
+    def put(self, field_name, prompt, all_matches, platform, compiled):
+        """Store a validated compiled pattern, evicting the least recently used entries over the bound."""
+        key = self.key(field_name, prompt, all_matches, platform)
+        now = self.clock()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO patterns "
+                "(key, field_name, prompt, mode, platform, pattern, created_at, last_used, hits, misses) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0)",
+                (key, field_name, prompt, "findall" if all_matches else "search", platform or "",
+                 compiled.pattern, now, now)
+            )
+            self._compiled[key] = compiled
+
+            overflow = self._connection.execute("SELECT count(*) FROM patterns").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                for (old_key,) in self._connection.execute(
+                    "SELECT key FROM patterns ORDER BY last_used LIMIT ?", (overflow,)
+                ).fetchall():
+                    self._delete(old_key, commit=False)
+            self._connection.commit()
+
+    def record_result(self, field_name, prompt, all_matches, platform, matched):
+        """Track whether a cached pattern matched, invalidating it after MAX_PATTERN_MISSES misses in a row."""
+        key = self.key(field_name, prompt, all_matches, platform)
+        with self._lock:
+            if matched:
+                self._connection.execute("UPDATE patterns SET misses = 0 WHERE key = ?", (key,))
+            else:
+                self._connection.execute("UPDATE patterns SET misses = misses + 1 WHERE key = ?", (key,))
+                self._connection.execute(
+                    "DELETE FROM patterns WHERE key = ? AND misses >= ?", (key, MAX_PATTERN_MISSES)
+                )
+            self._connection.commit()
+
+    def invalidate(self, field_name=None, prompt=None, pattern=None):
+        """Drop the entries matching every given filter (all entries without filters). Returns the count."""
+        filters = {"field_name": field_name, "prompt": prompt, "pattern": pattern}
+        where = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        values = [value for value in filters.values() if value is not None]
+        with self._lock:
+            keys = [key for (key,) in self._connection.execute(
+                "SELECT key FROM patterns" + (" WHERE " + " AND ".join(where) if where else ""), values
+            ).fetchall()]
+            for key in keys:
+                self._delete(key, commit=False)
+            self._connection.commit()
+        return len(keys)
+
+    def entries(self):
+        """Cached entries (for inspection), most recently used first."""
+        cursor = self._connection.execute(
+            "SELECT field_name, prompt, mode, platform, pattern, hits, misses FROM patterns ORDER BY last_used DESC"
+        )
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _delete(self, key, commit=True):
+        # Caller holds the lock
+        self._connection.execute("DELETE FROM patterns WHERE key = ?", (key,))
+        self._compiled.pop(key, None)
+        if commit:
+            self._connection.commit()
+
+
+def _new_pattern(cache, field_name, text, all_matches, prompt, platform, generate, matcher=None):
+    # Cache miss: generate, clean and validate a pattern (cached if it matches `text`)
+    response = generate()
+    pattern = clean_generated_pattern(response)
+    if pattern is None:
+        return None, response, False
+
+    compiled = validate_pattern(pattern, text, all_matches, matcher)
+    if compiled is None:
+        # Not cached, but still applied like before (it may be valid and just not match this text)
+        try:
+            return re.compile(pattern), pattern, False
+        except re.error:
+            return None, pattern, False
+
+    if cache is not None:
+        cache.put(field_name, prompt, all_matches, platform, compiled)
+    return compiled, pattern, False
+
+
+def resolve_ai_pattern(cache, field_name, text, all_matches, prompt, platform, generate):
+    """
+    Compiled pattern for an AI_Prompt field: from the cache, else from `generate()` (the LLM call).
+
+    Args:
+        generate (callable): Returns the raw LLM response (only called on a miss).
+
+    Returns:
+        tuple: (compiled pattern or None, raw response / error to report, from_cache)
+    """
+    if cache is not None:
+        compiled = cache.get(field_name, prompt, all_matches, platform)
+        if compiled is not None:
+            return compiled, compiled.pattern, True
+    return _new_pattern(cache, field_name, text, all_matches, prompt, platform, generate)
+
+
+def iter_resolved_ai_patterns(cache, requests, text, platform, generate,
+                              max_workers=AI_PATTERN_CONCURRENCY, timeout=AI_PATTERN_TIMEOUT, matcher=None,
+                              slots=None):
+    """
+    Resolve the patterns of several AI_Prompt fields, generating the cache misses concurrently.
+
+    Cache hits are yielded first, then the generated patterns as they arrive. A call still
+    running after `timeout` seconds is abandoned (its field is yielded with an error) and
+    its place goes to the next field, so one hung call doesn't stall the others. Every call
+    holds one of the process-wide `slots` until it returns, abandoned or not: a hung provider
+    can't pile up more than AI_PATTERN_CONCURRENCY calls, across fields and node calls. Fields
+    that find no free slot within `timeout` seconds are yielded with an error.
+
+    Args:
+        requests (list): (field_name, all_matches, prompt) of each field.
+        generate (callable): generate(field_name, all_matches, prompt) -> raw LLM response.
+        max_workers (int): LLM calls in flight at once for these fields.
+        timeout (float): Seconds allowed per call (and to wait for a free slot).
+        matcher (GuardedMatcher): Validate the generated patterns in guarded mode (regex_guard.py).
+        slots (threading.Semaphore): Calls in flight in the process (default: _generation_slots).
+
+    Yields:
+        tuple: (request, compiled pattern or None, raw response / error to report, from_cache)
+    """
+    slots = _generation_slots if slots is None else slots
+    misses = []
+    for request in requests:
+        field_name, all_matches, prompt = request
+        compiled = cache.get(field_name, prompt, all_matches, platform) if cache is not None else None
+        if compiled is not None:
+            yield request, compiled, compiled.pattern, True
+        else:
+            misses.append(request)
+
+    results = queue.Queue()
+
+    def work(index):
+        field_name, all_matches, prompt = misses[index]
+        try:
+            result = _new_pattern(
+                cache, field_name, text, all_matches, prompt, platform,
+                lambda: generate(field_name, all_matches, prompt), matcher
+            )
+        except Exception as e:
+            result = (None, f"Error: {type(e).__name__}: {e}", False)
+        finally:
+            slots.release()
+        results.put((index, result))
+
+    waiting = collections.deque(range(len(misses)))
+    running = {}  # index -> deadline
+    slot_deadline = None  # Set while the next field waits for a free slot
+    while waiting or running:
+        while waiting and len(running) < max_workers:
+            if not slots.acquire(blocking=False):
+                if slot_deadline is None:
+                    slot_deadline = time.monotonic() + timeout
+                break
+            slot_deadline = None
+            index = waiting.popleft()
+            running[index] = time.monotonic() + timeout
+            # Daemon threads: an abandoned call can't keep the process alive
+            threading.Thread(target=work, args=(index,), daemon=True).start()
+
+        if slot_deadline is not None and not running:
+            # The slots are held by abandoned calls or other node calls: wait for one to return
+            if slots.acquire(timeout=max(0, slot_deadline - time.monotonic())):
+                slots.release()
+                continue
+            while waiting:
+                yield misses[waiting.popleft()], None, f"Error: no free generation slot after {timeout}s", False
+            break
+
+        deadlines = list(running.values())
+        if slot_deadline is not None:
+            # A slot freed by another node call doesn't post here: check again shortly
+            deadlines.append(min(slot_deadline, time.monotonic() + SLOT_POLL_INTERVAL))
+        try:
+            index, result = results.get(timeout=max(0, min(deadlines) - time.monotonic()))
+        except queue.Empty:
+            now = time.monotonic()
+            for index, deadline in list(running.items()):
+                if deadline <= now:
+                    del running[index]
+                    yield misses[index], None, f"Error: timed out after {timeout}s", False
+            continue
+
+        if index in running:  # Else it already timed out
+            del running[index]
+            yield (misses[index],) + result
+
+
+_default_cache = None
+_default_cache_disabled = False
+_default_cache_lock = threading.Lock()
+
+
+def get_pattern_cache():
+    """
+    Process-wide cache on PATTERN_CACHE_PATH (created on first use), or None when the file
+    can't be opened or created (read-only or sandboxed runtime): patterns are then generated every run.
+    """
+    global _default_cache, _default_cache_disabled
+    with _default_cache_lock:
+        if _default_cache is None and not _default_cache_disabled:
+            try:
+                _default_cache = PatternCache(PATTERN_CACHE_PATH)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Pattern cache disabled, {PATTERN_CACHE_PATH} is not writable: {str(e)}")
+                _default_cache_disabled = True
+        return _default_cache
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect / invalidate the generated regex pattern cache.")
+    parser.add_argument("command", choices=("list", "invalidate"))
+    parser.add_argument("--field", help="Only entries of this field name.")
+    parser.add_argument("--prompt", help="Only entries of this AI prompt.")
+    parser.add_argument("--pattern", help="Only entries with this pattern.")
+    args = parser.parse_args()
+
+    if get_pattern_cache() is None:
+        raise SystemExit(1)
+
+    if args.command == "list":
+        for entry in get_pattern_cache().entries():
+            print(entry)
+    elif args.command == "invalidate":
+        print(f"Invalidated {get_pattern_cache().invalidate(args.field, args.prompt, args.pattern)} pattern(s)")
@@ -0,0 +1,239 @@
+"""
+Client of the GumLoop pipeline API, used to re-trigger a scrape (RegExNode.py / RegExNodeNoAI.py).
+
+call_pipeline_api opened a new urllib connection per call, without a timeout or a retry, and
+passed the HEADER env string where a headers mapping is expected; api_call flipped "Use
+Advanced Scraping?" on every invalid page, so a second invalid page turned it off again.
+PipelineClient is shared by the calls of a process (get_pipeline_client):
+    - one requests.Session: keep-alive connections to the API are reused
+    - connect / read timeouts on every request
+    - connection errors and 429 / 502 / 503 / 504 answers are retried with jittered exponential
+      backoff (Retry-After honored). A read timeout is not retried: the run may have started
+    - a circuit breaker stops re-triggering after BREAKER_FAILURES failed calls in a row, for
+      BREAKER_COOLDOWN seconds, then lets one trial call through (half open)
+    - a de-dup window: the same scraped URL is re-triggered at most once per DEDUP_WINDOW seconds
+"""
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PIPELINE_CONNECT_TIMEOUT = 5  # seconds
+PIPELINE_READ_TIMEOUT = 30  # seconds
+PIPELINE_RETRIES = 3  # retries after the first attempt
+BACKOFF_BASE = 0.5  # seconds, doubled per retry
+BACKOFF_MAX = 10  # seconds
+BREAKER_FAILURES = 5  # failed calls in a row that open the circuit
+BREAKER_COOLDOWN = 60  # seconds the circuit stays open
+DEDUP_WINDOW = 600  # seconds
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def parse_headers(header=None, bearer=None):
+    """
+    Headers mapping from the HEADER env value (a JSON object, or "Name: value" lines) and BEARER.
+    """
+    headers = {"Content-Type": "application/json"}
+    header = (header or "").strip()
+    if header.startswith("{"):
+        headers.update({str(name): str(value) for name, value in json.loads(header).items()})
+    else:
+        for line in header.replace(";", "\n").splitlines():
+            name, separator, value = line.partition(":")
+            if separator and name.strip():
+                headers[name.strip()] = value.strip()
+    if bearer and not any(name.lower() == "authorization" for name in headers):
+        headers["Authorization"] = f"Bearer {bearer}"
+    return headers
+
+
+def enable_advanced_scraping(payload):
+    """
+    Copy of a pipeline payload with "Use Advanced Scraping?" on for the Website Scraper node
+    (set, not toggled: a re-trigger always asks for the advanced scraper).
+    """
+    payload = copy.deepcopy(payload)
+    for node in (payload.get("pl_config") or {}).get("pipeline") or []:
+        if node.get("operator") == "Website Scraper" and "Use Advanced Scraping?" in node.get("parameters", {}):
+            node["parameters"]["Use Advanced Scraping?"] = "true"
+    return payload
+
+
+class CircuitBreaker:
+    """
+    Closed (calls go through) -> open after `failures` failed calls in a row (calls are refused)
+    -> half open after `cooldown` seconds (one trial call: closes on success, reopens on failure).
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failed = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half open" if self.clock() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        """Whether a call may go through now (takes the trial slot when half open)."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, success):
+        with self._lock:
+            self._trial = False
+            if success:
+                self.failed, self.opened_at = 0, None
+                return
+            self.failed += 1
+            if self.opened_at is not None or self.failed >= self.failures:
+                self.opened_at = self.clock()
+
+
+class PipelineClient:
+    """
+    Re-triggers pipeline runs on the pipeline API.
+
+    Args:
+        url (str): Pipeline API endpoint (API_URL).
+        headers (dict): Request headers (see parse_headers).
+        timeout (tuple): (connect, read) seconds.
+        retries (int): Retries of a failed attempt (connection errors, RETRY_STATUSES).
+        breaker (CircuitBreaker): Shared failure state.
+        dedup_window (float): Seconds during which a de-dup key isn't re-triggered.
+        session (requests.Session): Injectable (default: a keep-alive session).
+        sleep (callable): Injectable for tests.
+    """
+
+    def __init__(self, url, headers=None, timeout=(PIPELINE_CONNECT_TIMEOUT, PIPELINE_READ_TIMEOUT),
+                 retries=PIPELINE_RETRIES, breaker=None, dedup_window=DEDUP_WINDOW, session=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.url = url
+        self.headers = headers or parse_headers()
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.dedup_window = dedup_window
+        self.clock = clock
+        self.sleep = sleep
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._recent = {}  # de-dup key -> last trigger time
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        # Full jitter: spreads the retries of concurrent callers
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    def _claim(self, dedup_key):
+        # Whether dedup_key may be triggered now (and mark it as triggered)
+        now = self.clock()
+        with self._lock:
+            for key in [key for key, at in self._recent.items() if now - at >= self.dedup_window]:
+                del self._recent[key]
+            if dedup_key in self._recent:
+                return False
+            self._recent[dedup_key] = now
+            return True
+
+    def _release(self, dedup_key):
+        # A call that failed doesn't hold the window
+        with self._lock:
+            self._recent.pop(dedup_key, None)
+
+    def trigger(self, payload, dedup_key=None):
+        """
+        POST a pipeline payload.
+
+        Args:
+            payload (dict): Pipeline payload.
+            dedup_key (str): Skip the call when the same key was triggered within the de-dup
+                window (default: the payload itself).
+
+        Returns:
+            str or dict: The response text, or {"error": ...} / {"skipped": ...}.
+        """
+        if not self.url:
+            return {"error": "API_URL is not set"}
+        body = json.dumps(payload)
+        dedup_key = dedup_key or hashlib.sha256(body.encode("utf-8")).hexdigest()
+        if not self._claim(dedup_key):
+            return {"skipped": f"already re-triggered within the last {self.dedup_window}s"}
+        if not self.breaker.allow():
+            self._release(dedup_key)
+            return {"skipped": f"circuit open after {self.breaker.failed} failed calls"}
+
+        error = None
+        retry_after = None  # Retry-After of the last retryable response
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.sleep(self._backoff(attempt - 1, retry_after))
+                retry_after = None
+            try:
+                response = self.session.post(self.url, data=body, headers=self.headers, timeout=self.timeout)
+            except requests.exceptions.ReadTimeout as e:
+                error = f"Read timeout: {e}"
+                break
+            except requests.exceptions.RequestException as e:
+                error = f"URL error: {e}"
+                continue
+
+            if response.ok:
+                self.breaker.record(True)
+                return response.text
+            error = f"HTTP error: {response.status_code} {response.text}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+            retry_after = response.headers.get("Retry-After")
+
+        print(error)
+        self.breaker.record(False)
+        self._release(dedup_key)
+        return {"error": error}
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_pipeline_client():
+    """Process-wide client on API_URL, HEADER and BEARER (created on first use)."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = PipelineClient(
+                os.getenv("API_URL"), parse_headers(os.getenv("HEADER"), os.getenv("BEARER"))
+            )
+        return _default_client
+
@@ -0,0 +1,260 @@
+"""
+Guarded matching of user / LLM supplied regex patterns (regex_params of RegExNode.py / RegExNodeNoAI.py).
+
+Custom patterns run on whole scraped pages, and one catastrophically backtracking pattern
+can pin the process for minutes (re can't be interrupted from Python). In guarded mode:
+    - patterns with known exponential constructs are rejected before running: an unbounded
+      quantifier over a group that is itself just an unbounded quantifier ("(a+)+", "(\\w+\\s?)*",
+      "(.*)*"), or over an alternation whose branches start alike ("(ab|a.|c)*", when the parser
+      couldn't factor the common start out)
+    - texts longer than MAX_GUARDED_INPUT characters are not matched
+    - the matching runs in a worker process, with a hard GUARDED_MATCH_TIMEOUT per pattern: a
+      pattern still running is reported as timed out, the worker is killed and restarted for
+      the next patterns
+Possessive quantifiers and atomic groups (Python 3.11+) don't backtrack and are allowed.
+"""
+import functools
+import multiprocessing
+import re
+import threading
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+from regex_plan import match_field
+
+MAX_GUARDED_INPUT = 2_000_000  # characters
+GUARDED_MATCH_TIMEOUT = 2  # seconds per pattern
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+_ZERO_WIDTH = {sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT}
+_SINGLE_CHARACTER = {sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY}
+
+
+def _is_unbounded(op, av):
+    return op in _REPEATS and av[1] == sre_parse.MAXREPEAT
+
+
+def _is_nullable(op, av):
+    # Can match the empty string
+    if op in _REPEATS:
+        return av[0] == 0 or all(_is_nullable(*item) for item in av[2])
+    if op == sre_parse.SUBPATTERN:
+        return all(_is_nullable(*item) for item in av[-1])
+    if op == sre_parse.BRANCH:
+        return any(all(_is_nullable(*item) for item in branch) for branch in av[1])
+    return op in _ZERO_WIDTH
+
+
+def _contains_unbounded(items):
+    for op, av in items:
+        if _is_unbounded(op, av):
+            return True
+        if op == sre_parse.SUBPATTERN and _contains_unbounded(av[-1]):
+            return True
+        if op == sre_parse.BRANCH and any(_contains_unbounded(branch) for branch in av[1]):
+            return True
+    return False
+
+
+def _unwrap(items):
+    # The items of a body that is only a (nested) group
+    while len(items) == 1 and items[0][0] == sre_parse.SUBPATTERN:
+        items = list(items[0][1][-1])
+    return items
+
+
+def _is_ambiguous_body(items):
+    """Why repeating `items` can backtrack exponentially, or None."""
+    items = _unwrap(list(items))
+    required = [(op, av) for op, av in items if not _is_nullable(op, av)]
+    if not required and _contains_unbounded(items):
+        return "unbounded quantifier over a group that can match the empty string"
+    if len(required) == 1:
+        op, av = required[0]
+        if _is_unbounded(op, av) or (op == sre_parse.SUBPATTERN and len(_unwrap([(op, av)])) == 1
+                                     and _is_unbounded(*_unwrap([(op, av)])[0])):
+            return "nested unbounded quantifiers"
+        if op == sre_parse.BRANCH:
+            starts = [(branch[0][0], repr(branch[0][1])) for branch in av[1]
+                      if len(branch) and branch[0][0] in _SINGLE_CHARACTER]
+            if len(starts) != len(set(starts)):
+                return "unbounded quantifier over an alternation with overlapping branches"
+    return None
+
+
+def _find_unsafe(items):
+    for op, av in items:
+        if op in _REPEATS:
+            if av[1] == sre_parse.MAXREPEAT:
+                problem = _is_ambiguous_body(av[2])
+                if problem:
+                    return problem
+            problem = _find_unsafe(av[2])
+        elif op == sre_parse.SUBPATTERN:
+            problem = _find_unsafe(av[-1])
+        elif op == sre_parse.BRANCH:
+            problem = next((p for p in map(_find_unsafe, av[1]) if p), None)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            problem = _find_unsafe(av[1])
+        else:
+            continue  # Literals, classes, and atomic groups / possessive repeats (no backtracking)
+        if problem:
+            return problem
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def unsafe_construct(pattern, flags=0):
+    """
+    Why `pattern` is rejected in guarded mode (a known exponential construct), or None.
+    Patterns that don't parse return None (their re.error is reported when compiling).
+    """
+    try:
+        return _find_unsafe(sre_parse.parse(pattern, flags))
+    except Exception:
+        return None
+
+
+def _match_worker(connection):
+    # Worker process: receives (text, [(pattern, flags, all_matches)]), answers one result per pattern
+    compiled = {}
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        text, patterns = job
+        for pattern, flags, all_matches in patterns:
+            try:
+                regex = compiled.get((pattern, flags))
+                if regex is None:
+                    if len(compiled) >= 256:
+                        compiled.clear()
+                    regex = compiled[(pattern, flags)] = re.compile(pattern, flags)
+                connection.send((True, match_field(regex, all_matches, text)))
+            except Exception as e:
+                connection.send((False, f"{type(e).__name__}: {e}"))
+
+
+class GuardedMatcher:
+    """
+    Runs custom patterns in a worker process, with a hard timeout per pattern.
+
+    Args:
+        timeout (float): Seconds allowed per pattern.
+        max_input (int): Longest text (characters) matched.
+    """
+
+    def __init__(self, timeout=GUARDED_MATCH_TIMEOUT, max_input=MAX_GUARDED_INPUT):
+        self.timeout = timeout
+        self.max_input = max_input
+        self._lock = threading.Lock()
+        self._process = None
+        self._connection = None
+
+    def _start(self):
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_match_worker, args=(child,), daemon=True)
+        self._process.start()
+        child.close()
+        self._connection = parent
+
+    def _kill(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._connection.close()
+        self._process = self._connection = None
+
+    def match_many(self, text, patterns):
+        """
+        Match several patterns on one text.
+
+        Args:
+            patterns (list): (pattern, flags, all_matches) of each field.
+
+        Returns:
+            list: (True, field value) or (False, why it wasn't matched), per pattern.
+        """
+        results = [None] * len(patterns)
+        todo = []
+        for index, (pattern, flags, all_matches) in enumerate(patterns):
+            problem = unsafe_construct(pattern, flags)
+            if problem:
+                results[index] = (False, f"pattern rejected ({problem})")
+            elif len(text) > self.max_input:
+                results[index] = (False, f"text of {len(text)} characters is over the {self.max_input} characters limit")
+            else:
+                todo.append(index)
+
+        with self._lock:
+            while todo:
+                if self._process is None or not self._process.is_alive():
+                    self._kill()
+                    self._start()
+                self._connection.send((text, [patterns[index] for index in todo]))
+
+                for position, index in enumerate(todo):
+                    try:
+                        ready = self._connection.poll(self.timeout)
+                        result = self._connection.recv() if ready else None
+                    except (EOFError, OSError):
+                        ready, result = True, (False, "matching worker died")
+                        self._kill()
+                    if not ready:
+                        # Still backtracking: kill it, the next patterns go to a new worker
+                        self._kill()
+                        result = (False, f"timed out after {self.timeout}s")
+                    results[index] = result
+                    if self._process is None:
+                        todo = todo[position + 1:]
+                        break
+                else:
+                    todo = []
+        return results
+
+    def close(self):
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                try:
+                    self._connection.send(None)
+                except OSError:
+                    pass
+            self._kill()
+
+
+_default_matcher = None
+_default_matcher_lock = threading.Lock()
+
+
+def get_guarded_matcher():
+    """Process-wide matcher (its worker is started on first use)."""
+    global _default_matcher
+    with _default_matcher_lock:
+        if _default_matcher is None:
+            _default_matcher = GuardedMatcher()
+        return _default_matcher
+
+
+if __name__ == "__main__":
+    import time
+
+    for pattern in [r"@([\w\.-]+)", r"(a+)+$", r"(\w+\s?)*$", r"(.*)*x", r"(ab|a.|c)*$", r"(ab|ac)*$", r"(\s*,\s*\w+)*", r"(\w+\s+)+"]:
+        print(f"{pattern!r:24} {unsafe_construct(pattern) or 'ok'}")
+
+    matcher = GuardedMatcher(timeout=1)
+    text = "Shirt by @GruntStyle " + "1" * 40 + "!"
+    start = time.perf_counter()
+    results = matcher.match_many(text, [
+        (r"@([\w\.-]+)", 0, True),
+        (r"(\d|\d\d)*$", 0, False),  # Exponential, not caught statically: timed out
+        (r"(a+)+$", 0, False),  # Rejected
+        (r"by @(\w+)", 0, False),
+    ])
+    print(results, f"{time.perf_counter() - start:.2f}s")
+    matcher.close()
@@ -0,0 +1,203 @@
+"""
+Compiled "regex plan" of a node's regex_params (RegExNode.py / RegExNodeNoAI.py).
+
+regex_params is a list of JSON-like strings, one per custom field. They used to be parsed
+(string replace hacks + json.loads) and their patterns compiled (implicitly, by re.search /
+re.findall) on every call, for every scraped page. A RegexPlan does the parsing, validation
+and compilation once; plans are kept in a bounded LRU keyed by the fingerprint of the
+params, so runs over many pages with the same params only pay for the matching.
+"""
+import collections
+import hashlib
+import json
+import re
+import threading
+
+MAX_PLANS = 128
+
+
+def parse_regex_pattern(pattern_str):
+    """Parse a JSON-formatted string into pattern components"""
+    try:
+        # Escape backslashes in the pattern before JSON parsing
+        pattern_str = pattern_str.replace('\\', '\\\\')
+        # Convert Python literals to JSON format
+        pattern_str = pattern_str.replace('True', 'true').replace('False', 'false').replace('None', 'null')
+
+        # Parse JSON
+        pattern_info = json.loads(pattern_str)
+
+        # Convert string "true"/"false" to boolean if needed
+        if isinstance(pattern_info.get("all_matches"), str):
+            pattern_info["all_matches"] = pattern_info["all_matches"].lower() == "true"
+
+        return pattern_info
+
+    except json.JSONDecodeError as e:
+        print(f"Error parsing pattern string: {e}")
+        print(f"Problematic string: {pattern_str}")
+        return None
+
+
+def match_field(compiled, all_matches, text):
+    """
+    Value of a custom field: the set of all matches (re.findall mode), or the first
+    group / whole match of the first match (re.search mode). None when nothing matches.
+    """
+    if all_matches:
+        matches = compiled.findall(text)
+        return set(matches) if matches else None
+    match = compiled.search(text)
+    return match.group(1) if match and match.groups() else match.group(0) if match else None
+
+
+class PlanField:
+    """
+    One custom field of a plan.
+
+    Attributes:
+        field_name (str): Output key.
+        regex (re.Pattern): Compiled pattern (None for AI_Prompt fields and errors).
+        all_matches (bool): re.findall mode instead of re.search.
+        ai_prompt (str): Prompt to generate the pattern from (RegExNode only).
+        error (str): Why the field can't be extracted (reported, the field is set to None).
+    """
+    __slots__ = ('field_name', 'regex', 'all_matches', 'ai_prompt', 'error')
+
+    def __init__(self, field_name, regex=None, all_matches=False, ai_prompt=None, error=None):
+        self.field_name = field_name
+        self.regex = regex
+        self.all_matches = all_matches
+        self.ai_prompt = ai_prompt
+        self.error = error
+
+
+class RegexPlan:
+    """
+    Parsed, validated and compiled regex_params.
+
+    Args:
+        regex_params (list): JSON-like strings ({"field_name": ..., "pattern": ..., "all_matches": ..., "AI_Prompt": ...}).
+        allow_ai (bool): AI_Prompt fields are kept (RegExNode); without AI a field needs a pattern.
+    """
+
+    def __init__(self, regex_params, allow_ai=False):
+        self.fingerprint = plan_fingerprint(regex_params, allow_ai)
+        self.fields = []
+
+        for pattern_info in (p for p in (parse_regex_pattern(p) for p in regex_params) if p):
+            field_name = pattern_info.get("field_name")
+            if "pattern" not in pattern_info:
+                if field_name:
+                    self.fields.append(PlanField(field_name, error="'pattern'"))
+                continue
+
+            pattern = pattern_info["pattern"]
+            all_matches = pattern_info.get("all_matches", False)
+            ai_prompt = pattern_info.get("AI_Prompt") if allow_ai else None
+
+            if allow_ai:
+                if not field_name or (not pattern and not ai_prompt) or (pattern and ai_prompt):
+                    continue
+            elif not field_name or not pattern:
+                continue
+
+            if ai_prompt:
+                self.fields.append(PlanField(field_name, all_matches=all_matches, ai_prompt=ai_prompt))
+                continue
+
+            try:
+                regex = re.compile(rf"{pattern}")
+            except (re.error, TypeError) as e:
+                self.fields.append(PlanField(field_name, error=str(e)))
+                continue
+            self.fields.append(PlanField(field_name, regex, all_matches))
+
+    def apply(self, text, info_dict, matcher=None):
+        """
+        Add the custom fields with a pattern to info_dict (in place).
+
+        Args:
+            matcher (GuardedMatcher): Match in guarded mode (see regex_guard.py) instead of in-process.
+
+        Returns:
+            list: The AI_Prompt fields (PlanField), still to resolve. They are set to None
+            in info_dict meanwhile, so the fields keep the params order.
+        """
+        pending, guarded = [], []
+        for field in self.fields:
+            if field.error:
+                print(f"Error processing pattern for field '{field.field_name}': {field.error}")
+                info_dict[field.field_name] = None
+            elif field.ai_prompt:
+                info_dict[field.field_name] = None
+                pending.append(field)
+            elif matcher is not None:
+                info_dict[field.field_name] = None
+                guarded.append(field)
+            else:
+                info_dict[field.field_name] = match_field(field.regex, field.all_matches, text)
+
+        if guarded:
+            results = matcher.match_many(
+                text, [(field.regex.pattern, field.regex.flags, field.all_matches) for field in guarded]
+            )
+            for field, (ok, value) in zip(guarded, results):
+                if not ok:
+                    print(f"Error processing pattern for field '{field.field_name}': {value}")
+                info_dict[field.field_name] = value if ok else None
+        return pending
+
+
+def plan_fingerprint(regex_params, allow_ai=False):
+    """Stable hash of regex_params (and the mode they are read in)."""
+    raw = json.dumps([bool(allow_ai), list(regex_params)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+_plans = collections.OrderedDict()  # fingerprint -> RegexPlan
+_plans_lock = threading.Lock()
+
+
+def get_regex_plan(regex_params, allow_ai=False):
+    """The plan of regex_params, built on first use and reused (LRU of MAX_PLANS plans)."""
+    fingerprint = plan_fingerprint(regex_params, allow_ai)
+    with _plans_lock:
+        plan = _plans.get(fingerprint)
+        if plan is not None:
+            _plans.move_to_end(fingerprint)
+            return plan
+
+    plan = RegexPlan(regex_params, allow_ai)
+    with _plans_lock:
+        _plans[fingerprint] = plan
+        while len(_plans) > MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+
+if __name__ == "__main__":
+    import time
+
+    regex_params = [
+        '{"field_name": "mentions","pattern": "@([\\w\\.-]+)","all_matches": True, "AI_Prompt": None}',
+        '{"field_name": "hashtags","pattern": "#(\\w+)","all_matches": True, "AI_Prompt": None}',
+        '{"field_name": "timer","pattern": "(\\d\\d:\\d\\d) / \\d\\d:\\d\\d","all_matches": False, "AI_Prompt": None}',
+    ]
+    text = "00:02 / 00:08 kagan_dunlap Shirt by @GruntStyle #fyp #miltok @ABIABI " * 20
+    runs = 10000
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        info = {}
+        RegexPlan(regex_params).apply(text, info)
+    rebuilt = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        info = {}
+        get_regex_plan(regex_params).apply(text, info)
+    cached = time.perf_counter() - start
+
+    print(info)
+    print(f"plan rebuilt per call: {rebuilt / runs * 1e6:.1f} us/call, cached plan: {cached / runs * 1e6:.1f} us/call")
@@ -0,0 +1,241 @@
+"""
+Batch mode of the scrape extraction nodes (RegExNode.py / RegExNodeNoAI.py).
+
+main(url, scraped_data, regex_params, params) handles one URL per call. Here an iterable of
+(url, scraped_data) pairs sharing one regex_params list is split into chunks, the chunks are
+processed by a pool of worker processes (the node and its regex plan are loaded once per
+worker), and the per-URL results are streamed back in completion order. ScrapeStats keeps
+the throughput, the latency per platform and the invalid page rates.
+
+Usage:
+    python scrape_batch.py tiktok/ results.jsonl
+    python scrape_batch.py scrapes.jsonl results.jsonl --regex-params params.json --workers 8
+    (scrapes.jsonl: one {"url": ..., "scraped_data": ...} per line; a directory holds files
+     with the URL on the first line and the scraped page after it)
+"""
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Workers import the nodes by name
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extractors import get_extractor
+from regex_plan import get_regex_plan
+
+SCRAPE_CHUNK_SIZE = 16  # pages per work unit
+NODES = ('RegExNode', 'RegExNodeNoAI')
+INVALID_OUTPUT = "Invalid scraped data"  # What the nodes return for a page that fails validation
+
+# Per worker process: (node main, regex_params, params)
+_worker_state = None
+
+
+def url_platform(url):
+    """Platform the nodes extract a URL as ('tiktok', 'instagram' or 'other')."""
+    return get_extractor(url).platform or "other"
+
+
+def _init_worker(node, regex_params, params):
+    global _worker_state
+    _worker_state = (importlib.import_module(node).main, list(regex_params), params)
+    # Build the shared plan once (parse errors are reported once per worker, not per page)
+    get_regex_plan(_worker_state[1], allow_ai=node == 'RegExNode')
+
+
+def extract_pages(pairs):
+    """
+    Run the node on a chunk of (url, scraped_data) pairs (in a worker process).
+
+    Returns:
+        list: One result dict per pair, see iter_scrape_results.
+    """
+    main, regex_params, params = _worker_state
+    results = []
+    for url, scraped_data in pairs:
+        start = time.perf_counter()
+        try:
+            output = main(url, scraped_data, regex_params, params)
+            status = "invalid" if output == INVALID_OUTPUT else "ok"
+        except Exception as e:
+            output, status = f"{type(e).__name__}: {e}", "error"
+        results.append({
+            "url": url,
+            "platform": url_platform(url),
+            "status": status,
+            "result": output,
+            "seconds": time.perf_counter() - start,
+        })
+    return results
+
+
+class ScrapeStats:
+    """Throughput, latency per platform and invalid page rates of a batch."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.latencies = {}  # platform -> [seconds]
+        self.statuses = {}  # platform -> {status: count}
+
+    def add(self, result):
+        platform = result["platform"]
+        self.latencies.setdefault(platform, []).append(result["seconds"])
+        counts = self.statuses.setdefault(platform, {})
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    def summary(self):
+        """
+        Returns:
+            dict: {'pages', 'seconds', 'pages_per_second', 'platforms': {platform: {'pages', 'ok', 'invalid',
+            'error', 'invalid_rate', 'latency_ms': {'mean', 'p50', 'p95', 'max'}}}}
+        """
+        elapsed = time.perf_counter() - self.start
+        pages = sum(len(latencies) for latencies in self.latencies.values())
+        platforms = {}
+        for platform, latencies in sorted(self.latencies.items()):
+            counts = self.statuses[platform]
+            ordered = sorted(latencies)
+            platforms[platform] = {
+                "pages": len(latencies),
+                "ok": counts.get("ok", 0),
+                "invalid": counts.get("invalid", 0),
+                "error": counts.get("error", 0),
+                "invalid_rate": round(counts.get("invalid", 0) / len(latencies), 4),
+                "latency_ms": {
+                    "mean": round(statistics.fmean(latencies) * 1000, 3),
+                    "p50": round(ordered[len(ordered) // 2] * 1000, 3),
+                    "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+                    "max": round(ordered[-1] * 1000, 3),
+                },
+            }
+        return {
+            "pages": pages,
+            "seconds": round(elapsed, 3),
+            "pages_per_second": round(pages / elapsed, 1) if elapsed else None,
+            "platforms": platforms,
+        }
+
+
+def iter_scrape_results(pairs, regex_params=(), params=None, node='RegExNode', workers=None,
+                        chunk_size=SCRAPE_CHUNK_SIZE, stats=None):
+    """
+    Extract many scraped pages with a process pool, yielding the results as they complete.
+
+    Args:
+        pairs (iterable): (url, scraped_data) pairs (consumed lazily, chunk by chunk).
+        regex_params (list): Custom regex params shared by every page.
+        params (dict): The node params (must be picklable: no "llm" / "pattern_cache" objects).
+        node (str): 'RegExNode' or 'RegExNodeNoAI'.
+        workers (int): Worker processes (default: CPU count), 1 runs in this process.
+        chunk_size (int): Pages per work unit.
+        stats (ScrapeStats): Updated with every result.
+
+    Yields:
+        dict: {'url', 'platform', 'status' ('ok', 'invalid' or 'error'), 'result' (node output
+        or error message), 'seconds'}, in completion order.
+    """
+    if node not in NODES:
+        raise ValueError(f"Unknown node '{node}', expected one of {NODES}.")
+    workers = workers or os.cpu_count() or 1
+    regex_params = list(regex_params)
+
+    def chunks():
+        chunk = []
+        for pair in pairs:
+            chunk.append(pair)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def collected(results):
+        for result in results:
+            if stats is not None:
+                stats.add(result)
+            yield result
+
+    if workers == 1:
+        _init_worker(node, regex_params, params)
+        for chunk in chunks():
+            yield from collected(extract_pages(chunk))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(node, regex_params, params)) as pool:
+        # Keep a bounded number of chunks in flight, the pages may be big and many
+        pending = set()
+        for chunk in chunks():
+            pending.add(pool.submit(extract_pages, chunk))
+            if len(pending) >= workers * 2:
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    yield from collected(future.result())
+        while pending:
+            completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                yield from collected(future.result())
+
+
+def iter_scrape_files(source):
+    """
+    Yield (url, scraped_data) pairs from a JSON lines file ({"url", "scraped_data"} per line)
+    or from a directory of scrapes (URL on the first line, the scraped page after it).
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.startswith('.'):
+                    continue
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as file:
+                    url, _, scraped_data = file.read().partition('\n')
+                yield url.strip(), scraped_data
+        return
+
+    with open(source, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record["url"], record["scraped_data"]
+
+
+def _json_default(value):
+    # Node outputs hold sets (hashtags, findall fields)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract post info from many scraped TikTok / Instagram pages.")
+    parser.add_argument('source', help="JSON lines file of {url, scraped_data}, or a directory of scrapes.")
+    parser.add_argument('output', help="Results file (JSON lines, in completion order).")
+    parser.add_argument('--regex-params', help="JSON file holding the regex_params list.")
+    parser.add_argument('--node', choices=NODES, default='RegExNodeNoAI')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=SCRAPE_CHUNK_SIZE)
+    parser.add_argument('--repeat', type=int, default=1, help="Feed the source this many times (benchmarking).")
+    args = parser.parse_args()
+
+    regex_params = []
+    if args.regex_params:
+        with open(args.regex_params, 'r', encoding='utf-8') as file:
+            regex_params = json.load(file)
+
+    def pairs():
+        for _ in range(args.repeat):
+            yield from iter_scrape_files(args.source)
+
+    stats = ScrapeStats()
+    with open(args.output, 'w', encoding='utf-8') as output:
+        for result in iter_scrape_results(pairs(), regex_params, node=args.node, workers=args.workers,
+                                          chunk_size=args.chunk_size, stats=stats):
+            output.write(json.dumps(result, ensure_ascii=False, default=_json_default) + '\n')
+    print(json.dumps(stats.summary(), indent=2))
@@ -0,0 +1,321 @@
+"""
+Cache of the post records extracted from scraped pages (RegExNode.py / RegExNodeNoAI.py).
+
+The same TikTok / Instagram post comes through the scraper and the nodes many times (re-shares,
+retries, several users saving the same video). When the node params opt in ("scrape_cache": True),
+extracted records are cached here by normalized URL, so a fresh hit skips the extraction, and the
+scraping too when the flow checks the cache first (`python scrape_cache.py check <url>`, or main
+called with empty scraped_data):
+    - URLs are normalized to the post id (TikTok video / photo id, Instagram shortcode), so
+      "?lang=en", "?igsh=...", "/reels/" vs "/reel/" or the handle in the path don't matter;
+      other URLs lose their fragment, utm_* parameters and, on TikTok / Instagram hosts, the
+      share parameters of those apps (SHARE_PARAMS): the rest of the query is kept
+    - freshness depends on the fields: counts go stale fast, captions and handles don't
+      (SCRAPE_FIELD_TTLS, per field type of SCRAPE_FIELD_TYPES). A record is reused while
+      the fields the caller needs ("fresh_fields", default: all of them) are fresh
+    - records are stored in a small SQLite file, least recently used entries are evicted
+      past MAX_SCRAPE_RECORDS; where that file can't be written (read-only runtime),
+      get_scrape_cache returns None and the nodes run uncached
+A record depends on the regex_params and the output params too, they are part of the key
+(record_variant), and "Invalid scraped data" is never cached.
+"""
+import collections
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+SCRAPE_CACHE_PATH = os.getenv(
+    "SCRAPE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".scrape_cache.sqlite3")
+)
+MAX_SCRAPE_RECORDS = 10000
+
+# Seconds a field stays fresh, per field type (SCRAPE_CACHE_TTLS='{"counts": 600}' overrides)
+SCRAPE_FIELD_TTLS = {
+    'counts': 3600,
+    'recommendations': 6 * 3600,
+    'custom': 3600,  # Custom regex / AI fields: could be anything, treated like counts
+    'text': 7 * 24 * 3600,
+}
+SCRAPE_FIELD_TTLS.update(json.loads(os.getenv("SCRAPE_CACHE_TTLS") or "{}"))
+
+# Field type of the node output keys (others are 'custom')
+SCRAPE_FIELD_TYPES = {
+    'post interactions': 'counts',
+    'likes': 'counts',
+    'comments': 'counts',
+    'Recommended Hashtags': 'recommendations',
+    'Recommendations': 'recommendations',
+    'video caption': 'text',
+    'creator handle': 'text',
+    'sound used': 'text',
+    'hashtags': 'text',
+    'video_url': 'text',
+    'source_url': 'text',
+    'platform': 'text',
+}
+
+# Query parameters the apps add when sharing a link, per platform (dropped from the URLs
+# without a post id, with utm_*); the query of any other site is kept as is
+SHARE_PARAMS = {
+    'tiktok': {
+        'is_from_webapp', 'sender_device', 'sender_web_id', 'is_copy_url', 'share_app_id', 'share_item_id',
+        'share_link_id', 'tt_from', 'u_code', 'user_id', 'timestamp', 'lang', '_r', '_t',
+    },
+    'instagram': {'igsh', 'igshid', 'hl'},
+    'other': set(),
+}
+
+_TIKTOK_ID = re.compile(r'/(?:@[^/]+/)?(?:video|photo|v|embed(?:/v2)?)/(\d+)')
+_INSTAGRAM_CODE = re.compile(r'/(?:[^/]+/)?(?:p|reels?|tv)/([\w-]+)')
+
+NormalizedUrl = collections.namedtuple('NormalizedUrl', 'platform video_id key')
+
+
+def normalize_url(url):
+    """
+    Normalize a post URL.
+
+    Returns:
+        NormalizedUrl: (platform, video id or None, cache key), e.g.
+        ('tiktok', '7462414004883885330', 'tiktok:7462414004883885330') for
+        https://www.tiktok.com/@zackbouery/video/7462414004883885330?lang=en
+    """
+    url = url.strip()
+    parts = urllib.parse.urlsplit(url if '//' in url else '//' + url)
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+
+    if 'tiktok' in host:
+        match = _TIKTOK_ID.search(parts.path)
+        if match:
+            return NormalizedUrl('tiktok', match.group(1), f"tiktok:{match.group(1)}")
+    elif 'instagram' in host:
+        match = _INSTAGRAM_CODE.search(parts.path)
+        if match:
+            return NormalizedUrl('instagram', match.group(1), f"instagram:{match.group(1)}")
+
+    # No post id (short links, other sites): the URL without share parameters
+    platform = 'tiktok' if 'tiktok' in host else 'instagram' if 'instagram' in host else 'other'
+    query = sorted(
+        (name, value) for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in SHARE_PARAMS[platform] and not name.lower().startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    key = f"{platform}:{host}{path}" + (f"?{urllib.parse.urlencode(query)}" if query else "")
+    return NormalizedUrl(platform, None, key)
+
+
+def record_variant(regex_params=(), allow_ai=False, **options):
+    """
+    Stable hash of what a record depends on besides the page: the regex_params (and the mode
+    they are read in) and the output options (all_posts, recommendations...).
+    """
+    raw = json.dumps([bool(allow_ai), list(regex_params or ()), sorted(options.items())], default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _field_names(record):
+    if isinstance(record, list):
+        return {name for post in record if isinstance(post, dict) for name in post}
+    return set(record) if isinstance(record, dict) else set()
+
+
+def _encode(value):
+    # Node outputs hold sets (hashtags, findall fields)
+    if isinstance(value, (set, frozenset)):
+        return {'__set__': sorted(value, key=str)}
+    raise TypeError(f"{type(value).__name__} is not cacheable")
+
+
+def _decode(value):
+    return set(value['__set__']) if len(value) == 1 and '__set__' in value else value
+
+
+class ScrapeCache:
+    """
+    SQLite-backed LRU of extracted records, fresh per field type.
+
+    Args:
+        path (str): SQLite file (':memory:' for a throwaway cache).
+        max_entries (int): LRU bound (by last use).
+        ttls (dict): Seconds per field type, over SCRAPE_FIELD_TTLS.
+        clock (callable): Time source (seconds), injectable for tests.
+    """
+
+    def __init__(self, path=SCRAPE_CACHE_PATH, max_entries=MAX_SCRAPE_RECORDS, ttls=None, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(SCRAPE_FIELD_TTLS, **(ttls or {}))
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                key TEXT PRIMARY KEY,
+                url_key TEXT NOT NULL, variant TEXT, url TEXT,
+                record TEXT NOT NULL,
+                stored_at REAL, expires_at REAL, last_used REAL,
+                hits INTEGER DEFAULT 0
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS records_url_key_idx ON records (url_key)")
+        self._connection.commit()
+
+    @staticmethod
+    def key(url, variant=""):
+        return f"{normalize_url(url).key}|{variant or ''}"
+
+    def ttl(self, fields):
+        """Seconds a record with these fields stays fresh (its most volatile field)."""
+        return min(
+            (self.ttls[SCRAPE_FIELD_TYPES.get(field, 'custom')] for field in fields),
+            default=self.ttls['text'],
+        )
+
+    def get(self, url, variant="", fields=None):
+        """
+        The cached record of url, or None when missing or stale.
+
+        Args:
+            fields (iterable): Only these fields need to be fresh (default: all the fields of the record).
+        """
+        key = self.key(url, variant)
+        now = self.clock()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT record, stored_at, expires_at FROM records WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            raw, stored_at, expires_at = row
+            if now - stored_at > max(self.ttls.values()):
+                # Nothing in it is fresh anymore
+                self._connection.execute("DELETE FROM records WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+
+            record = json.loads(raw, object_hook=_decode)
+            fresh_until = expires_at if fields is None else stored_at + self.ttl(fields)
+            if now > fresh_until:
+                return None
+
+            self._connection.execute("UPDATE records SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._connection.commit()
+            return record
+
+    def fresh(self, url, variant="", fields=None):
+        """Whether url has a fresh record (the scrape can be skipped)."""
+        key = self.key(url, variant)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stored_at, expires_at FROM records WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False
+        stored_at, expires_at = row
+        return self.clock() <= (expires_at if fields is None else stored_at + self.ttl(fields))
+
+    def put(self, url, record, variant=""):
+        """Store an extracted record (a dict, or a list of them), evicting the least recently used over the bound."""
+        key = self.key(url, variant)
+        raw = json.dumps(record, default=_encode, ensure_ascii=False)
+        now = self.clock()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO records "
+                "(key, url_key, variant, url, record, stored_at, expires_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, normalize_url(url).key, variant or '', url, raw, now, now + self.ttl(_field_names(record)), now)
+            )
+            overflow = self._connection.execute("SELECT count(*) FROM records").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._connection.execute(
+                    "DELETE FROM records WHERE key IN (SELECT key FROM records ORDER BY last_used LIMIT ?)", (overflow,)
+                )
+            self._connection.commit()
+
+    def invalidate(self, url=None):
+        """Drop the records of url (every variant), or every record. Returns the count."""
+        with self._lock:
+            if url is None:
+                cursor = self._connection.execute("DELETE FROM records")
+            else:
+                cursor = self._connection.execute("DELETE FROM records WHERE url_key = ?", (normalize_url(url).key,))
+            self._connection.commit()
+        return cursor.rowcount
+
+    def entries(self):
+        """Cached entries (for inspection), most recently used first."""
+        now = self.clock()
+        cursor = self._connection.execute(
+            "SELECT url_key, url, variant, stored_at, expires_at, hits FROM records ORDER BY last_used DESC"
+        )
+        return [
+            {'url_key': url_key, 'url': url, 'variant': variant[:12], 'age': round(now - stored_at),
+             'fresh': now <= expires_at, 'hits': hits}
+            for url_key, url, variant, stored_at, expires_at, hits in cursor.fetchall()
+        ]
+
+
+_default_cache = None
+_default_cache_disabled = False
+_default_cache_lock = threading.Lock()
+
+
+def get_scrape_cache():
+    """
+    Process-wide cache on SCRAPE_CACHE_PATH (created on first use), or None when the file
+    can't be opened or created (read-only or sandboxed runtime): the nodes then run uncached.
+    """
+    global _default_cache, _default_cache_disabled
+    with _default_cache_lock:
+        if _default_cache is None and not _default_cache_disabled:
+            try:
+                _default_cache = ScrapeCache(SCRAPE_CACHE_PATH)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Scrape cache disabled, {SCRAPE_CACHE_PATH} is not writable: {str(e)}")
+                _default_cache_disabled = True
+        return _default_cache
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Check / inspect / invalidate the extracted scrape record cache.")
+    parser.add_argument("command", choices=("check", "list", "invalidate", "normalize"))
+    parser.add_argument("url", nargs="?")
+    parser.add_argument("--regex-params", help="JSON file holding the regex_params list of the run (check).")
+    parser.add_argument("--fields", nargs="+", help="Output fields that must be fresh (check, default: all).")
+    parser.add_argument("--node", choices=("RegExNode", "RegExNodeNoAI"), default="RegExNodeNoAI")
+    args = parser.parse_args()
+
+    if args.command in ("check", "list", "invalidate") and get_scrape_cache() is None:
+        sys.exit(1)  # No cache: nothing is fresh
+
+    if args.command == "normalize":
+        print(normalize_url(args.url))
+    elif args.command == "check":
+        # Exit status 0 when the URL has a fresh record: the flow can skip the scraper
+        regex_params = []
+        if args.regex_params:
+            with open(args.regex_params, 'r', encoding='utf-8') as file:
+                regex_params = json.load(file)
+        fresh = get_scrape_cache().fresh(args.url, record_variant(
+            regex_params, args.node == "RegExNode", all_posts=False, recommendations=False
+        ), fields=args.fields)
+        print("fresh" if fresh else "missing or stale")
+        sys.exit(0 if fresh else 1)
+    elif args.command == "list":
+        for entry in get_scrape_cache().entries():
+            print(entry)
+    elif args.command == "invalidate":
+        print(f"Invalidated {get_scrape_cache().invalidate(args.url)} record(s)")
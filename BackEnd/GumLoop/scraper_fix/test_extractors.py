@@ -0,0 +1,40 @@
+"""
+Tests of the extractors (extractors/) on small pages, the recorded scrapes are checked by golden_bench.py.
+
+    python -m unittest test_extractors   (from scraper_fix/)
+"""
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extractors import extract_post
+
+INSTAGRAM_URL = "https://www.instagram.com/reel/DFiM1rjs7ZX/"
+
+
+def instagram_reel(handle, likes, comments, caption=None, sound="Original audio"):
+    """Text of one reel as the scraper records it (the caption is only read when followed by "… more")."""
+    caption = f"{caption}… more" if caption else ""
+    return f"Audio is muted{handle}•Follow{caption}Audio{sound}Play buttonLike{likes}Comment{comments}Share"
+
+
+class InstagramPostsTests(unittest.TestCase):
+    def posts(self, page):
+        return extract_post(INSTAGRAM_URL, page, [], {"all_posts": True})
+
+    def test_reels_without_caption_are_kept_apart(self):
+        page = instagram_reel("alice", 10, 2) + instagram_reel("alice", 20, 3)
+        self.assertEqual([(post["likes"], post["comments"]) for post in self.posts(page)], [(10, 2), (20, 3)])
+
+    def test_page_held_twice_keeps_each_post_once(self):
+        copy = instagram_reel("alice", 10, 2) + instagram_reel("bob", 30, 4, caption="#fyp")
+        posts = self.posts(copy + "Tagged users" + copy)
+        self.assertEqual([post["creator handle"] for post in posts], ["alice", "bob"])
+        self.assertEqual(posts[1]["video caption"], "#fyp")
+        self.assertEqual([post["video_url"] for post in posts], [INSTAGRAM_URL, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,282 @@
+"""
+Tests of pattern_cache.py with a local stand-in of the LLM.
+
+    python -m unittest test_pattern_cache   (from scraper_fix/)
+"""
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pattern_cache
+from pattern_cache import (
+    MAX_PATTERN_MISSES, PatternCache, clean_generated_pattern, get_pattern_cache, iter_resolved_ai_patterns,
+    resolve_ai_pattern, validate_pattern
+)
+
+TEXT = "video by @kagan_dunlap, shirt by @GruntStyle"
+MENTIONS = ["kagan_dunlap", "GruntStyle"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLLM:
+    """Answers every prompt with `answer` (like Gemini, code fence included) and counts the calls."""
+
+    def __init__(self, answer="```regex\n@([\\w\\.-]+)\n```"):
+        self.answer = answer
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.answer
+
+
+class CleanGeneratedPatternTests(unittest.TestCase):
+    def test_strips_fences_backticks_and_quotes(self):
+        for answer in ("```regex\n@(\\w+)\n```", "```\n@(\\w+)\n```", "`@(\\w+)`", "r'@(\\w+)'", '"@(\\w+)"',
+                       "  @(\\w+)\n"):
+            self.assertEqual(clean_generated_pattern(answer), "@(\\w+)", answer)
+
+    def test_empty_and_error_answers(self):
+        for answer in (None, "", "No response", "Error: 429 quota", "``` ```", 42):
+            self.assertIsNone(clean_generated_pattern(answer), answer)
+
+
+class ValidatePatternTests(unittest.TestCase):
+    def test_pattern_must_compile_and_match_the_sample(self):
+        self.assertEqual(validate_pattern("@(\\w+)", TEXT, True).findall(TEXT), MENTIONS)
+        self.assertIsNotNone(validate_pattern("@(\\w+)", TEXT, False))
+        self.assertIsNone(validate_pattern("@(\\w+", TEXT, True))
+        self.assertIsNone(validate_pattern("#(\\w+)", TEXT, True))
+
+
+class ResolveAIPatternTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = PatternCache(":memory:")
+        self.llm = FakeLLM()
+
+    def resolve(self, llm=None, prompt="Extract all mentions"):
+        return resolve_ai_pattern(self.cache, "AI_mentions", TEXT, True, prompt, "tiktok", llm or self.llm)
+
+    def test_hit_makes_no_llm_call(self):
+        compiled, response, from_cache = self.resolve()
+        self.assertEqual((compiled.findall(TEXT), response, from_cache), (MENTIONS, "@([\\w\\.-]+)", False))
+        for _ in range(3):
+            compiled, _, from_cache = self.resolve()
+            self.assertTrue(from_cache)
+            self.assertEqual(compiled.findall(TEXT), MENTIONS)
+        self.assertEqual(self.llm.calls, 1)
+
+    def test_key_includes_the_prompt_mode_and_platform(self):
+        self.resolve()
+        resolve_ai_pattern(self.cache, "AI_mentions", TEXT, False, "Extract all mentions", "tiktok", self.llm)
+        resolve_ai_pattern(self.cache, "AI_mentions", TEXT, True, "Extract all mentions", "instagram", self.llm)
+        self.resolve(prompt="Extract the mentions")
+        self.assertEqual(self.llm.calls, 4)
+
+    def test_pattern_not_matching_the_sample_is_applied_but_not_stored(self):
+        compiled, _, from_cache = self.resolve(FakeLLM("#(\\w+)"))
+        self.assertEqual((compiled.pattern, from_cache), ("#(\\w+)", False))
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_invalid_pattern_is_not_stored(self):
+        compiled, response, _ = self.resolve(FakeLLM("@(\\w+"))
+        self.assertIsNone(compiled)
+        self.assertEqual(response, "@(\\w+")
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_error_answer(self):
+        compiled, response, _ = self.resolve(FakeLLM("Error: 429 quota"))
+        self.assertIsNone(compiled)
+        self.assertEqual(response, "Error: 429 quota")
+
+    def test_without_cache(self):
+        for _ in range(2):
+            compiled, _, from_cache = resolve_ai_pattern(None, "AI_mentions", TEXT, True, "Extract all mentions",
+                                                         "tiktok", self.llm)
+            self.assertFalse(from_cache)
+        self.assertEqual(self.llm.calls, 2)
+
+
+class PatternCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = PatternCache(":memory:", max_entries=2, ttl=60, clock=self.clock)
+
+    def put(self, field_name, pattern="@(\\w+)"):
+        self.cache.put(field_name, "prompt", True, "tiktok", re.compile(pattern))
+
+    def get(self, field_name):
+        return self.cache.get(field_name, "prompt", True, "tiktok")
+
+    def test_entries_expire_after_the_ttl(self):
+        self.put("AI_a")
+        self.clock.now += 60
+        self.assertIsNotNone(self.get("AI_a"))
+        self.clock.now += 1
+        self.assertIsNone(self.get("AI_a"))
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.put("AI_a")
+        self.clock.now += 1
+        self.put("AI_b")
+        self.clock.now += 1
+        self.get("AI_a")  # AI_b is now the least recently used
+        self.clock.now += 1
+        self.put("AI_c")
+        self.assertIsNotNone(self.get("AI_a"))
+        self.assertIsNone(self.get("AI_b"))
+        self.assertIsNotNone(self.get("AI_c"))
+
+    def test_repeated_misses_drop_the_entry(self):
+        self.put("AI_a")
+        for _ in range(MAX_PATTERN_MISSES - 1):
+            self.cache.record_result("AI_a", "prompt", True, "tiktok", False)
+        self.cache.record_result("AI_a", "prompt", True, "tiktok", True)  # A match resets the count
+        for _ in range(MAX_PATTERN_MISSES - 1):
+            self.cache.record_result("AI_a", "prompt", True, "tiktok", False)
+        self.assertIsNotNone(self.get("AI_a"))
+        self.cache.record_result("AI_a", "prompt", True, "tiktok", False)
+        self.assertIsNone(self.get("AI_a"))
+
+    def test_invalidate(self):
+        cache = PatternCache(":memory:", clock=self.clock)
+        cache.put("AI_a", "prompt", True, "tiktok", re.compile("@(\\w+)"))
+        cache.put("AI_a", "other prompt", True, "tiktok", re.compile("#(\\w+)"))
+        cache.put("AI_b", "prompt", True, "tiktok", re.compile("@(\\w+)"))
+        self.assertEqual(cache.invalidate(field_name="AI_a", prompt="other prompt"), 1)
+        self.assertEqual(cache.invalidate(pattern="@(\\w+)"), 2)
+        self.assertEqual(cache.entries(), [])
+        self.assertIsNone(cache.get("AI_a", "prompt", True, "tiktok"))
+
+        cache.put("AI_a", "prompt", True, "tiktok", re.compile("@(\\w+)"))
+        self.assertEqual(cache.invalidate(), 1)
+
+    def test_entries_persist_on_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "patterns.sqlite3")
+            PatternCache(path).put("AI_a", "prompt", True, "tiktok", re.compile("@(\\w+)"))
+            self.assertEqual(PatternCache(path).get("AI_a", "prompt", True, "tiktok").pattern, "@(\\w+)")
+
+
+class StandInProvider:
+    """generate(field_name, all_matches, prompt) stand-in: fields in `hung` block until `release` is set."""
+
+    def __init__(self, hung=(), delay=0.05):
+        self.hung = set(hung)
+        self.delay = delay
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    def __call__(self, field_name, all_matches, prompt):
+        with self.lock:
+            self.calls.append(field_name)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if field_name in self.hung:
+                self.release.wait(5)
+            else:
+                time.sleep(self.delay)
+            return "@([\\w\\.-]+)"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class IterResolvedAIPatternsTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = PatternCache(":memory:")
+
+    def resolve(self, fields, provider, slots, max_workers=2, timeout=0.3):
+        requests = [(field_name, True, "Extract all mentions") for field_name in fields]
+        return {request[0]: (compiled, response, from_cache) for request, compiled, response, from_cache in
+                iter_resolved_ai_patterns(self.cache, requests, TEXT, "tiktok", provider,
+                                          max_workers=max_workers, timeout=timeout, slots=slots)}
+
+    def test_hits_and_generated_patterns(self):
+        self.cache.put("AI_a", "Extract all mentions", True, "tiktok", re.compile("@(\\w+)"))
+        provider = StandInProvider()
+        results = self.resolve(["AI_a", "AI_b", "AI_c", "AI_d"], provider, threading.BoundedSemaphore(4))
+        self.assertTrue(results["AI_a"][2])
+        for field_name in ("AI_b", "AI_c", "AI_d"):
+            self.assertEqual(results[field_name][0].findall(TEXT), MENTIONS)
+        self.assertEqual(sorted(provider.calls), ["AI_b", "AI_c", "AI_d"])
+        self.assertLessEqual(provider.max_in_flight, 2)
+
+    def test_timed_out_calls_keep_their_slot(self):
+        provider = StandInProvider(hung={"AI_a", "AI_b"})
+        slots = threading.BoundedSemaphore(3)
+        try:
+            results = self.resolve(["AI_a", "AI_b", "AI_c", "AI_d", "AI_e"], provider, slots, max_workers=3)
+            self.assertEqual(results["AI_a"][1], "Error: timed out after 0.3s")
+            self.assertEqual(results["AI_e"][0].findall(TEXT), MENTIONS)
+            # The hung calls still run: never more than 3 calls at once, abandoned ones included
+            self.assertLessEqual(provider.max_in_flight, 3)
+
+            # A later node call only gets the slot the hung calls left
+            results = self.resolve(["AI_f", "AI_g"], provider, slots, max_workers=3)
+            self.assertEqual(results["AI_g"][0].findall(TEXT), MENTIONS)
+            self.assertLessEqual(provider.max_in_flight, 3)
+        finally:
+            provider.release.set()
+
+    def test_fields_without_a_free_slot_give_up_after_the_timeout(self):
+        provider = StandInProvider(hung={"AI_a"})
+        slots = threading.BoundedSemaphore(1)
+        try:
+            self.resolve(["AI_a"], provider, slots, timeout=0.1)
+            start = time.monotonic()
+            results = self.resolve(["AI_b", "AI_c"], provider, slots, timeout=0.2)
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertEqual(results["AI_b"][1], "Error: no free generation slot after 0.2s")
+            self.assertEqual(provider.calls, ["AI_a"])
+        finally:
+            provider.release.set()
+
+        # The slot is back once the hung call returns
+        time.sleep(0.1)
+        results = self.resolve(["AI_b"], provider, slots)
+        self.assertEqual(results["AI_b"][0].findall(TEXT), MENTIONS)
+
+    def test_slot_freed_by_another_call_is_picked_up(self):
+        provider = StandInProvider(hung={"AI_a"})
+        slots = threading.BoundedSemaphore(1)
+        self.resolve(["AI_a"], provider, slots, timeout=0.1)
+        threading.Timer(0.2, provider.release.set).start()
+        results = self.resolve(["AI_b"], provider, slots, timeout=1)
+        self.assertEqual(results["AI_b"][0].findall(TEXT), MENTIONS)
+
+
+class GetPatternCacheTests(unittest.TestCase):
+    def test_unwritable_path_disables_the_cache(self):
+        with mock.patch.multiple(pattern_cache, PATTERN_CACHE_PATH="/nonexistent/dir/patterns.sqlite3",
+                                 _default_cache=None, _default_cache_disabled=False), \
+                mock.patch("builtins.print"):
+            self.assertIsNone(get_pattern_cache())
+            self.assertTrue(pattern_cache._default_cache_disabled)
+            # Not retried on every call
+            with mock.patch.object(pattern_cache, "PatternCache") as cache_class:
+                self.assertIsNone(get_pattern_cache())
+                cache_class.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
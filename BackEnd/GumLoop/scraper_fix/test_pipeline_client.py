@@ -0,0 +1,215 @@
+"""
+Tests of pipeline_client.py against a local stand-in of the pipeline API.
+
+    python -m unittest test_pipeline_client   (from scraper_fix/)
+"""
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline_client import CircuitBreaker, PipelineClient, enable_advanced_scraping, parse_headers
+
+PAYLOAD = {"pl_config": {"pipeline": [{"operator": "Website Scraper", "parameters": {"Use Advanced Scraping?": "false"}}]}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers the queued (status, headers) first, then 200; records every request."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append({"body": body, "headers": dict(self.headers), "client": self.client_address})
+            status, headers, delay = server.answers.pop(0) if server.answers else (200, {}, 0)
+        time.sleep(delay)
+        answer = json.dumps({"run_id": len(server.requests)}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, *args):
+        pass
+
+
+class PipelineTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/start_pipeline"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.answers = []
+        self.clock = FakeClock()
+        self.sleeps = []
+        self.client = PipelineClient(self.url, parse_headers(bearer="token"), timeout=(1, 1), retries=2,
+                                     breaker=CircuitBreaker(failures=2, cooldown=60, clock=self.clock),
+                                     dedup_window=600, clock=self.clock, sleep=self.sleeps.append)
+
+    def tearDown(self):
+        self.client.close()
+
+    def answer(self, *answers):
+        self.server.answers = [answer if len(answer) == 3 else answer + (0,) for answer in answers]
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failures=3, cooldown=60, clock=self.clock)
+
+    def test_opens_after_failures_in_a_row(self):
+        self.breaker.record(False)
+        self.breaker.record(False)
+        self.breaker.record(True)  # A success resets the count
+        self.breaker.record(False)
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        for _ in range(3):
+            self.breaker.record(False)
+        self.clock.now += 60
+        self.assertEqual(self.breaker.state, "half open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # Trial in flight
+
+    def test_successful_trial_closes(self):
+        for _ in range(3):
+            self.breaker.record(False)
+        self.clock.now += 60
+        self.breaker.allow()
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.record(False)
+        self.clock.now += 60
+        self.breaker.allow()
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, "open")
+        self.clock.now += 59
+        self.assertFalse(self.breaker.allow())
+        self.clock.now += 1
+        self.assertTrue(self.breaker.allow())
+
+
+class PayloadTests(unittest.TestCase):
+    def test_enable_advanced_scraping_sets_the_flag_on_a_copy(self):
+        enabled = enable_advanced_scraping(PAYLOAD)
+        self.assertEqual(enabled["pl_config"]["pipeline"][0]["parameters"]["Use Advanced Scraping?"], "true")
+        self.assertEqual(PAYLOAD["pl_config"]["pipeline"][0]["parameters"]["Use Advanced Scraping?"], "false")
+        # Set, not toggled
+        self.assertEqual(enable_advanced_scraping(enabled), enabled)
+
+    def test_parse_headers(self):
+        self.assertEqual(parse_headers('{"X-Client": "nodes"}', bearer="token"), {
+            "Content-Type": "application/json", "X-Client": "nodes", "Authorization": "Bearer token"
+        })
+        self.assertEqual(parse_headers("X-A: 1; Authorization: Basic abc", bearer="token")["Authorization"], "Basic abc")
+
+
+class TriggerTests(PipelineTestCase):
+    def test_posts_the_payload_with_the_headers(self):
+        response = self.client.trigger(PAYLOAD, "https://www.tiktok.com/@a/video/1")
+        self.assertEqual(json.loads(response), {"run_id": 1})
+        self.assertEqual(self.server.requests[0]["body"], PAYLOAD)
+        self.assertEqual(self.server.requests[0]["headers"]["Authorization"], "Bearer token")
+
+    def test_retries_transient_statuses(self):
+        self.answer((503, {}), (502, {}))
+        response = self.client.trigger(PAYLOAD, "video/1")
+        self.assertEqual(json.loads(response), {"run_id": 3})
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertEqual(self.client.breaker.state, "closed")
+
+    def test_honors_retry_after(self):
+        self.answer((429, {"Retry-After": "7"}))
+        self.client.trigger(PAYLOAD, "video/1")
+        self.assertEqual(self.sleeps, [7.0])
+
+    def test_does_not_retry_client_errors(self):
+        self.answer((400, {}))
+        self.assertIn("error", self.client.trigger(PAYLOAD, "video/1"))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_does_not_retry_read_timeouts(self):
+        # The run may have started: a retry could start it twice
+        self.client.timeout = (1, 0.2)
+        self.answer((200, {}, 0.5))
+        self.assertIn("Read timeout", self.client.trigger(PAYLOAD, "video/1")["error"])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_reuses_the_connection(self):
+        for video_id in range(5):
+            self.client.trigger(PAYLOAD, f"video/{video_id}")
+        self.assertEqual(len({request["client"] for request in self.server.requests}), 1)
+
+
+class DedupTests(PipelineTestCase):
+    def test_same_key_is_skipped_within_the_window(self):
+        self.client.trigger(PAYLOAD, "video/1")
+        self.assertIn("skipped", self.client.trigger(PAYLOAD, "video/1"))
+        self.clock.now += 600
+        self.assertNotIsInstance(self.client.trigger(PAYLOAD, "video/1"), dict)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_failed_call_releases_the_key(self):
+        self.answer((500, {}))
+        self.assertIn("error", self.client.trigger(PAYLOAD, "video/1"))
+        self.assertNotIsInstance(self.client.trigger(PAYLOAD, "video/1"), dict)
+
+    def test_default_key_is_the_payload(self):
+        self.client.trigger(PAYLOAD)
+        self.assertIn("skipped", self.client.trigger(PAYLOAD))
+        self.assertNotIsInstance(self.client.trigger(enable_advanced_scraping(PAYLOAD)), dict)
+
+
+class BreakerIntegrationTests(PipelineTestCase):
+    def test_open_circuit_skips_calls_and_releases_the_key(self):
+        self.answer(*[(500, {})] * 2)
+        self.client.trigger(PAYLOAD, "video/1")
+        self.client.trigger(PAYLOAD, "video/2")
+        self.assertEqual(self.client.breaker.state, "open")
+
+        self.assertIn("circuit open", self.client.trigger(PAYLOAD, "video/3")["skipped"])
+        self.assertEqual(len(self.server.requests), 2)
+
+        # Half open: the trial goes through (video/3 was not held by the refused call)
+        self.clock.now += 60
+        self.assertNotIsInstance(self.client.trigger(PAYLOAD, "video/3"), dict)
+        self.assertEqual(self.client.breaker.state, "closed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Tests of scrape_cache.py, and of its use by the nodes (extract_post).
+
+    python -m unittest test_scrape_cache   (from scraper_fix/)
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import scrape_cache
+from extractors import INVALID_OUTPUT, extract_post
+from scrape_cache import SCRAPE_FIELD_TTLS, ScrapeCache, get_scrape_cache, normalize_url, record_variant
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORD = {"creator handle": "kagan_dunlap", "likes": 198600, "hashtags": {"fyp", "army"}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class NormalizeUrlTests(unittest.TestCase):
+    def test_posts_are_keyed_by_id(self):
+        for url in ("https://www.tiktok.com/@kagan_dunlap/video/7452784466923228458?lang=en",
+                    "tiktok.com/@someone_else/video/7452784466923228458/",
+                    "https://m.tiktok.com/v/7452784466923228458?is_from_webapp=1&sender_device=pc"):
+            self.assertEqual(normalize_url(url).key, "tiktok:7452784466923228458", url)
+        for url in ("https://www.instagram.com/reel/DFiM1rjs7ZX/?igsh=abc", "https://instagram.com/reels/DFiM1rjs7ZX",
+                    "https://www.instagram.com/some.user/p/DFiM1rjs7ZX/"):
+            self.assertEqual(normalize_url(url).key, "instagram:DFiM1rjs7ZX", url)
+
+    def test_other_urls_keep_their_query(self):
+        self.assertEqual(normalize_url("https://vm.tiktok.com/ZMabc/?_r=1&_t=x").key, "tiktok:vm.tiktok.com/ZMabc")
+        self.assertEqual(normalize_url("https://example.com/watch?v=1&utm_source=x&lang=fr#top").key,
+                         "other:example.com/watch?lang=fr&v=1")
+
+
+class ScrapeCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ScrapeCache(":memory:", max_entries=2, clock=self.clock)
+        self.url = "https://www.tiktok.com/@kagan_dunlap/video/7452784466923228458"
+
+    def test_record_round_trip(self):
+        self.cache.put(self.url + "?lang=en", RECORD, "variant")
+        self.assertEqual(self.cache.get(self.url, "variant"), RECORD)
+        self.assertIsNone(self.cache.get(self.url, "other variant"))
+
+    def test_record_is_stale_with_its_most_volatile_field(self):
+        self.cache.put(self.url, RECORD)
+        self.clock.now += SCRAPE_FIELD_TTLS["counts"] + 1
+        self.assertIsNone(self.cache.get(self.url))
+        self.assertFalse(self.cache.fresh(self.url))
+
+    def test_fresh_fields(self):
+        self.cache.put(self.url, RECORD)
+        self.clock.now += SCRAPE_FIELD_TTLS["counts"] + 1
+        self.assertEqual(self.cache.get(self.url, fields=["creator handle", "hashtags"]), RECORD)
+        self.assertTrue(self.cache.fresh(self.url, fields=["creator handle"]))
+        self.assertIsNone(self.cache.get(self.url, fields=["creator handle", "likes"]))
+        self.clock.now += SCRAPE_FIELD_TTLS["text"]
+        self.assertIsNone(self.cache.get(self.url, fields=["creator handle"]))
+
+    def test_least_recently_used_record_is_evicted(self):
+        urls = [f"https://www.tiktok.com/@a/video/{video_id}" for video_id in (1, 2, 3)]
+        self.cache.put(urls[0], RECORD)
+        self.clock.now += 1
+        self.cache.put(urls[1], RECORD)
+        self.clock.now += 1
+        self.cache.get(urls[0])
+        self.clock.now += 1
+        self.cache.put(urls[2], RECORD)
+        self.assertEqual([self.cache.get(url) is not None for url in urls], [True, False, True])
+
+    def test_invalidate(self):
+        self.cache.put(self.url, RECORD, "a")
+        self.cache.put(self.url + "?lang=en", RECORD, "b")
+        self.assertEqual(self.cache.invalidate(self.url), 2)
+        self.assertIsNone(self.cache.get(self.url, "a"))
+
+
+class ExtractPostTests(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(BASE_DIR, "tiktok", "test-5"), encoding="utf-8") as file:
+            url, _, self.page = file.read().partition('\n')
+        self.url = url.strip()
+        self.clock = FakeClock()
+        self.cache = ScrapeCache(":memory:", clock=self.clock)
+
+    def test_uncached_by_default(self):
+        with mock.patch("extractors.node.get_scrape_cache") as get_default_cache:
+            self.assertIsInstance(extract_post(self.url, self.page, []), dict)
+            self.assertEqual(extract_post(self.url, "", []), INVALID_OUTPUT)
+            get_default_cache.assert_not_called()
+
+    def test_opted_in_record_is_reused_while_fresh(self):
+        params = {"scrape_cache": self.cache}
+        record = extract_post(self.url, self.page, [], params)
+        self.assertEqual(extract_post(self.url + "?lang=en", "", [], params), record)
+
+        # Counts are stale after an hour: extracted again from the page given
+        self.clock.now += SCRAPE_FIELD_TTLS["counts"] + 1
+        self.assertEqual(extract_post(self.url, "", [], params), INVALID_OUTPUT)
+        self.assertEqual(extract_post(self.url, "", [], dict(params, fresh_fields=["creator handle", "video caption"])),
+                         record)
+
+    def test_default_cache(self):
+        with mock.patch("extractors.node.get_scrape_cache", return_value=self.cache):
+            extract_post(self.url, self.page, [], {"scrape_cache": True})
+        self.assertIsNotNone(self.cache.get(self.url, record_variant([], all_posts=False, recommendations=False)))
+
+    def test_unwritable_path_disables_the_cache(self):
+        with mock.patch.multiple(scrape_cache, SCRAPE_CACHE_PATH="/nonexistent/dir/records.sqlite3",
+                                 _default_cache=None, _default_cache_disabled=False), \
+                mock.patch("builtins.print"):
+            self.assertIsNone(get_scrape_cache())
+            with mock.patch("extractors.node.get_scrape_cache", get_scrape_cache):
+                self.assertIsInstance(extract_post(self.url, self.page, [], {"scrape_cache": True}), dict)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Golden check of the GumLoop metadata nodes (views.py and enhanced_views.py) and tests of metadata_engine.py.
+
+    python -m unittest test_metadata_engine   (from GumLoop/)
+
+The expected outputs are in golden/golden_outputs.json, rewrite it with `python metadata_engine.py --update`
+only after an intended output change.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import enhanced_views
+import views
+from metadata_engine import TIKTOK_URL_PATTERN, extract_basic, extract_enhanced
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_PATH = os.path.join(BASE_DIR, "golden", "golden_outputs.json")
+NODES = {"views": views, "enhanced_views": enhanced_views}
+
+
+def load_golden():
+    """{file name (relative to GumLoop/): {node name: expected output}}"""
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def run_node(node, name):
+    """Output of node.main on the golden file `name` (tuples as lists, like in the JSON)."""
+    with contextlib.redirect_stdout(io.StringIO()):  # The nodes print their rows
+        result = node.main(os.path.join(BASE_DIR, name), {})
+    return list(result) if isinstance(result, tuple) else result
+
+
+class GoldenOutputsTests(unittest.TestCase):
+    def test_outputs_match_the_golden_file(self):
+        golden = load_golden()
+        self.assertEqual(len(golden), 12)
+        for name, expected in golden.items():
+            for node_name, node in NODES.items():
+                with self.subTest(file=name, node=node_name):
+                    self.assertEqual(run_node(node, name), expected[node_name])
+
+
+class TikTokUrlTests(unittest.TestCase):
+    """extract_basic takes the URL from the JSON of its string only: same match as on the whole json.dumps."""
+
+    def assert_same_url(self, metadata):
+        expected = TIKTOK_URL_PATTERN.search(json.dumps(metadata))
+        self.assertEqual(extract_basic(metadata)[0], expected.group(0) if expected else None)
+
+    def test_matches_the_whole_document_search(self):
+        url = "https://www.tiktok.com/@kagan_dunlap/video/7452784466923228458"
+        for metadata in (
+            {"basic": {"title": "no url"}},
+            {"basic": {"url": url}},
+            {"opengraph": {"url": url + "?lang=fr"}, "basic": {"url": url}},
+            {"links": [1, None, {"href": url + "/café x"}]},
+            {"basic": {"description": f'see "{url}" and {url}'}},
+            {"basic": {"description": f"it's {url}\\tab"}},
+            {url + "/in-a-key": "value"},
+            {"basic": {"url": "https://www.tiktok"}},
+        ):
+            with self.subTest(metadata=metadata):
+                self.assert_same_url(metadata)
+
+
+class ExtractEnhancedTests(unittest.TestCase):
+    def test_first_matching_pattern_of_each_field(self):
+        fields = extract_enhanced({
+            "opengraph": {"og:title": "Kagan Dunlap on TikTok", "description": "2.5K Likes, 31 Comments. #army #fyp"},
+            "links": ["https://m.tiktok.com/@kagan_dunlap/video/7452784466923228458"],
+        })
+        self.assertEqual(fields["creator_name"], "Kagan Dunlap")
+        self.assertEqual(fields["creator_handle"], "kagan_dunlap")
+        self.assertEqual((fields["likes_count"], fields["comments_count"]), (2500, 31))
+        self.assertEqual(fields["hashtags"], ["#army", "#fyp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
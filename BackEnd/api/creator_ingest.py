@@ -0,0 +1,256 @@
+"""
+Bulk ingestion of creators into the socials_mapping table.
+
+add_creator does up to three sequential round trips per creator (select, update/insert,
+user_profile update). For batches pushed by the curation tools, creators are instead:
+    1. Deduplicated by normalized TikTok username (case-insensitive, last occurrence wins)
+    2. Matched to the existing rows with ONE case-insensitive select per chunk (add_creator
+       stores usernames as typed: an existing "CreatorName" row is updated, keeping its spelling)
+    3. Written with ONE upsert per chunk (on_conflict = tiktok_username)
+Only the items that carry an email still need their own user_profile update.
+
+The upsert needs a unique tiktok_username: Database/migrations/0001_socials_mapping_tiktok_username_key.sql,
+applied with `python Database/migrate.py`.
+"""
+import re
+
+# Columns written for every creator (same keys for every row of a batched upsert)
+CREATOR_FIELDS = ("profile_picture_url", "instagram_username", "x_username", "facebook_username")
+
+# Rows per select/upsert round trip (keeps the PostgREST URL and payload small)
+BULK_UPSERT_CHUNK_SIZE = 500
+MAX_BULK_CREATORS = 10000
+
+
+def normalize_tiktok_username(username):
+    """
+    Normalize a TikTok username for deduplication/lookups:
+    '  @Some.User ' -> 'some.user'. Returns None if nothing is left.
+    """
+    if not isinstance(username, str):
+        return None
+    username = username.strip().lstrip("@").strip().lower()
+    return username or None
+
+
+def clean_tiktok_username(username):
+    """
+    The TikTok username as typed, without the surrounding spaces and '@':
+    '  @Some.User ' -> 'Some.User'. Returns None if nothing is left.
+    """
+    if not isinstance(username, str):
+        return None
+    username = username.strip().lstrip("@").strip()
+    return username or None
+
+
+def ilike_any(usernames):
+    """
+    PostgREST ilike(any) value matching any of the usernames exactly, ignoring case:
+    LIKE wildcards ('_' is common in usernames) and array literal quotes are escaped.
+    """
+    patterns = (re.sub(r'([\\%_])', r'\\\1', username) for username in usernames)
+    return "{" + ",".join('"' + pattern.replace('\\', '\\\\').replace('"', '\\"') + '"' for pattern in patterns) + "}"
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ingest_creators(client, creators, chunk_size=BULK_UPSERT_CHUNK_SIZE):
+    """
+    Upsert a batch of creators into socials_mapping.
+
+    Args:
+        client: Supabase client (SupaBaseClient.supabase or a stand-in).
+        creators (list): Dicts with the same fields as add_creator
+            (tiktok_username, profile_picture_url, instagram_username, x_username,
+            facebook_username and an optional email to link the creator to).
+        chunk_size (int): Creators per select/upsert round trip.
+
+    Returns:
+        list: One outcome dict per input item, in input order, with keys
+            index, tiktok_username, status ('created', 'updated', 'duplicate', 'invalid', 'error')
+            and tiktok_uid / duplicate_of / error when relevant.
+    """
+    outcomes = [None] * len(creators)
+    latest = {}  # normalized username -> index of the occurrence that gets written
+
+    for index, creator in enumerate(creators):
+        username = normalize_tiktok_username(creator.get("tiktok_username")) if isinstance(creator, dict) else None
+        if not username:
+            outcomes[index] = {"index": index, "tiktok_username": None, "status": "invalid",
+                               "error": "TikTok username is required!"}
+            continue
+
+        if username in latest:
+            # The later occurrence wins, the earlier one is reported as a duplicate
+            previous = latest[username]
+            outcomes[previous] = {"index": previous, "tiktok_username": username, "status": "duplicate",
+                                  "duplicate_of": index}
+        latest[username] = index
+
+    usernames = list(latest)
+    for chunk in _chunks(usernames, chunk_size):
+        try:
+            # One round trip to know which creators already exist, whatever their stored case
+            # (oldest row first, when several spellings were stored)
+            existing = client.table("socials_mapping").select("tiktok_username, tiktok_uid").filter(
+                "tiktok_username", "ilike(any)", ilike_any(chunk)
+            ).order("tiktok_uid").execute()
+            stored_usernames = {}  # normalized -> stored username
+            for row in (existing.data or []):
+                stored_usernames.setdefault(normalize_tiktok_username(row.get("tiktok_username")), row.get("tiktok_username"))
+
+            rows = []
+            for username in chunk:
+                creator = creators[latest[username]]
+                row = {field: creator.get(field) for field in CREATOR_FIELDS}
+                row["tiktok_username"] = stored_usernames.get(username) or clean_tiktok_username(creator["tiktok_username"])
+                rows.append(row)
+
+            # One round trip to write the whole chunk
+            upsert_response = client.table("socials_mapping").upsert(rows, on_conflict="tiktok_username").execute()
+            written = {normalize_tiktok_username(row.get("tiktok_username")): row for row in (upsert_response.data or [])}
+        except Exception as e:
+            for username in chunk:
+                index = latest[username]
+                outcomes[index] = {"index": index, "tiktok_username": username, "status": "error",
+                                   "error": f"Failed to upsert creator: {str(e)}"}
+            continue
+
+        for username in chunk:
+            index = latest[username]
+            if username not in written:
+                outcomes[index] = {"index": index, "tiktok_username": username, "status": "error",
+                                   "error": "Creator was not returned by the upsert."}
+                continue
+            outcomes[index] = {
+                "index": index,
+                "tiktok_username": written[username].get("tiktok_username"),
+                "status": "updated" if username in stored_usernames else "created",
+                "tiktok_uid": written[username].get("tiktok_uid"),
+            }
+
+    # Link creators to user accounts (only the items that carry an email)
+    for username, index in latest.items():
+        email = creators[index].get("email")
+        outcome = outcomes[index]
+        if not email or outcome["status"] not in ("created", "updated") or not outcome.get("tiktok_uid"):
+            continue
+        try:
+            user_update = client.table("user_profile").update({
+                "reference_creator": outcome["tiktok_uid"],
+                "creator_data_added": True
+            }).eq("email", email).execute()
+            if not user_update.data:
+                outcome["error"] = "Failed to link creator profile to user account."
+        except Exception as e:
+            outcome["error"] = f"Failed to link creator profile to user account: {str(e)}"
+
+    return outcomes
+
+
+if __name__ == "__main__":
+    # Throughput benchmark against an in-memory stand-in of the Supabase client,
+    # where every execute() costs one simulated network round trip.
+    import time
+
+    ROUND_TRIP = 0.005  # seconds
+
+    class FakeResponse:
+        def __init__(self, data):
+            self.data = data
+
+    class FakeQuery:
+        def __init__(self, rows):
+            self.rows = rows
+            self.action = None
+            self.payload = None
+            self.filters = []
+
+        def select(self, *columns):
+            self.action = "select"
+            return self
+
+        def insert(self, payload):
+            self.action, self.payload = "insert", payload
+            return self
+
+        def update(self, payload):
+            self.action, self.payload = "update", payload
+            return self
+
+        def upsert(self, payload, on_conflict=None):
+            self.action, self.payload = "upsert", payload
+            return self
+
+        def eq(self, column, value):
+            self.filters.append((column, [value]))
+            return self
+
+        def in_(self, column, values):
+            self.filters.append((column, list(values)))
+            return self
+
+        def filter(self, column, operator, criteria):
+            # Only ilike(any) with the ilike_any values: unquote, unescape, compare lowercased
+            values = [re.sub(r'\\(.)', r'\1', re.sub(r'\\(.)', r'\1', value))
+                      for value in re.findall(r'"((?:[^"\\]|\\.)*)"', criteria)]
+            self.filters.append((column, lambda stored: isinstance(stored, str) and stored.lower() in
+                                 {value.lower() for value in values}))
+            return self
+
+        def order(self, column):
+            return self
+
+        def execute(self):
+            time.sleep(ROUND_TRIP)
+            matched = [row for row in self.rows.values()
+                       if all(values(row.get(column)) if callable(values) else row.get(column) in values
+                              for column, values in self.filters)]
+            if self.action == "select":
+                return FakeResponse([dict(row) for row in matched])
+            if self.action == "update":
+                for row in matched:
+                    row.update(self.payload)
+                return FakeResponse(matched)
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            written = []
+            for item in payload:
+                row = self.rows.setdefault(item["tiktok_username"], {"tiktok_uid": len(self.rows) + 1})
+                row.update(item)
+                written.append(dict(row))
+            return FakeResponse(written)
+
+    class FakeClient:
+        def __init__(self):
+            self.rows = {}
+
+        def table(self, name):
+            return FakeQuery(self.rows)
+
+    creators = [{"tiktok_username": f"creator_{i}", "instagram_username": f"https://www.instagram.com/creator_{i}/"}
+                for i in range(1000)]
+
+    # Current add_creator pattern: select, then update or insert, per creator
+    client = FakeClient()
+    start = time.perf_counter()
+    for creator in creators:
+        existing = client.table("socials_mapping").select("*").eq("tiktok_username", creator["tiktok_username"]).execute()
+        if existing.data:
+            client.table("socials_mapping").update(creator).eq("tiktok_username", creator["tiktok_username"]).execute()
+        else:
+            client.table("socials_mapping").insert(creator).execute()
+    single = time.perf_counter() - start
+
+    client = FakeClient()
+    start = time.perf_counter()
+    outcomes = ingest_creators(client, creators)
+    bulk = time.perf_counter() - start
+
+    assert all(outcome["status"] == "created" for outcome in outcomes)
+
+    print(f"add_creator pattern: {len(creators) / single:,.0f} creators/s")
+    print(f"ingest_creators:     {len(creators) / bulk:,.0f} creators/s ({single / bulk:.0f}x)")
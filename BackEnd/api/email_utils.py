@@ -40,4 +40,191 @@ The LinkMySocials Team
         return True
     except Exception as e:
         print(f"Failed to send welcome email: {str(e)}")
-        return False 
\ No newline at end of file
+        return False 
+
+# Deliverability cache settings ( a few providers account for most sign ups,
+# so a DNS MX lookup per request is wasted work )
+DELIVERABILITY_POSITIVE_TTL = 6 * 60 * 60  # 6 hours for domains that accept mail
+DELIVERABILITY_NEGATIVE_TTL = 10 * 60  # 10 minutes for undeliverable/unknown domains
+DELIVERABILITY_CACHE_SIZE = 10000
+DELIVERABILITY_DNS_TIMEOUT = 5  # seconds per lookup
+DELIVERABILITY_MAX_WORKERS = 8
+
+
+def dns_deliverability_lookup(ascii_domain, domain_i18n):
+    """
+    Default resolver for the DeliverabilityCache: live MX (or A/AAAA fallback) lookup.
+    Raises EmailUndeliverableError if the domain does not accept email.
+    """
+    from email_validator.deliverability import validate_email_deliverability
+    return validate_email_deliverability(ascii_domain, domain_i18n, timeout=DELIVERABILITY_DNS_TIMEOUT)
+
+
+class DeliverabilityCache:
+    """
+    Domain level cache of DNS deliverability results.
+
+    - Deliverable domains are kept for `positive_ttl` seconds, undeliverable ones
+      (and lookups that timed out) for `negative_ttl` seconds.
+    - At most `max_size` domains are kept, least recently used ones are evicted first.
+    - Uncached domains are resolved concurrently, and a domain that is already being
+      resolved by another request is waited on instead of being looked up twice.
+
+    `resolver(ascii_domain, domain_i18n)` can be swapped for a local stand-in (no DNS needed),
+    it must raise EmailUndeliverableError for domains that do not accept email.
+    """
+
+    def __init__(self, resolver=None, positive_ttl=DELIVERABILITY_POSITIVE_TTL,
+                 negative_ttl=DELIVERABILITY_NEGATIVE_TTL, max_size=DELIVERABILITY_CACHE_SIZE,
+                 max_workers=DELIVERABILITY_MAX_WORKERS, clock=None):
+        import threading
+        import time
+        from collections import OrderedDict
+
+        self.resolver = resolver or dns_deliverability_lookup
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.max_workers = max_workers
+        self.clock = clock or time.monotonic
+
+        self._entries = OrderedDict()  # ascii_domain -> (deliverable, expires_at)
+        self._in_flight = {}  # ascii_domain -> concurrent.futures.Future
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, domain):
+        """Return the cached result for a domain, or None if missing/expired. Caller holds the lock."""
+        entry = self._entries.get(domain)
+        if entry is None:
+            return None
+        deliverable, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[domain]
+            return None
+        self._entries.move_to_end(domain)
+        return deliverable
+
+    def _put(self, domain, deliverable, ttl):
+        """Store a result and evict the least recently used domains. Caller holds the lock."""
+        self._entries[domain] = (deliverable, self.clock() + ttl)
+        self._entries.move_to_end(domain)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _resolve(self, ascii_domain, domain_i18n):
+        """Run the resolver for one domain and return (deliverable, ttl)."""
+        from email_validator import EmailUndeliverableError
+
+        try:
+            info = self.resolver(ascii_domain, domain_i18n)
+        except EmailUndeliverableError:
+            return False, self.negative_ttl
+        except Exception as e:
+            # Resolver failure (network down...), don't reject the user for it
+            print(f"Deliverability lookup failed for {ascii_domain}: {str(e)}")
+            return True, self.negative_ttl
+
+        if info and info.get("unknown-deliverability"):
+            # DNS timed out, accept the address but retry the lookup soon
+            return True, self.negative_ttl
+        return True, self.positive_ttl
+
+    def check_domains(self, domains):
+        """
+        Check the deliverability of several domains at once.
+
+        Args:
+            domains (iterable): (ascii_domain, domain_i18n) pairs.
+
+        Returns:
+            dict: ascii_domain -> bool (True if the domain accepts email)
+        """
+        from concurrent.futures import Future, ThreadPoolExecutor
+
+        results = {}
+        owned = {}  # domains this call has to resolve
+        waiting = {}  # domains another call is already resolving
+
+        with self._lock:
+            for ascii_domain, domain_i18n in domains:
+                if ascii_domain in results or ascii_domain in owned or ascii_domain in waiting:
+                    continue
+                cached = self._get(ascii_domain)
+                if cached is not None:
+                    results[ascii_domain] = cached
+                elif ascii_domain in self._in_flight:
+                    waiting[ascii_domain] = self._in_flight[ascii_domain]
+                else:
+                    future = Future()
+                    self._in_flight[ascii_domain] = future
+                    owned[ascii_domain] = (domain_i18n, future)
+
+        if owned:
+            workers = min(self.max_workers, len(owned))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                lookups = {
+                    ascii_domain: executor.submit(self._resolve, ascii_domain, domain_i18n)
+                    for ascii_domain, (domain_i18n, _) in owned.items()
+                }
+                for ascii_domain, lookup in lookups.items():
+                    deliverable, ttl = lookup.result()
+                    with self._lock:
+                        self._put(ascii_domain, deliverable, ttl)
+                        self._in_flight.pop(ascii_domain, None)
+                    owned[ascii_domain][1].set_result(deliverable)
+                    results[ascii_domain] = deliverable
+
+        for ascii_domain, future in waiting.items():
+            results[ascii_domain] = future.result()
+
+        return results
+
+    def check_domain(self, ascii_domain, domain_i18n=None):
+        """Check the deliverability of a single domain."""
+        return self.check_domains([(ascii_domain, domain_i18n or ascii_domain)])[ascii_domain]
+
+
+# Process-wide cache shared by the email verification endpoints
+deliverability_cache = DeliverabilityCache()
+
+
+def verify_emails(emails, cache=None):
+    """
+    Validate the syntax of every email, then check the deliverability of their
+    domains through the DeliverabilityCache (each distinct domain is resolved once).
+
+    Args:
+        emails (list): Email addresses to verify.
+        cache (DeliverabilityCache): Cache to use, defaults to the process-wide one.
+
+    Returns:
+        dict: email -> bool (True if the address is valid and its domain accepts email)
+    """
+    from email_validator import validate_email, EmailNotValidError
+
+    if cache is None:
+        cache = deliverability_cache
+
+    results = {}
+    domains = {}  # email -> (ascii_domain, domain_i18n), only for syntactically valid emails
+    for email in emails:
+        try:
+            validated = validate_email(email, check_deliverability=False)
+        except (EmailNotValidError, TypeError, AttributeError):
+            results[email] = False
+            continue
+
+        domains[email] = (validated.ascii_domain, validated.domain)
+
+    deliverable = cache.check_domains(domains.values())
+    for email, (ascii_domain, _) in domains.items():
+        results[email] = deliverable[ascii_domain]
+
+    return results
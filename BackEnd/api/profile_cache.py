@@ -0,0 +1,99 @@
+"""
+Cache of get_single_data responses (profile pages are the most-hit read), stored in
+Django's configured cache backend (settings.CACHES) so every worker process shares the
+entries and their invalidations.
+
+Entries are keyed by email and record the version of their email and of the tiktok_uid of
+every creator they show. Writes to socials_mapping (add_creator, add_creators_bulk) bump
+those versions, which drops every cached profile page that shows that creator, in every
+worker. A version is a random token written with a plain cache.set (no incr, which is a
+non-atomic get + set on the file and local-memory backends): two workers bumping the same
+version at once both write a value no stored entry was snapshotted with, on any backend.
+An entry whose version was evicted is not served either.
+"""
+import hashlib
+import uuid
+
+SINGLE_DATA_CACHE_TTL = 5 * 60  # seconds
+SINGLE_DATA_CACHE_PREFIX = "single_data"
+
+
+class SingleDataCache:
+    """
+    TTL cache of get_single_data response bodies, invalidated by email and by creator.
+
+    Readers take a `generation()` token BEFORE querying the database and pass it to `put()`,
+    a response computed before an invalidation is then never stored.
+
+    Args:
+        ttl (int): Seconds an entry is served.
+        cache: Django cache (default: django.core.cache.cache, resolved on first use).
+    """
+
+    def __init__(self, ttl=SINGLE_DATA_CACHE_TTL, cache=None):
+        self.ttl = ttl
+        self._cache = cache
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from django.core.cache import cache
+            self._cache = cache
+        return self._cache
+
+    @staticmethod
+    def _key(kind, value):
+        digest = hashlib.sha1(str(value).encode("utf-8")).hexdigest()
+        return f"{SINGLE_DATA_CACHE_PREFIX}:{kind}:{digest}"
+
+    def _versions(self, keys):
+        """Current version of each key, creating the missing ones (add keeps a concurrent bump)."""
+        versions = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in versions]
+        if missing:
+            for key in missing:
+                self.cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions.update(self.cache.get_many(missing))
+        return {key: versions.get(key) for key in keys}
+
+    def _bump(self, key):
+        self.cache.set(key, uuid.uuid4().hex, timeout=None)
+
+    def generation(self):
+        key = self._key("generation", "")
+        return self._versions([key])[key]
+
+    def get(self, email):
+        """Return the cached response body for an email, or None."""
+        entry = self.cache.get(self._key("email", email))
+        if entry is None:
+            return None
+        body, versions = entry
+        current = self.cache.get_many(list(versions))
+        if any(version is None or current.get(key) != version for key, version in versions.items()):
+            return None
+        return body
+
+    def put(self, email, body, uids=(), generation=None):
+        """Store a response body, unless an invalidation happened since `generation`."""
+        if generation is not None and generation != self.generation():
+            return
+        keys = [self._key("email_version", email)]
+        keys += [self._key("uid_version", uid) for uid in uids if uid is not None]
+        self.cache.set(self._key("email", email), (body, self._versions(keys)), timeout=self.ttl)
+        if generation is not None and generation != self.generation():
+            # Invalidated while storing (the versions may have been read after the bump)
+            self.cache.delete(self._key("email", email))
+
+    def invalidate(self, emails=(), uids=()):
+        """Drop the entries of the given emails and of every email linked to the given creators."""
+        self._bump(self._key("generation", ""))
+        for uid in uids:
+            if uid is not None:
+                self._bump(self._key("uid_version", uid))
+        for email in emails:
+            self._bump(self._key("email_version", email))
+
+
+# Process-wide handle used by the api views (the entries live in the cache backend)
+single_data_cache = SingleDataCache()
@@ -1,3 +1,430 @@
-from django.test import TestCase
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from email_validator import EmailUndeliverableError
+
+from .creator_ingest import ilike_any, ingest_creators
+from .email_utils import DeliverabilityCache, verify_emails
+from .profile_cache import SingleDataCache
+from .thumbnails import ThumbnailCache, is_allowed_source, variant_url
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StandInResolver:
+    """Local stand-in of the DNS lookup: records every domain it is asked about."""
+
+    def __init__(self, undeliverable=(), unknown=(), failing=(), delay=0):
+        self.undeliverable = set(undeliverable)
+        self.unknown = set(unknown)
+        self.failing = set(failing)
+        self.delay = delay
+        self.lookups = []
+        self.lock = threading.Lock()
+
+    def __call__(self, ascii_domain, domain_i18n):
+        with self.lock:
+            self.lookups.append(ascii_domain)
+        time.sleep(self.delay)
+        if ascii_domain in self.undeliverable:
+            raise EmailUndeliverableError(f"The domain name {domain_i18n} does not accept email.")
+        if ascii_domain in self.failing:
+            raise OSError("Network is unreachable")
+        if ascii_domain in self.unknown:
+            return {"unknown-deliverability": "timeout"}
+        return {"mx": [(10, f"mx.{ascii_domain}")], "mx_fallback_type": None}
+
+
+class DeliverabilityCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.resolver = StandInResolver(undeliverable={"nomail.test"}, unknown={"slow.test"}, failing={"down.test"})
+        self.cache = DeliverabilityCache(self.resolver, positive_ttl=600, negative_ttl=60, clock=self.clock)
+
+    def test_deliverable_domain_is_kept_for_the_positive_ttl(self):
+        self.assertTrue(self.cache.check_domain("gmail.test"))
+        self.clock.now += 599
+        self.assertTrue(self.cache.check_domain("gmail.test"))
+        self.assertEqual(self.resolver.lookups, ["gmail.test"])
+        self.clock.now += 1
+        self.cache.check_domain("gmail.test")
+        self.assertEqual(self.resolver.lookups, ["gmail.test"] * 2)
+
+    def test_negative_entries_are_kept_for_the_negative_ttl(self):
+        self.assertFalse(self.cache.check_domain("nomail.test"))
+        # Timed out and failed lookups accept the address
+        self.assertTrue(self.cache.check_domain("slow.test"))
+        self.assertTrue(self.cache.check_domain("down.test"))
+        self.clock.now += 59
+        self.assertFalse(self.cache.check_domain("nomail.test"))
+        self.cache.check_domains([("slow.test", "slow.test"), ("down.test", "down.test")])
+        self.assertEqual(len(self.resolver.lookups), 3)
+        self.clock.now += 1
+        self.cache.check_domains([("nomail.test", "nomail.test"), ("slow.test", "slow.test"),
+                                  ("down.test", "down.test")])
+        self.assertEqual(len(self.resolver.lookups), 6)
+
+    def test_each_domain_is_resolved_once_per_call(self):
+        results = self.cache.check_domains([("a.test", "a.test"), ("b.test", "b.test"), ("a.test", "a.test"),
+                                            ("nomail.test", "nomail.test")])
+        self.assertEqual(results, {"a.test": True, "b.test": True, "nomail.test": False})
+        self.assertEqual(sorted(self.resolver.lookups), ["a.test", "b.test", "nomail.test"])
+
+    def test_concurrent_calls_share_the_lookup(self):
+        self.resolver.delay = 0.2
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.check_domain("a.test")))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(self.resolver.lookups, ["a.test"])
+
+    def test_least_recently_used_domain_is_evicted(self):
+        cache = DeliverabilityCache(self.resolver, max_size=2, clock=self.clock)
+        cache.check_domain("a.test")
+        cache.check_domain("b.test")
+        cache.check_domain("a.test")  # b.test is now the least recently used
+        cache.check_domain("c.test")
+        self.assertEqual(len(cache), 2)
+        cache.check_domain("a.test")
+        cache.check_domain("b.test")
+        self.assertEqual(self.resolver.lookups, ["a.test", "b.test", "c.test", "b.test"])
+
+
+class VerifyEmailsTests(SimpleTestCase):
+    def setUp(self):
+        self.resolver = StandInResolver(undeliverable={"nomail.net"})
+        self.cache = DeliverabilityCache(self.resolver)
+
+    def test_results_per_email(self):
+        emails = ["ana@example.com", "bob@example.com", "eve@nomail.net", "not-an-email", "a@@b.com"]
+        self.assertEqual(verify_emails(emails, cache=self.cache), {
+            "ana@example.com": True,
+            "bob@example.com": True,
+            "eve@nomail.net": False,
+            "not-an-email": False,
+            "a@@b.com": False,
+        })
+        # Invalid syntax never reaches the resolver, each domain is looked up once
+        self.assertEqual(sorted(self.resolver.lookups), ["example.com", "nomail.net"])
+
+    def test_non_string_is_invalid(self):
+        self.assertEqual(verify_emails([None], cache=self.cache), {None: False})
+        self.assertEqual(self.resolver.lookups, [])
+
+
+BUCKET_HOST = "linkmysocials.s3.amazonaws.com"
+PICTURE_URL = f"https://{BUCKET_HOST}/profilePics/ana-at-example-com-profile-pic"
+VARIANT_URL = f"https://{BUCKET_HOST}/profilePics/variants/ana-at-example-com-profile-pic-128.webp"
+
+
+def png_bytes(size=300):
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new("RGB", (size, size), "red").save(output, format="PNG")
+    return output.getvalue()
+
+
+@mock.patch.dict(os.environ, {"AWS_S3_BUCKET_NAME": "linkmysocials", "AWS_REGION": "", "THUMBNAIL_SOURCE_HOSTS": ""})
+class ThumbnailSourceTests(SimpleTestCase):
+    def test_only_https_urls_of_the_bucket_are_fetched(self):
+        self.assertTrue(is_allowed_source(PICTURE_URL))
+        self.assertTrue(is_allowed_source(f"https://{BUCKET_HOST.upper()}:443/a.png"))
+        for url in (f"http://{BUCKET_HOST}/a.png", f"https://user@{BUCKET_HOST}/a.png",
+                    f"https://{BUCKET_HOST}:8443/a.png", f"https://{BUCKET_HOST}:bad/a.png",
+                    "https://p16-sign.tiktokcdn.com/a.jpeg", "https://169.254.169.254/latest", "", None):
+            self.assertFalse(is_allowed_source(url), url)
+
+    def test_variant_url_of_uploaded_pictures(self):
+        self.assertEqual(variant_url(PICTURE_URL, 128), VARIANT_URL)
+        self.assertEqual(variant_url(f"https://{BUCKET_HOST}/Users/ana-at-example-com/profilePics/profile-pic", 128),
+                         VARIANT_URL)
+        self.assertIsNone(variant_url(f"https://{BUCKET_HOST}/pictures/ana.png", 128))
+
+
+@mock.patch.dict(os.environ, {"AWS_S3_BUCKET_NAME": "linkmysocials", "AWS_REGION": "", "THUMBNAIL_SOURCE_HOSTS": ""})
+class ThumbnailCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fetched = []
+        self.images = {}
+        self.cache = ThumbnailCache(self.directory.name, fetch=self.fetch)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        if url not in self.images:
+            raise ValueError("Picture request answered 403.")
+        return self.images[url]
+
+    def test_serves_the_s3_variant(self):
+        self.images = {VARIANT_URL: b"variant", PICTURE_URL: png_bytes()}
+        path = self.cache.get_or_create("ana", 128, lambda: PICTURE_URL)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), b"variant")
+        self.assertEqual(self.fetched, [VARIANT_URL])
+
+    def test_resizes_the_source_without_a_variant(self):
+        from PIL import Image
+
+        self.images = {PICTURE_URL: png_bytes()}
+        path = self.cache.get_or_create("ana", 128, lambda: PICTURE_URL)
+        with Image.open(path) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (128, 128)))
+        self.assertEqual(self.fetched, [VARIANT_URL, PICTURE_URL])
+
+        # Served from disk afterwards
+        self.assertEqual(self.cache.get_or_create("ana", 128, lambda: self.fail("source queried")), path)
+        self.assertEqual(len(self.fetched), 2)
+
+    def test_no_picture(self):
+        self.assertIsNone(self.cache.get_or_create("ana", 128, lambda: None))
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """In-memory stand-in of a supabase-py query on socials_mapping / user_profile."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.filters = []
+
+    def select(self, *columns):
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = "update", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.action, self.payload = "upsert", payload
+        self.client.on_conflict.append(on_conflict)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def filter(self, column, operator, criteria):
+        # ilike(any) of a Postgres array literal of LIKE patterns, evaluated like Postgres does
+        assert operator == "ilike(any)"
+        patterns = []
+        for element in re.findall(r'"((?:[^"\\]|\\.)*)"', criteria):
+            like = re.sub(r'\\(.)', r'\1', element)
+            regex = "".join(re.escape(token[1]) if token.startswith("\\") else
+                            ".*" if token == "%" else "." if token == "_" else re.escape(token)
+                            for token in re.findall(r'\\.|.', like, re.DOTALL))
+            patterns.append(re.compile(regex, re.IGNORECASE | re.DOTALL))
+        self.filters.append(lambda row: isinstance(row.get(column), str) and
+                            any(pattern.fullmatch(row[column]) for pattern in patterns))
+        return self
+
+    def order(self, column):
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.action))
+        rows = self.client.tables[self.table]
+        matched = [row for row in rows if all(check(row) for check in self.filters)]
+        if self.action == "select":
+            return FakeResponse([dict(row) for row in sorted(matched, key=lambda row: row.get("tiktok_uid", 0))])
+        if self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+            return FakeResponse([dict(row) for row in matched])
+        if self.client.down:
+            raise ConnectionError("Server disconnected")
+        written = []
+        for item in self.payload:
+            # on_conflict = tiktok_username: exact match, like the unique index
+            row = next((row for row in rows if row["tiktok_username"] == item["tiktok_username"]), None)
+            if row is None:
+                row = {"tiktok_uid": len(rows) + 1}
+                rows.append(row)
+            row.update(item)
+            written.append(dict(row))
+        return FakeResponse(written)
+
+
+class FakeClient:
+    def __init__(self, usernames=()):
+        self.tables = {
+            "socials_mapping": [{"tiktok_uid": uid, "tiktok_username": username}
+                                for uid, username in enumerate(usernames, start=1)],
+            "user_profile": [],
+        }
+        self.calls = []
+        self.on_conflict = []
+        self.down = False  # Every upsert fails
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def usernames(self):
+        return sorted(row["tiktok_username"] for row in self.tables["socials_mapping"])
+
+
+class IngestCreatorsTests(SimpleTestCase):
+    def test_batch_is_deduplicated(self):
+        client = FakeClient()
+        outcomes = ingest_creators(client, [
+            {"tiktok_username": "@Creator.One", "x_username": "https://x.com/old"},
+            {"tiktok_username": "creator_two"},
+            {"tiktok_username": " creator.one ", "x_username": "https://x.com/new"},
+            {"tiktok_username": "  @ "},
+            "not a creator",
+        ])
+        self.assertEqual([outcome["status"] for outcome in outcomes],
+                         ["duplicate", "created", "created", "invalid", "invalid"])
+        self.assertEqual(outcomes[0]["duplicate_of"], 2)
+        # The last occurrence wins, written as typed
+        self.assertEqual(client.usernames(), ["creator.one", "creator_two"])
+        self.assertEqual(client.tables["socials_mapping"][0]["x_username"], "https://x.com/new")
+
+    def test_one_select_and_one_upsert_per_chunk(self):
+        client = FakeClient()
+        outcomes = ingest_creators(client, [{"tiktok_username": f"creator_{i}"} for i in range(5)], chunk_size=2)
+        self.assertTrue(all(outcome["status"] == "created" for outcome in outcomes))
+        self.assertEqual(client.calls, [("socials_mapping", "select"), ("socials_mapping", "upsert")] * 3)
+        self.assertEqual(set(client.on_conflict), {"tiktok_username"})
+
+    def test_existing_rows_are_matched_whatever_their_case(self):
+        client = FakeClient(["Creator_Name"])
+        outcomes = ingest_creators(client, [{"tiktok_username": "@creator_name", "x_username": "https://x.com/c"}])
+        self.assertEqual(outcomes, [{"index": 0, "tiktok_username": "Creator_Name", "status": "updated",
+                                     "tiktok_uid": 1}])
+        # Updated under its stored spelling, no second row
+        self.assertEqual(client.tables["socials_mapping"], [
+            {"tiktok_uid": 1, "tiktok_username": "Creator_Name", "x_username": "https://x.com/c",
+             "profile_picture_url": None, "instagram_username": None, "facebook_username": None},
+        ])
+
+    def test_like_wildcards_are_escaped(self):
+        # '_' and '%' only match themselves: CreatorXName and creator%name are other creators
+        client = FakeClient(["CreatorXName", "creatorname100"])
+        outcomes = ingest_creators(client, [{"tiktok_username": "creator_name"}, {"tiktok_username": "creator%"},
+                                            {"tiktok_username": 'we"ird\\name'}])
+        self.assertEqual([outcome["status"] for outcome in outcomes], ["created"] * 3)
+        self.assertEqual(client.usernames(), ["CreatorXName", "creator%", "creator_name", "creatorname100",
+                                              'we"ird\\name'])
+
+        outcomes = ingest_creators(client, [{"tiktok_username": "CREATOR%"}, {"tiktok_username": 'WE"IRD\\NAME'}])
+        self.assertEqual([outcome["tiktok_username"] for outcome in outcomes], ["creator%", 'we"ird\\name'])
+        self.assertEqual([outcome["status"] for outcome in outcomes], ["updated"] * 2)
+
+    def test_ilike_any(self):
+        self.assertEqual(ilike_any(["a_b", "50%", 'q"t']), '{"a\\\\_b","50\\\\%","q\\"t"}')
+
+    def test_links_the_creators_with_an_email(self):
+        client = FakeClient()
+        client.tables["user_profile"].append({"email": "ana@example.com"})
+        outcomes = ingest_creators(client, [{"tiktok_username": "creator", "email": "ana@example.com"},
+                                            {"tiktok_username": "other", "email": "nobody@example.com"}])
+        self.assertEqual(client.tables["user_profile"], [
+            {"email": "ana@example.com", "reference_creator": 1, "creator_data_added": True},
+        ])
+        self.assertNotIn("error", outcomes[0])
+        self.assertEqual(outcomes[1]["error"], "Failed to link creator profile to user account.")
+
+    def test_failed_chunk_is_reported(self):
+        client = FakeClient()
+        client.down = True
+        outcomes = ingest_creators(client, [{"tiktok_username": "creator"}])
+        self.assertEqual(outcomes[0]["status"], "error")
+        self.assertIn("Server disconnected", outcomes[0]["error"])
+
+
+class SingleDataCacheTests(SimpleTestCase):
+    BODY = {"message": "Data found!", "data": [{"tiktok_uid": 7}]}
+
+    def make_backend(self):
+        return LocMemCache(f"single-data-{self.id()}", {})
+
+    def setUp(self):
+        self.backend = self.make_backend()
+        self.backend.clear()
+        self.cache = SingleDataCache(cache=self.backend)
+        # Another worker process, sharing the backend
+        self.other_worker = SingleDataCache(cache=self.backend)
+
+    def store(self, email="ana@example.com", uids=(7,)):
+        self.cache.put(email, self.BODY, uids=uids, generation=self.cache.generation())
+
+    def test_hit(self):
+        self.assertIsNone(self.cache.get("ana@example.com"))
+        self.store()
+        self.assertEqual(self.cache.get("ana@example.com"), self.BODY)
+        self.assertEqual(self.other_worker.get("ana@example.com"), self.BODY)
+
+    def test_invalidated_by_email_and_by_creator(self):
+        self.store()
+        self.store("bob@example.com", uids=(8,))
+        self.other_worker.invalidate(uids=[7])
+        self.assertIsNone(self.cache.get("ana@example.com"))
+        self.assertEqual(self.cache.get("bob@example.com"), self.BODY)
+        self.other_worker.invalidate(emails=["bob@example.com"])
+        self.assertIsNone(self.cache.get("bob@example.com"))
+
+    def test_response_read_before_an_invalidation_is_not_stored(self):
+        generation = self.cache.generation()
+        self.other_worker.invalidate(uids=[7])
+        self.cache.put("ana@example.com", self.BODY, uids=[7], generation=generation)
+        self.assertIsNone(self.cache.get("ana@example.com"))
+
+    def test_concurrent_bumps_never_reuse_a_version(self):
+        # A non-atomic get + incr would let both workers write the same value, here every
+        # bump writes a value no entry was stored with
+        key = self.cache._key("uid_version", 7)
+        self.store()
+        seen = {self.backend.get(key)}
+        for worker in (self.cache, self.other_worker, self.cache):
+            worker.invalidate(uids=[7])
+            self.assertNotIn(self.backend.get(key), seen)
+            seen.add(self.backend.get(key))
+
+    def test_entry_stored_between_two_bumps_is_dropped_by_the_second(self):
+        self.other_worker.invalidate(uids=[7])
+        self.store()
+        self.other_worker.invalidate(uids=[7])
+        self.assertIsNone(self.cache.get("ana@example.com"))
+
+    def test_evicted_version_drops_the_entry(self):
+        self.store()
+        self.backend.delete(self.cache._key("uid_version", 7))
+        self.assertIsNone(self.cache.get("ana@example.com"))
+
+
+class FileBasedSingleDataCacheTests(SingleDataCacheTests):
+    """Same checks on the default backend (settings.CACHES)."""
+
+    def make_backend(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return FileBasedCache(directory.name, {})
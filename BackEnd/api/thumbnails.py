@@ -0,0 +1,206 @@
+"""
+Disk-backed LRU cache of creator thumbnails for the mapping lists.
+
+socials_mapping.profile_picture_url points at full size images (megabytes per creator),
+list pages get small WebP thumbnails instead. A thumbnail is fetched/resized once per
+(creator, size), kept on disk, and the least recently served files are evicted once the
+cache grows past its byte budget.
+
+The picture URL is set by the add_creator callers, so it is only fetched from the hosts
+pictures are uploaded to (the S3 bucket, THUMBNAIL_SOURCE_HOSTS) and redirects are not followed.
+Pictures uploaded through the profile picture pipeline already have resized variants in the
+bucket (aws.s3_utils.generate_profile_picture_variants): those are served instead of resizing
+the source again.
+"""
+import hashlib
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from aws.image_utils import PROFILE_PICTURE_SIZES, resize_image
+
+THUMBNAIL_CACHE_MAX_BYTES = 200 * 1024 ** 2
+THUMBNAIL_FETCH_TIMEOUT = 5  # seconds
+THUMBNAIL_MAX_SOURCE_BYTES = 15 * 1024 ** 2
+LIST_THUMBNAIL_SIZE = 128
+
+# User and general keys of an uploaded profile picture (see aws.s3_utils.FILE_TYPES)
+PROFILE_PICTURE_PATH = re.compile(r"^/(?:Users/(?P<user>[^/]+)/profilePics/profile-pic|profilePics/(?P<general>[^/]+)-profile-pic)$")
+
+
+def allowed_source_hosts():
+    """
+    Hosts pictures may be fetched from: the S3 bucket (virtual-hosted style URLs) and the
+    comma-separated THUMBNAIL_SOURCE_HOSTS (CDN in front of the bucket...).
+    """
+    hosts = {host.strip().lower() for host in os.getenv("THUMBNAIL_SOURCE_HOSTS", "").split(",") if host.strip()}
+    bucket = os.getenv("AWS_S3_BUCKET_NAME")
+    if bucket:
+        hosts.add(f"{bucket}.s3.amazonaws.com".lower())
+        region = os.getenv("AWS_REGION")
+        if region:
+            hosts.add(f"{bucket}.s3.{region}.amazonaws.com".lower())
+    return hosts
+
+
+def is_allowed_source(url, allowed_hosts=None):
+    """Return True if `url` is an https URL of an allowed host (default: allowed_source_hosts())."""
+    if not isinstance(url, str):
+        return False
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return False
+    allowed_hosts = allowed_source_hosts() if allowed_hosts is None else allowed_hosts
+    return parts.scheme == "https" and not parts.username and not parts.password and port in (None, 443) \
+        and (parts.hostname or "").lower() in allowed_hosts
+
+
+def variant_url(url, size):
+    """
+    Return the URL of the resized WebP variant of an uploaded profile picture (same host),
+    or None if `url` is not a profile picture key of the bucket.
+    """
+    from aws.s3_utils import profile_picture_variant_keys
+
+    parts = urlsplit(url)
+    match = PROFILE_PICTURE_PATH.match(parts.path)
+    if not match:
+        return None
+    sanitized_email = match.group("user") or match.group("general")
+    return f"https://{parts.netloc}/{profile_picture_variant_keys(sanitized_email)[(size, 'WEBP')]}"
+
+
+def fetch_image(url, allowed_hosts=None):
+    """
+    Download an image over https from an allowed host (default: allowed_source_hosts()),
+    refusing redirects and bodies over THUMBNAIL_MAX_SOURCE_BYTES.
+    """
+    import requests
+
+    if not is_allowed_source(url, allowed_hosts):
+        raise ValueError("Unsupported picture URL.")
+
+    with requests.get(url, timeout=THUMBNAIL_FETCH_TIMEOUT, stream=True, allow_redirects=False) as response:
+        if response.status_code != 200:
+            raise ValueError(f"Picture request answered {response.status_code}.")
+        chunks, total = [], 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            total += len(chunk)
+            if total > THUMBNAIL_MAX_SOURCE_BYTES:
+                raise ValueError("Picture is too large.")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+class ThumbnailCache:
+    """
+    LRU cache of WebP thumbnails stored as files under `directory`.
+    The file mtime is the recency (touched on every hit), the total size is tracked in memory.
+    """
+
+    def __init__(self, directory, max_bytes=THUMBNAIL_CACHE_MAX_BYTES, fetch=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fetch = fetch or fetch_image
+
+        self._total_bytes = None  # Computed on first use
+        self._lock = threading.Lock()
+
+    def path(self, username, size):
+        digest = hashlib.sha1(username.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}-{size}.webp")
+
+    def _scan(self):
+        """Return [(mtime, size, path)] of every cached file. Caller holds the lock."""
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".webp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _ensure_total(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def get(self, username, size):
+        """Return the path of a cached thumbnail (marking it as recently used), or None."""
+        path = self.path(username, size)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, username, size, data):
+        """Store a thumbnail atomically and evict the least recently used ones over budget."""
+        path = self.path(username, size)
+        with self._lock:
+            self._ensure_total()
+            os.makedirs(self.directory, exist_ok=True)
+            try:
+                self._total_bytes -= os.path.getsize(path)
+            except OSError:
+                pass
+
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+            self._total_bytes += len(data)
+
+            if self._total_bytes > self.max_bytes:
+                for _, file_size, old_path in sorted(self._scan()):
+                    if self._total_bytes <= self.max_bytes * 0.9:
+                        break
+                    if old_path == path:
+                        continue
+                    try:
+                        os.remove(old_path)
+                        self._total_bytes -= file_size
+                    except FileNotFoundError:
+                        pass
+        return path
+
+    def get_or_create(self, username, size, load_source_url):
+        """
+        Return the path of the thumbnail. On a miss, `load_source_url()` gives the picture
+        URL (only queried then): its S3 variant of that size is stored as is when there is one,
+        otherwise the picture is fetched and resized. Returns None if there is no picture.
+        """
+        path = self.get(username, size)
+        if path:
+            return path
+        source_url = load_source_url()
+        if not source_url:
+            return None
+        if is_allowed_source(source_url):
+            resized_url = variant_url(source_url, size)
+            if resized_url:
+                try:
+                    return self.put(username, size, self.fetch(resized_url))
+                except (ValueError, OSError):
+                    pass  # Variant not generated (yet), resize the source
+        return self.put(username, size, resize_image(self.fetch(source_url), size, 'WEBP'))
+
+    def invalidate(self, username):
+        """Drop every cached size of a creator (their picture changed)."""
+        with self._lock:
+            self._ensure_total()
+            for size in PROFILE_PICTURE_SIZES:
+                path = self.path(username, size)
+                try:
+                    file_size = os.path.getsize(path)
+                    os.remove(path)
+                    self._total_bytes -= file_size
+                except FileNotFoundError:
+                    pass
+
+
+# Process-wide cache used by the api views
+thumbnail_cache = ThumbnailCache(os.path.join(settings.MEDIA_ROOT, "thumbnails"))
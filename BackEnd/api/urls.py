@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import upload_json_file, get_profile_mappings, create_user_profile, check_email, personalized_Algorithm_Data, personalized_creator_recommendation, add_creator, get_single_data, verify_email_exists
+from .views import upload_json_file, get_profile_mappings, create_user_profile, check_email, personalized_Algorithm_Data, personalized_creator_recommendation, add_creator, add_creators_bulk, creator_thumbnail, get_single_data, verify_email_exists, verify_emails_batch
 
 urlpatterns = [
         path('upload-json/', upload_json_file, name='upload_json_file_no_email'),  # No email/Not logged in path
@@ -8,8 +8,11 @@ urlpatterns = [
         path('create-user-profile/', create_user_profile, name='create_user_profile'),
         path('check-email/', check_email, name='check_email'), #! Very bad naming, this checks email AND returns user data
         path('add-creator/', add_creator, name='add_creator'),
+        path('add-creators-bulk/', add_creators_bulk, name='add_creators_bulk'),
         path('personalized-algorithm-data/', personalized_Algorithm_Data, name='personalized_algorithm_Data'),
         path('personalized-creator-recommendation/', personalized_creator_recommendation, name='personalized_creator_recommendation'),
         path('get-single-data/<str:email>/', get_single_data, name='get_single_data'),
-        path('verify-email/', verify_email_exists, name='verify_email_exists')
+        path('creator-thumbnail/<str:username>/<int:size>/', creator_thumbnail, name='creator_thumbnail'),
+        path('verify-email/', verify_email_exists, name='verify_email_exists'),
+        path('verify-emails/', verify_emails_batch, name='verify_emails_batch')
 ]
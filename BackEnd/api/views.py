@@ -14,9 +14,12 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import os
-from email_validator import validate_email, EmailNotValidError
-from .email_utils import send_welcome_email
-from django.http import HttpResponse
+from .email_utils import send_welcome_email, verify_emails
+from .creator_ingest import ingest_creators, MAX_BULK_CREATORS
+from .profile_cache import single_data_cache
+from .thumbnails import thumbnail_cache, allowed_source_hosts, is_allowed_source, LIST_THUMBNAIL_SIZE, PROFILE_PICTURE_SIZES
+from urllib.parse import quote
+from django.http import HttpResponse, FileResponse, Http404
 
 def index_view(request):
     return render(request, "index.html")
@@ -52,11 +55,29 @@ def sitemap_xml_view(request):
 @api_view(['POST'])
 def verify_email_exists(request):
     email = request.data.get('email')
+    # Deliverability (DNS MX lookup) is cached per domain, see email_utils.DeliverabilityCache
+    exists = verify_emails([email])[email]
+    return Response({"exists": exists}, status=200)
+
+@api_view(['POST'])
+def verify_emails_batch(request):
+    """
+    API to verify many email addresses in one call.
+    Each distinct domain is resolved at most once (and only if not already cached).
+    """
+    emails = request.data.get('emails', [])
+
+    if not emails or not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+        return Response({"error": "Invalid or missing 'emails' list."}, status=400)
+
     try:
-        validate_email(email)
-        return Response({"exists": True}, status=200)
-    except EmailNotValidError:
-        return Response({"exists": False}, status=200)
+        results = verify_emails(emails)
+    except Exception as e:
+        return Response({"error": f"An unexpected error occurred: {str(e)}"}, status=500)
+
+    return Response({
+        "results": [{"email": email, "exists": results[email]} for email in emails]
+    }, status=200)
 
 @api_view(['POST'])
 def check_email(request):
@@ -241,11 +262,20 @@ def get_profile_mappings(request):
         return Response({"profiles": []}, status=200)  # Return an empty list if the data is invalid
 
     result = []
+    allowed_hosts = allowed_source_hosts()
     for profile in mapping_arr:
         try:
+            # Lists show small cached thumbnails instead of the full size pictures, for the
+            # pictures the thumbnail endpoint can fetch (other hosts keep their original URL)
+            picture_url = profile.get("profile_picture_url", "")
+            if picture_url and is_allowed_source(picture_url, allowed_hosts):
+                picture_url = request.build_absolute_uri(
+                    f"/api/creator-thumbnail/{quote(profile['tiktok_username'], safe='')}/{LIST_THUMBNAIL_SIZE}/"
+                )
             result.append({
                 "UserName": profile["tiktok_username"],
-                "profile_picture": profile.get("profile_picture_url", ""),
+                "profile_picture": picture_url,
+                "profile_picture_original": profile.get("profile_picture_url", ""),
                 "instagram_url": profile.get("instagram_username", ""),
                 "facebook_url": profile.get("facebook_username", ""),
                 "twitter_url": profile.get("x_username", ""),
@@ -429,12 +459,17 @@ def add_creator(request):
         
         if existing_creator.data:
             # Update existing creator
-            update_response = supabase.table("socials_mapping").update({
-                "profile_picture_url": profile_picture_url,
-                "instagram_username": instagram_username,
-                "x_username": x_username,
-                "facebook_username": facebook_username
-            }).eq("tiktok_username", tiktok_username).execute()
+            try:
+                update_response = supabase.table("socials_mapping").update({
+                    "profile_picture_url": profile_picture_url,
+                    "instagram_username": instagram_username,
+                    "x_username": x_username,
+                    "facebook_username": facebook_username
+                }).eq("tiktok_username", tiktok_username).execute()
+            finally:
+                # Drop cached profile pages showing this creator, even if a later step fails
+                single_data_cache.invalidate(uids=[existing_creator.data[0].get("tiktok_uid")])
+                thumbnail_cache.invalidate(tiktok_username)
             
             if not update_response.data:
                 return Response({"error": "Failed to update creator profile."}, status=500)
@@ -457,10 +492,14 @@ def add_creator(request):
 
         # Now update the user_profile table if email is provided
         if email and tiktok_uid:
-            user_update = supabase.table("user_profile").update({
-                "reference_creator": tiktok_uid,
-                "creator_data_added": True
-            }).eq("email", email).execute()
+            try:
+                user_update = supabase.table("user_profile").update({
+                    "reference_creator": tiktok_uid,
+                    "creator_data_added": True
+                }).eq("email", email).execute()
+            finally:
+                # The profile page of this email changes even if the link fails midway
+                single_data_cache.invalidate(emails=[email])
 
             if not user_update.data:
                 return Response({"error": "Failed to link creator profile to user account."}, status=500)
@@ -472,10 +511,82 @@ def add_creator(request):
     except Exception as e:
         return Response({"error": f"Failed to process creator data: {str(e)}"}, status=500)
 
+@api_view(['POST'])
+def add_creators_bulk(request):
+    """
+    API to add/update many creators in the socials_mapping table at once.
+    Creators are deduplicated by normalized TikTok username and written with batched upserts.
+
+    Body: {"creators": [{"tiktok_username": ..., "instagram_username": ..., ...}, ...]}
+    """
+    creators = request.data.get("creators", [])
+
+    if not creators or not isinstance(creators, list):
+        return Response({"error": "Invalid or missing 'creators' list."}, status=400)
+
+    if len(creators) > MAX_BULK_CREATORS:
+        return Response({"error": f"At most {MAX_BULK_CREATORS} creators can be sent per request."}, status=400)
+
+    try:
+        outcomes = ingest_creators(supabase, creators)
+    except Exception as e:
+        return Response({"error": f"Failed to process creator data: {str(e)}"}, status=500)
+
+    # Drop cached profile pages showing any of the written creators
+    single_data_cache.invalidate(
+        emails=[creator.get("email") for creator in creators if isinstance(creator, dict) and creator.get("email")],
+        uids=[outcome["tiktok_uid"] for outcome in outcomes if outcome.get("tiktok_uid") is not None]
+    )
+    for outcome in outcomes:
+        if outcome["status"] in ("created", "updated"):
+            thumbnail_cache.invalidate(outcome["tiktok_username"])
+
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+
+    return Response({
+        "message": "Creators processed.",
+        "counts": counts,
+        "results": outcomes
+    }, status=200)
+
+@api_view(['GET'])
+def creator_thumbnail(request, username, size):
+    """
+    API to serve a creator's profile picture as a small WebP thumbnail.
+    Thumbnails are built once and then served from a disk-backed LRU cache (see thumbnails.py).
+    """
+    if size not in PROFILE_PICTURE_SIZES:
+        return Response({"error": f"Invalid size. Supported sizes are {list(PROFILE_PICTURE_SIZES)}."}, status=400)
+
+    def load_source_url():
+        response = supabase.table("socials_mapping").select("profile_picture_url").eq("tiktok_username", username).execute()
+        return response.data[0].get("profile_picture_url") if response.data else None
+
+    try:
+        path = thumbnail_cache.get_or_create(username, size, load_source_url)
+        picture = open(path, "rb") if path else None
+    except FileNotFoundError:
+        # Evicted by another process between the lookup and the open
+        return Response({"error": "Profile picture is being refreshed, please retry."}, status=502)
+    except Exception as e:
+        return Response({"error": f"Failed to load profile picture: {str(e)}"}, status=502)
+
+    if picture is None:
+        raise Http404("No profile picture for this creator.")
+
+    response = FileResponse(picture, content_type="image/webp")
+    response["Cache-Control"] = "public, max-age=86400"
+    return response
+
 @api_view(['GET'])
 def get_single_data(request, email):
     """
     API to get a single creator's data from the database using their email.
+    The linked creator is resolved in the same query (embedded select on the
+    user_profile.reference_creator -> socials_mapping.tiktok_uid foreign key),
+    and responses are cached per email (see profile_cache.SingleDataCache).
 
     Args:
         email (str): The email address of the user to fetch data for.
@@ -485,26 +596,34 @@ def get_single_data(request, email):
     """
     if email is None:
         return Response({"error": "Email is required!"}, status=400)
-    
-    # Check if the user profile has a linked entry in socials mappings
-    try:
-        # Query the socials_mapping table using the email
-        user_response = supabase.table("user_profile").select("*").eq("email", email).execute()
 
-        if not user_response.data:
-            return Response({"message": "No data found!", "data": []}, status=200)
-            
-        if user_response.data[0].get("creator_data_added"):
-            creator_uid = user_response.data[0].get("reference_creator")
+    cached = single_data_cache.get(email)
+    if cached is not None:
+        return Response(cached, status=200)
 
-            if creator_uid:
-                response = supabase.table("socials_mapping").select("*").eq("tiktok_uid", creator_uid).execute()
+    # Taken before querying so a concurrent add_creator invalidation is not overwritten
+    generation = single_data_cache.generation()
 
+    try:
+        # Single round trip: user profile + linked socials_mapping row
+        user_response = supabase.table("user_profile").select(
+            "creator_data_added, creator:socials_mapping!reference_creator(*)"
+        ).eq("email", email).execute()
+
+        data = []
+        if user_response.data and user_response.data[0].get("creator_data_added"):
+            creator = user_response.data[0].get("creator")
+            if creator:
+                data = creator if isinstance(creator, list) else [creator]
+
+        if data:
+            body = {"message": "Data found!", "data": data}
+        else:
+            body = {"message": "No data found!", "data": []}
 
-                if response.data:
-                    return Response({"message": "Data found!", "data": response.data}, status=200)
-        return Response({"message": "No data found!", "data": []}, status=200)
+        single_data_cache.put(email, body, uids=[row.get("tiktok_uid") for row in data], generation=generation)
+        return Response(body, status=200)
 
     except Exception as e:
         # Log the error but return empty response
-        return Response({"message": "No data found!", "error": str(e)}, status=200)
\ No newline at end of file
+        return Response({"message": "No data found!", "error": str(e)}, status=200)
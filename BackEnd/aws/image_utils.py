@@ -0,0 +1,55 @@
+"""
+Image resizing shared by the profile picture pipeline (S3 variants) and the
+creator thumbnail cache (api/thumbnails.py).
+"""
+import io
+
+PROFILE_PICTURE_SIZES = (64, 128, 512)
+
+# format -> (file extension, content type, save options)
+IMAGE_FORMATS = {
+    'WEBP': ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+# Refuse to decode anything bigger than this (decompression bombs)
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+def resize_image(image_bytes, size, image_format='WEBP'):
+    """
+    Center-crop an image to a square and resize it to `size` x `size` pixels.
+
+    Args:
+        image_bytes (bytes): Source image (any format Pillow can read).
+        size (int): Output width/height in pixels.
+        image_format (str): 'WEBP' or 'JPEG'.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    from PIL import Image, ImageOps
+
+    _, _, save_options = IMAGE_FORMATS[image_format]
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise ValueError(f"Image too large ({image.width}x{image.height}).")
+
+        # Let the JPEG decoder downscale while decoding (much faster for big photos)
+        image.draft('RGB', (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA') or image_format == 'JPEG':
+            image = image.convert('RGB')
+
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        thumbnail.save(output, format=image_format, **save_options)
+        return output.getvalue()
+
+
+def resize_variants(image_bytes, sizes=PROFILE_PICTURE_SIZES, image_formats=tuple(IMAGE_FORMATS)):
+    """Yield (size, image_format, encoded bytes) for every requested size and format."""
+    for size in sizes:
+        for image_format in image_formats:
+            yield size, image_format, resize_image(image_bytes, size, image_format)
@@ -0,0 +1,455 @@
+"""
+Shared S3 helpers for the aws views.
+
+- One boto3 client per process, created lazily on first use (building a client
+  costs tens of milliseconds, signing a URL with an existing one is sub-millisecond).
+- Presigned PUT URLs are cached per (key, content type) and reused until they get
+  close to expiring.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PRESIGNED_URL_EXPIRY = 604800  # 7 days (max allowed for SigV4)
+PRESIGNED_URL_REFRESH_MARGIN = 60 * 60  # Re-sign when less than 1 hour is left
+PRESIGNED_URL_CACHE_SIZE = 10000
+
+# Largest object a single CopyObject call accepts
+COPY_OBJECT_MAX_SIZE = 5 * 1024 ** 3
+COPY_SOURCE_ETAG_METADATA = 'source-etag'
+
+# Background workers resizing uploaded profile pictures
+IMAGE_WORKERS = 2
+PROFILE_PICTURE_MAX_SOURCE_BYTES = 15 * 1024 ** 2  # Larger uploads get no variants
+
+# Multipart uploads (large TikTok exports): S3 allows 5MiB..5GiB parts and at most 10,000 parts
+MULTIPART_MIN_PART_SIZE = 5 * 1024 ** 2
+MULTIPART_DEFAULT_PART_SIZE = 8 * 1024 ** 2  # Small enough to retry cheaply over a mobile link
+MULTIPART_MAX_PART_SIZE = 5 * 1024 ** 3
+MULTIPART_MAX_PARTS = 10000
+MULTIPART_PART_URL_EXPIRY = 24 * 60 * 60
+
+# file_type -> (user key template, general key template, content type)
+FILE_TYPES = {
+    'json': ("Users/{email}/TikTokData/tiktok-data.json", "TikTokData/{email}-tiktok-data.json", 'application/json'),
+    'png': ("Users/{email}/profilePics/profile-pic", "profilePics/{email}-profile-pic", 'image/png'),
+    'jpg': ("Users/{email}/profilePics/profile-pic", "profilePics/{email}-profile-pic", 'image/jpeg'),
+    'jpeg': ("Users/{email}/profilePics/profile-pic", "profilePics/{email}-profile-pic", 'image/jpeg'),
+}
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+_image_executor = None
+
+
+def sanitize_email(email):
+    """
+    Sanitize email addresses for S3 key usage:
+    - Replace '@' with '-at-'
+    - Replace '.' with '-'
+    """
+    return re.sub(r'[@]', '-at-', re.sub(r'[.]', '-', email))
+
+
+def get_bucket_name():
+    return os.getenv('AWS_S3_BUCKET_NAME')
+
+
+def create_s3_client():
+    """
+    Build a new boto3 S3 client from the environment.
+    AWS_S3_ENDPOINT_URL can point to a local S3-compatible stand-in (MinIO, LocalStack...).
+    """
+    import boto3
+
+    return boto3.client(
+        's3',
+        region_name=os.getenv('AWS_REGION'),
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        endpoint_url=os.getenv('AWS_S3_ENDPOINT_URL') or None
+    )
+
+
+def get_s3_client():
+    """Return the process-wide S3 client, creating it on first use (boto3 clients are thread safe)."""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = create_s3_client()
+    return _s3_client
+
+
+def object_keys(sanitized_email, file_type):
+    """Return (user_object_key, general_object_key, content_type) for a supported file type."""
+    user_template, general_template, content_type = FILE_TYPES[file_type]
+    return user_template.format(email=sanitized_email), general_template.format(email=sanitized_email), content_type
+
+
+class PresignedUrlCache:
+    """
+    Cache of presigned PUT URLs keyed by (bucket, key, content type).
+    A URL is handed out again until less than `refresh_margin` seconds of validity are left.
+    """
+
+    def __init__(self, expires_in=PRESIGNED_URL_EXPIRY, refresh_margin=PRESIGNED_URL_REFRESH_MARGIN,
+                 max_size=PRESIGNED_URL_CACHE_SIZE, clock=None):
+        self.expires_in = expires_in
+        self.refresh_margin = refresh_margin
+        self.max_size = max_size
+        self.clock = clock or time.time
+
+        self._entries = OrderedDict()  # (bucket, key, content_type) -> (url, expires_at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def presigned_put_url(self, bucket_name, key, content_type, s3_client=None):
+        cache_key = (bucket_name, key, content_type)
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[1] - self.refresh_margin > now:
+                self._entries.move_to_end(cache_key)
+                return entry[0]
+
+        # Signing is local (no request to S3), no need to hold the lock for it
+        url = (s3_client or get_s3_client()).generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': bucket_name,
+                'Key': key,
+                'ContentType': content_type
+            },
+            ExpiresIn=self.expires_in,
+            HttpMethod='PUT'
+        )
+
+        with self._lock:
+            self._entries[cache_key] = (url, now + self.expires_in)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return url
+
+
+# Process-wide cache used by the aws views
+presigned_url_cache = PresignedUrlCache()
+
+
+def presign_file_type(bucket_name, sanitized_email, file_type):
+    """
+    Presign the upload of a file type, returns the payload sent back to the client.
+
+    Clients upload once to `user_presigned_url` and then call the upload-complete endpoint,
+    which copies the object to the general key server side (see copy_to_general_key).
+    `general_presigned_url` is still returned for older app builds that upload twice.
+    """
+    user_object_key, general_object_key, content_type = object_keys(sanitized_email, file_type)
+    general_presigned_url = presigned_url_cache.presigned_put_url(bucket_name, general_object_key, content_type)
+    return {
+        'user_presigned_url': presigned_url_cache.presigned_put_url(bucket_name, user_object_key, content_type),
+        'general_presigned_url': general_presigned_url,
+        'general_object_url': general_presigned_url.split('?')[0],
+        'user_object_key': user_object_key,
+        'general_object_key': general_object_key
+    }
+
+
+def _is_not_found(error):
+    return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+
+def copy_to_general_key(bucket_name, sanitized_email, file_type, s3_client=None):
+    """
+    Fan an uploaded object out from its user key to its general key with a server-side copy
+    (the bytes never go through this server or the client a second time).
+
+    Idempotent under retries: the copy records the source ETag in its metadata, and is
+    skipped when the general object already holds that exact version of the source.
+
+    Returns:
+        dict: status ('copied' or 'already_copied'), the object keys and the source ETag.
+        None if the source object has not been uploaded.
+    """
+    from botocore.exceptions import ClientError
+
+    client = s3_client or get_s3_client()
+    user_object_key, general_object_key, content_type = object_keys(sanitized_email, file_type)
+    result = {'user_object_key': user_object_key, 'general_object_key': general_object_key}
+
+    try:
+        source = client.head_object(Bucket=bucket_name, Key=user_object_key)
+    except ClientError as e:
+        if _is_not_found(e):
+            return None
+        raise
+    source_etag = source['ETag']
+    result['etag'] = source_etag
+
+    try:
+        destination = client.head_object(Bucket=bucket_name, Key=general_object_key)
+        if destination.get('Metadata', {}).get(COPY_SOURCE_ETAG_METADATA) == source_etag:
+            result['status'] = 'already_copied'
+            return result
+    except ClientError as e:
+        if not _is_not_found(e):
+            raise
+
+    copy_source = {'Bucket': bucket_name, 'Key': user_object_key}
+    metadata = dict(source.get('Metadata', {}))
+    metadata[COPY_SOURCE_ETAG_METADATA] = source_etag
+    extra_args = {
+        'MetadataDirective': 'REPLACE',
+        'Metadata': metadata,
+        'ContentType': source.get('ContentType') or content_type,
+    }
+
+    if source.get('ContentLength', 0) <= COPY_OBJECT_MAX_SIZE:
+        # CopySourceIfMatch: fail instead of copying a newer upload than the one checked above
+        client.copy_object(Bucket=bucket_name, Key=general_object_key, CopySource=copy_source,
+                           CopySourceIfMatch=source_etag, **extra_args)
+    else:
+        # Objects over 5GB need a (managed) multipart copy
+        extra_args['CopySourceIfMatch'] = source_etag
+        client.copy(copy_source, bucket_name, general_object_key, ExtraArgs=extra_args)
+
+    result['status'] = 'copied'
+    return result
+
+
+def profile_picture_variant_keys(sanitized_email):
+    """Return {(size, image_format): key} for the resized variants of a profile picture."""
+    from .image_utils import PROFILE_PICTURE_SIZES, IMAGE_FORMATS
+
+    return {
+        (size, image_format): f"profilePics/variants/{sanitized_email}-profile-pic-{size}.{extension}"
+        for size in PROFILE_PICTURE_SIZES
+        for image_format, (extension, _, _) in IMAGE_FORMATS.items()
+    }
+
+
+def generate_profile_picture_variants(bucket_name, sanitized_email, s3_client=None):
+    """
+    Build the fixed-size WebP/JPEG variants of an uploaded profile picture and store
+    them under their derived keys (see profile_picture_variant_keys).
+
+    Idempotent: every variant records the source ETag, and nothing is regenerated
+    when the last written variant already matches the current source.
+
+    Returns:
+        str: 'generated', 'already_generated', 'missing' (no uploaded picture) or 'too_large'
+            (over PROFILE_PICTURE_MAX_SOURCE_BYTES).
+    """
+    from botocore.exceptions import ClientError
+    from .image_utils import resize_variants, IMAGE_FORMATS
+
+    client = s3_client or get_s3_client()
+    user_object_key, _, _ = object_keys(sanitized_email, 'png')
+    variant_keys = profile_picture_variant_keys(sanitized_email)
+
+    try:
+        source = client.get_object(Bucket=bucket_name, Key=user_object_key)
+    except ClientError as e:
+        if _is_not_found(e):
+            return 'missing'
+        raise
+    source_etag = source['ETag']
+
+    try:
+        last_variant = client.head_object(Bucket=bucket_name, Key=list(variant_keys.values())[-1])
+        if last_variant.get('Metadata', {}).get(COPY_SOURCE_ETAG_METADATA) == source_etag:
+            source['Body'].close()
+            return 'already_generated'
+    except ClientError as e:
+        if not _is_not_found(e):
+            raise
+
+    # The picture is user uploaded: never read more than the cap into memory
+    if source.get('ContentLength', 0) > PROFILE_PICTURE_MAX_SOURCE_BYTES:
+        source['Body'].close()
+        return 'too_large'
+    image_bytes = source['Body'].read(PROFILE_PICTURE_MAX_SOURCE_BYTES + 1)
+    source['Body'].close()
+    if len(image_bytes) > PROFILE_PICTURE_MAX_SOURCE_BYTES:
+        return 'too_large'
+    for size, image_format, variant in resize_variants(image_bytes):
+        client.put_object(
+            Bucket=bucket_name,
+            Key=variant_keys[(size, image_format)],
+            Body=variant,
+            ContentType=IMAGE_FORMATS[image_format][1],
+            CacheControl='public, max-age=31536000',
+            Metadata={COPY_SOURCE_ETAG_METADATA: source_etag}
+        )
+    return 'generated'
+
+
+def _run_profile_picture_variants(bucket_name, sanitized_email):
+    try:
+        generate_profile_picture_variants(bucket_name, sanitized_email)
+    except Exception as e:
+        print(f"Failed to generate profile picture variants for {sanitized_email}: {str(e)}")
+
+
+def schedule_profile_picture_variants(bucket_name, sanitized_email):
+    """Generate the profile picture variants in the background (the upload callback doesn't wait for it)."""
+    global _image_executor
+    if _image_executor is None:
+        with _s3_client_lock:
+            if _image_executor is None:
+                _image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='profile-pics')
+    return _image_executor.submit(_run_profile_picture_variants, bucket_name, sanitized_email)
+
+
+def multipart_part_size(file_size):
+    """
+    Part size for a multipart upload of `file_size` bytes: the default size, grown
+    (in whole MiB) only when the file would otherwise need more than 10,000 parts.
+    """
+    part_size = max(MULTIPART_DEFAULT_PART_SIZE, -(-file_size // MULTIPART_MAX_PARTS))
+    part_size = -(-part_size // 1024 ** 2) * 1024 ** 2
+    return min(max(part_size, MULTIPART_MIN_PART_SIZE), MULTIPART_MAX_PART_SIZE)
+
+
+def presign_upload_parts(bucket_name, key, upload_id, part_numbers, s3_client=None):
+    """Presign one PUT URL per part number of a multipart upload."""
+    client = s3_client or get_s3_client()
+    return [
+        {
+            'part_number': part_number,
+            'url': client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': bucket_name,
+                    'Key': key,
+                    'UploadId': upload_id,
+                    'PartNumber': part_number
+                },
+                ExpiresIn=MULTIPART_PART_URL_EXPIRY,
+                HttpMethod='PUT'
+            )
+        }
+        for part_number in part_numbers
+    ]
+
+
+def create_multipart_upload(bucket_name, sanitized_email, file_type, file_size, s3_client=None):
+    """
+    Start a multipart upload to the user key of a file type and presign every part.
+    Parts can then be sent concurrently, and only the failed ones retried.
+    """
+    client = s3_client or get_s3_client()
+    user_object_key, general_object_key, content_type = object_keys(sanitized_email, file_type)
+
+    part_size = multipart_part_size(file_size)
+    part_count = max(1, -(-file_size // part_size))
+    if part_count > MULTIPART_MAX_PARTS:
+        raise ValueError(f"File too large for a multipart upload ({file_size} bytes).")
+
+    response = client.create_multipart_upload(Bucket=bucket_name, Key=user_object_key, ContentType=content_type)
+    upload_id = response['UploadId']
+
+    return {
+        'upload_id': upload_id,
+        'user_object_key': user_object_key,
+        'general_object_key': general_object_key,
+        'content_type': content_type,
+        'part_size': part_size,
+        'part_count': part_count,
+        'parts': presign_upload_parts(bucket_name, user_object_key, upload_id, range(1, part_count + 1), client)
+    }
+
+
+def complete_multipart_upload(bucket_name, sanitized_email, file_type, upload_id, parts, s3_client=None):
+    """
+    Complete a multipart upload from the client's (part_number, etag) list,
+    then copy the object to its general key (see copy_to_general_key).
+    A retried completion of an upload that already went through only re-runs the (idempotent) copy.
+    """
+    from botocore.exceptions import ClientError
+
+    client = s3_client or get_s3_client()
+    user_object_key, _, _ = object_keys(sanitized_email, file_type)
+
+    try:
+        client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=user_object_key,
+            UploadId=upload_id,
+            MultipartUpload={
+                'Parts': sorted(
+                    ({'PartNumber': int(part['part_number']), 'ETag': part['etag']} for part in parts),
+                    key=lambda part: part['PartNumber']
+                )
+            }
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+            raise
+
+    return copy_to_general_key(bucket_name, sanitized_email, file_type, client)
+
+
+def abort_multipart_upload(bucket_name, sanitized_email, file_type, upload_id, s3_client=None):
+    """Abort a multipart upload so S3 drops the parts already uploaded."""
+    client = s3_client or get_s3_client()
+    user_object_key, _, _ = object_keys(sanitized_email, file_type)
+    client.abort_multipart_upload(Bucket=bucket_name, Key=user_object_key, UploadId=upload_id)
+
+
+if __name__ == "__main__":
+    # Signing latency benchmark. Presigning never contacts S3, so dummy credentials
+    # and a local endpoint (S3 stand-in) are enough.
+    os.environ.setdefault('AWS_REGION', 'us-east-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local-test-key')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local-test-secret')
+    os.environ.setdefault('AWS_S3_ENDPOINT_URL', 'http://127.0.0.1:9000')
+
+    bucket = 'linkmysocials-bench'
+    runs = 50
+
+    def timed(label, func):
+        start = time.perf_counter()
+        for i in range(runs):
+            func(i)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{label:<40} {elapsed * 1000:8.3f} ms/request")
+
+    def new_client_per_request(i):
+        client = create_s3_client()
+        email = sanitize_email(f"user{i}@example.com")
+        for file_type in ('json', 'png'):
+            user_key, general_key, content_type = object_keys(email, file_type)
+            for key in (user_key, general_key):
+                client.generate_presigned_url('put_object', Params={'Bucket': bucket, 'Key': key, 'ContentType': content_type},
+                                              ExpiresIn=PRESIGNED_URL_EXPIRY, HttpMethod='PUT')
+
+    def shared_client_batch(i):
+        email = sanitize_email(f"user{i}@example.com")
+        for file_type in ('json', 'png'):
+            presign_file_type(bucket, email, file_type)
+
+    def cached_batch(i):
+        email = sanitize_email("user0@example.com")
+        for file_type in ('json', 'png'):
+            presign_file_type(bucket, email, file_type)
+
+    timed("new client per request (json + png)", new_client_per_request)
+    get_s3_client()
+    timed("shared client, batch (json + png)", shared_client_batch)
+    timed("shared client, cached URLs", cached_batch)
@@ -0,0 +1,149 @@
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from django.test import SimpleTestCase
+
+from .s3_utils import (
+    COPY_SOURCE_ETAG_METADATA, MULTIPART_DEFAULT_PART_SIZE, MULTIPART_MAX_PART_SIZE, MULTIPART_MAX_PARTS,
+    MULTIPART_MIN_PART_SIZE, abort_multipart_upload, complete_multipart_upload, create_multipart_upload,
+    multipart_part_size, object_keys, sanitize_email
+)
+
+MIB = 1024 ** 2
+BUCKET = 'linkmysocials-test'
+EMAIL = sanitize_email('multipart@example.com')
+USER_KEY, GENERAL_KEY, CONTENT_TYPE = object_keys(EMAIL, 'json')
+PARTS = [{'part_number': 2, 'etag': '"b"'}, {'part_number': '1', 'etag': '"a"'}]
+
+
+class MultipartPartSizeTests(SimpleTestCase):
+    def test_default_size_up_to_10000_parts(self):
+        self.assertEqual(multipart_part_size(0), MULTIPART_DEFAULT_PART_SIZE)
+        self.assertEqual(multipart_part_size(100 * MIB), MULTIPART_DEFAULT_PART_SIZE)
+        self.assertEqual(multipart_part_size(MULTIPART_MAX_PARTS * MULTIPART_DEFAULT_PART_SIZE),
+                         MULTIPART_DEFAULT_PART_SIZE)
+
+    def test_grows_in_whole_mib_past_10000_parts(self):
+        file_size = MULTIPART_MAX_PARTS * MULTIPART_DEFAULT_PART_SIZE + 1
+        part_size = multipart_part_size(file_size)
+        self.assertEqual(part_size, MULTIPART_DEFAULT_PART_SIZE + MIB)
+        self.assertLessEqual(-(-file_size // part_size), MULTIPART_MAX_PARTS)
+
+        for file_size in (100 * 1024 ** 3, 1024 ** 4, 5 * 1024 ** 4):
+            part_size = multipart_part_size(file_size)
+            self.assertEqual(part_size % MIB, 0)
+            self.assertLessEqual(-(-file_size // part_size), MULTIPART_MAX_PARTS)
+
+    def test_stays_within_the_s3_limits(self):
+        for file_size in (0, 1, 5 * MIB, 10 * 1024 ** 4, 100 * 1024 ** 4):
+            part_size = multipart_part_size(file_size)
+            self.assertGreaterEqual(part_size, MULTIPART_MIN_PART_SIZE)
+            self.assertLessEqual(part_size, MULTIPART_MAX_PART_SIZE)
+
+
+class StubbedS3TestCase(SimpleTestCase):
+    def setUp(self):
+        # Dummy credentials: presigning is local, every other call is answered by the stubber
+        self.client = boto3.client('s3', region_name='us-east-1', aws_access_key_id='local-test-key',
+                                   aws_secret_access_key='local-test-secret')
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def not_found(self, key):
+        self.stubber.add_client_error('head_object', service_error_code='404', http_status_code=404,
+                                      expected_params={'Bucket': BUCKET, 'Key': key})
+
+    def head(self, key, etag, metadata=None):
+        self.stubber.add_response('head_object', {
+            'ETag': etag, 'ContentLength': 12345, 'ContentType': CONTENT_TYPE, 'Metadata': metadata or {}
+        }, {'Bucket': BUCKET, 'Key': key})
+
+
+class CreateMultipartUploadTests(StubbedS3TestCase):
+    def test_presigns_every_part(self):
+        self.stubber.add_response('create_multipart_upload', {'UploadId': 'upload-1'},
+                                  {'Bucket': BUCKET, 'Key': USER_KEY, 'ContentType': CONTENT_TYPE})
+        upload = create_multipart_upload(BUCKET, EMAIL, 'json', 2 * MULTIPART_DEFAULT_PART_SIZE + 1, self.client)
+        self.stubber.assert_no_pending_responses()
+
+        self.assertEqual(upload['upload_id'], 'upload-1')
+        self.assertEqual((upload['part_size'], upload['part_count']), (MULTIPART_DEFAULT_PART_SIZE, 3))
+        self.assertEqual([part['part_number'] for part in upload['parts']], [1, 2, 3])
+        for part in upload['parts']:
+            self.assertIn(f"/{USER_KEY}?", part['url'])
+            self.assertIn(f"partNumber={part['part_number']}", part['url'])
+            self.assertIn('uploadId=upload-1', part['url'])
+
+    def test_empty_file_is_one_part(self):
+        self.stubber.add_response('create_multipart_upload', {'UploadId': 'upload-1'})
+        self.assertEqual(create_multipart_upload(BUCKET, EMAIL, 'json', 0, self.client)['part_count'], 1)
+
+    def test_rejects_files_over_10000_max_size_parts(self):
+        with self.assertRaises(ValueError):
+            create_multipart_upload(BUCKET, EMAIL, 'json', MULTIPART_MAX_PARTS * MULTIPART_MAX_PART_SIZE + 1,
+                                    self.client)
+        # Rejected before an upload is started
+        self.stubber.assert_no_pending_responses()
+
+
+class CompleteMultipartUploadTests(StubbedS3TestCase):
+    def expect_complete(self, error_code=None):
+        expected_params = {
+            'Bucket': BUCKET, 'Key': USER_KEY, 'UploadId': 'upload-1',
+            'MultipartUpload': {'Parts': [{'PartNumber': 1, 'ETag': '"a"'}, {'PartNumber': 2, 'ETag': '"b"'}]},
+        }
+        if error_code:
+            self.stubber.add_client_error('complete_multipart_upload', service_error_code=error_code,
+                                          http_status_code=404, expected_params=expected_params)
+        else:
+            self.stubber.add_response('complete_multipart_upload', {'ETag': '"ab-2"'}, expected_params)
+
+    def expect_copy(self, etag):
+        self.stubber.add_response('copy_object', {'CopyObjectResult': {'ETag': etag}}, {
+            'Bucket': BUCKET, 'Key': GENERAL_KEY, 'CopySource': {'Bucket': BUCKET, 'Key': USER_KEY},
+            'CopySourceIfMatch': etag, 'MetadataDirective': 'REPLACE',
+            'Metadata': {COPY_SOURCE_ETAG_METADATA: etag}, 'ContentType': CONTENT_TYPE,
+        })
+
+    def test_completes_then_copies_to_the_general_key(self):
+        self.expect_complete()
+        self.head(USER_KEY, '"ab-2"')
+        self.not_found(GENERAL_KEY)
+        self.expect_copy('"ab-2"')
+        result = complete_multipart_upload(BUCKET, EMAIL, 'json', 'upload-1', PARTS, self.client)
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(result['status'], 'copied')
+        self.assertEqual(result['etag'], '"ab-2"')
+
+    def test_no_such_upload_still_runs_the_copy(self):
+        # The first completion went through but its response was lost: the retry must still copy
+        self.expect_complete('NoSuchUpload')
+        self.head(USER_KEY, '"ab-2"')
+        self.not_found(GENERAL_KEY)
+        self.expect_copy('"ab-2"')
+        result = complete_multipart_upload(BUCKET, EMAIL, 'json', 'upload-1', PARTS, self.client)
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(result['status'], 'copied')
+
+    def test_retry_after_the_copy_is_a_no_op(self):
+        self.expect_complete('NoSuchUpload')
+        self.head(USER_KEY, '"ab-2"')
+        self.head(GENERAL_KEY, '"ab-2"', {COPY_SOURCE_ETAG_METADATA: '"ab-2"'})
+        result = complete_multipart_upload(BUCKET, EMAIL, 'json', 'upload-1', PARTS, self.client)
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(result['status'], 'already_copied')
+
+    def test_other_errors_are_raised(self):
+        self.expect_complete('InvalidPart')
+        with self.assertRaises(ClientError):
+            complete_multipart_upload(BUCKET, EMAIL, 'json', 'upload-1', PARTS, self.client)
+        self.stubber.assert_no_pending_responses()
+
+    def test_abort(self):
+        self.stubber.add_response('abort_multipart_upload', {},
+                                  {'Bucket': BUCKET, 'Key': USER_KEY, 'UploadId': 'upload-1'})
+        abort_multipart_upload(BUCKET, EMAIL, 'json', 'upload-1', self.client)
+        self.stubber.assert_no_pending_responses()
@@ -1,6 +1,15 @@
 from django.urls import path
-from .views import generate_presigned_url
+from .views import (
+    generate_presigned_url, generate_presigned_urls_batch, upload_complete,
+    multipart_create, multipart_sign_parts, multipart_complete, multipart_abort
+)
 
 urlpatterns = [
     path('generate_presigned_url/<str:email>/<str:file_type>/', generate_presigned_url, name='generate_presigned_url'),
-]
\ No newline at end of file
+    path('generate_presigned_urls/<str:email>/', generate_presigned_urls_batch, name='generate_presigned_urls_batch'),
+    path('upload_complete/<str:email>/<str:file_type>/', upload_complete, name='upload_complete'),
+    path('multipart/create/<str:email>/<str:file_type>/', multipart_create, name='multipart_create'),
+    path('multipart/sign_parts/<str:email>/<str:file_type>/', multipart_sign_parts, name='multipart_sign_parts'),
+    path('multipart/complete/<str:email>/<str:file_type>/', multipart_complete, name='multipart_complete'),
+    path('multipart/abort/<str:email>/<str:file_type>/', multipart_abort, name='multipart_abort'),
+]
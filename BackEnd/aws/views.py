@@ -1,118 +1,209 @@
 from rest_framework.decorators import api_view, parser_classes
-import boto3
 from django.http import JsonResponse
-import os
-import datetime
-import re
-from dotenv import load_dotenv
+from .s3_utils import (
+    sanitize_email, get_bucket_name, presign_file_type, copy_to_general_key, FILE_TYPES,
+    create_multipart_upload, presign_upload_parts, complete_multipart_upload, abort_multipart_upload,
+    object_keys, MULTIPART_MAX_PARTS, profile_picture_variant_keys, schedule_profile_picture_variants
+)
 
-load_dotenv()
+MAX_BATCH_FILE_TYPES = len(FILE_TYPES)
 
-def sanitize_email(email):
+@api_view(['POST'])
+def generate_presigned_url(request, email, file_type):
+    bucket_name = get_bucket_name()
+    if not bucket_name:
+        return JsonResponse({'error': 'S3 bucket name is not configured.'}, status=500)
+
+    # Sanitize email to generate a unique S3 object path
+    sanitized_email = sanitize_email(email)
+    if not sanitized_email:
+        return JsonResponse({'error': 'Invalid email provided.'}, status=400)
+
+    if file_type not in FILE_TYPES:
+        return JsonResponse({'error': 'Invalid file type. Supported types are json, png, jpg, jpeg.'}, status=400)
+
+    # Each item is going to be stored in 2 places in our s3 (user folder + general folder)
+    try:
+        return JsonResponse(presign_file_type(bucket_name, sanitized_email, file_type))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['POST'])
+def generate_presigned_urls_batch(request, email):
     """
-    Sanitize email addresses for S3 key usage:
-    - Replace '@' with '-at-'
-    - Replace '.' with '-'
+    Presign the uploads of several file types in one request.
+
+    Body: {"file_types": ["json", "png"]}
+    Returns: {"files": {"json": {...}, "png": {...}}} where each entry has the same
+    fields as the generate_presigned_url response.
     """
-    return re.sub(r'[@]', '-at-', re.sub(r'[.]', '-', email))
+    bucket_name = get_bucket_name()
+    if not bucket_name:
+        return JsonResponse({'error': 'S3 bucket name is not configured.'}, status=500)
+
+    sanitized_email = sanitize_email(email)
+    if not sanitized_email:
+        return JsonResponse({'error': 'Invalid email provided.'}, status=400)
+
+    file_types = request.data.get('file_types', [])
+    if not file_types or not isinstance(file_types, list) or len(file_types) > MAX_BATCH_FILE_TYPES:
+        return JsonResponse({'error': "Invalid or missing 'file_types' list."}, status=400)
+
+    invalid = [file_type for file_type in file_types if not isinstance(file_type, str) or file_type not in FILE_TYPES]
+    if invalid:
+        return JsonResponse({'error': f"Invalid file type(s) {invalid}. Supported types are json, png, jpg, jpeg."}, status=400)
+
+    try:
+        return JsonResponse({
+            'files': {file_type: presign_file_type(bucket_name, sanitized_email, file_type) for file_type in file_types}
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
 
 @api_view(['POST'])
-def generate_presigned_url(request, email, file_type):
-    print("BUCKETS", os.getenv('AWS_S3_BUCKET_NAME'), os.getenv('AWS_REGION'), os.getenv('AWS_ACCESS_KEY_ID'), os.getenv('AWS_SECRET_ACCESS_KEY'))
-    s3_client = boto3.client(
-        's3',
-        region_name=os.getenv('AWS_REGION'),
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-    )
-
-    bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+def upload_complete(request, email, file_type):
+    """
+    Upload-complete callback: the client uploaded the file once (to its user key),
+    the general copy is then made server side. Safe to retry.
+    Profile pictures also get their resized variants generated.
+    """
+    bucket_name = get_bucket_name()
     if not bucket_name:
         return JsonResponse({'error': 'S3 bucket name is not configured.'}, status=500)
 
-    # Sanitize email to generate a unique S3 object path
     sanitized_email = sanitize_email(email)
     if not sanitized_email:
         return JsonResponse({'error': 'Invalid email provided.'}, status=400)
 
-    if file_type not in ['json', 'png', 'jpg', 'jpeg']:
+    if file_type not in FILE_TYPES:
         return JsonResponse({'error': 'Invalid file type. Supported types are json, png, jpg, jpeg.'}, status=400)
 
-    # Dynamically generate paths ( each item is going to be stored in 2 places in our s3 )
-    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
     try:
-        if file_type == 'json':
-            print("JSONmomoa")
-            # JSON: TikTok data
-            user_object_key = f"Users/{sanitized_email}/TikTokData/tiktok-data.json"
-            general_object_key = f"TikTokData/{sanitized_email}-tiktok-data.json"
-
-            # Generate pre-signed URLs for both locations
-            user_presigned_url = s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': user_object_key,
-                    'ContentType': 'application/json'
-                },
-                ExpiresIn=604800,
-                HttpMethod='PUT'
-            )
-            general_presigned_url = s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': general_object_key,
-                    'ContentType': 'application/json'
-                },
-                ExpiresIn=604800,
-                HttpMethod='PUT'
-            )
-
-            return JsonResponse({
-                'user_presigned_url': user_presigned_url,
-                'general_presigned_url': general_presigned_url,
-                'user_object_key': user_object_key,
-                'general_object_key': general_object_key
-            })
-
-        elif file_type in ['png', 'jpg', 'jpeg']:
-            print("SWERIKRIK")
-            # Image: Profile picture
-            user_object_key = f"Users/{sanitized_email}/profilePics/profile-pic"
-            general_object_key = f"profilePics/{sanitized_email}-profile-pic"
-
-            content_type = 'image/png' if file_type == 'png' else 'image/jpeg'
-
-            # Generate pre-signed URLs for both locations
-            user_presigned_url = s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': user_object_key,
-                    'ContentType': content_type
-                },
-                ExpiresIn=604800,
-                HttpMethod='PUT'
-            )
-            print("USER PRESIGNED URL", user_presigned_url)
-            general_presigned_url = s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': general_object_key,
-                    'ContentType': content_type
-                },
-                ExpiresIn=604800,
-                HttpMethod='PUT'
-            )
-            print("GENERAL PRESIGNED URL", general_presigned_url)
-            return JsonResponse({
-                'user_presigned_url': user_presigned_url,
-                'general_presigned_url': general_presigned_url,
-                'user_object_key': user_object_key,
-                'general_object_key': general_object_key
-            })
+        result = copy_to_general_key(bucket_name, sanitized_email, file_type)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    if result is None:
+        return JsonResponse({'error': 'Uploaded file not found.'}, status=404)
+
+    if file_type != 'json':
+        # Resized WebP/JPEG variants are built in the background under derived keys
+        schedule_profile_picture_variants(bucket_name, sanitized_email)
+        result['variant_keys'] = {
+            f"{size}-{image_format.lower()}": key
+            for (size, image_format), key in profile_picture_variant_keys(sanitized_email).items()
+        }
+
+    return JsonResponse(result)
+
+def _multipart_target(email, file_type):
+    """Validate a multipart request target, returns (bucket_name, sanitized_email, error_response)."""
+    bucket_name = get_bucket_name()
+    if not bucket_name:
+        return None, None, JsonResponse({'error': 'S3 bucket name is not configured.'}, status=500)
+
+    sanitized_email = sanitize_email(email)
+    if not sanitized_email:
+        return None, None, JsonResponse({'error': 'Invalid email provided.'}, status=400)
+
+    if file_type not in FILE_TYPES:
+        return None, None, JsonResponse({'error': 'Invalid file type. Supported types are json, png, jpg, jpeg.'}, status=400)
+
+    return bucket_name, sanitized_email, None
+
+@api_view(['POST'])
+def multipart_create(request, email, file_type):
+    """
+    Start a multipart upload (large TikTok exports).
+
+    Body: {"file_size": <bytes>}
+    Returns the upload_id, the part_size chosen for the file and one presigned PUT URL per part.
+    The client sends the parts concurrently, keeps each part's ETag response header,
+    and retries only the failed parts (see multipart_sign_parts if their URLs expired).
+    """
+    bucket_name, sanitized_email, error = _multipart_target(email, file_type)
+    if error:
+        return error
+
+    file_size = request.data.get('file_size')
+    if not isinstance(file_size, int) or file_size <= 0:
+        return JsonResponse({'error': "Invalid or missing 'file_size'."}, status=400)
+
+    try:
+        return JsonResponse(create_multipart_upload(bucket_name, sanitized_email, file_type, file_size))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['POST'])
+def multipart_sign_parts(request, email, file_type):
+    """
+    Re-sign the URLs of some parts of a multipart upload (retries after expiry).
+
+    Body: {"upload_id": ..., "part_numbers": [1, 4, ...]}
+    """
+    bucket_name, sanitized_email, error = _multipart_target(email, file_type)
+    if error:
+        return error
+
+    upload_id = request.data.get('upload_id')
+    part_numbers = request.data.get('part_numbers', [])
+    if not upload_id or not part_numbers or not isinstance(part_numbers, list) or \
+            not all(isinstance(n, int) and 1 <= n <= MULTIPART_MAX_PARTS for n in part_numbers):
+        return JsonResponse({'error': "Invalid or missing 'upload_id'/'part_numbers'."}, status=400)
+
+    user_object_key, _, _ = object_keys(sanitized_email, file_type)
+    try:
+        return JsonResponse({'parts': presign_upload_parts(bucket_name, user_object_key, upload_id, part_numbers)})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['POST'])
+def multipart_complete(request, email, file_type):
+    """
+    Complete a multipart upload, then copy it to the general key server side. Safe to retry.
+
+    Body: {"upload_id": ..., "parts": [{"part_number": 1, "etag": "..."}, ...]}
+    """
+    bucket_name, sanitized_email, error = _multipart_target(email, file_type)
+    if error:
+        return error
+
+    upload_id = request.data.get('upload_id')
+    parts = request.data.get('parts', [])
+    if not upload_id or not parts or not isinstance(parts, list) or \
+            not all(isinstance(part, dict) and part.get('part_number') and part.get('etag') for part in parts):
+        return JsonResponse({'error': "Invalid or missing 'upload_id'/'parts'."}, status=400)
+
+    try:
+        result = complete_multipart_upload(bucket_name, sanitized_email, file_type, upload_id, parts)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
 
+    if result is None:
+        return JsonResponse({'error': 'Uploaded file not found.'}, status=404)
+
+    return JsonResponse(result)
+
+@api_view(['POST'])
+def multipart_abort(request, email, file_type):
+    """
+    Abort a multipart upload (drops the parts already stored by S3).
+
+    Body: {"upload_id": ...}
+    """
+    bucket_name, sanitized_email, error = _multipart_target(email, file_type)
+    if error:
+        return error
+
+    upload_id = request.data.get('upload_id')
+    if not upload_id:
+        return JsonResponse({'error': "Invalid or missing 'upload_id'."}, status=400)
+
+    try:
+        abort_multipart_upload(bucket_name, sanitized_email, file_type, upload_id)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+    return JsonResponse({'message': 'Multipart upload aborted.'})
@@ -177,7 +177,7 @@ const AddCreatorModal: React.FC<AddCreatorModalProps> = ({
         throw new Error('Failed to generate presigned URLs');
       }
 
-      const { user_presigned_url, general_presigned_url } = s3Response.data;
+      const { user_presigned_url, general_object_url } = s3Response.data;
       console.log('Received presigned URLs');
 
       // Determine the correct content type based on file extension
@@ -218,23 +218,12 @@ const AddCreatorModal: React.FC<AddCreatorModalProps> = ({
         throw new Error(`Failed to upload to user folder: ${userUploadResponse.statusText}`);
       }
 
-      // Upload file to general folder
-      console.log('Uploading to general folder...');
-      const generalUploadResponse = await fetch(general_presigned_url, {
-        method: 'PUT',
-        headers: {
-          'Content-Type': contentType,
-        },
-        body: file
-      });
-      
-      if (!generalUploadResponse.ok) {
-        console.error('General folder upload failed:', generalUploadResponse.status, generalUploadResponse.statusText);
-        throw new Error(`Failed to upload to general folder: ${generalUploadResponse.statusText}`);
-      }
+      // Copy to the general folder server side (no second upload from the device)
+      console.log('Copying to general folder...');
+      await api.post(`/aws/upload_complete/${email}/${fileExtension}/`);
 
-      // Extract the base URL (removing the query parameters)
-      const s3BaseUrl = general_presigned_url.split('?')[0];
+      // Public URL of the general copy
+      const s3BaseUrl = general_object_url;
       console.log('S3 URL for profile picture:', s3BaseUrl);
       
       // Update the form with the S3 URL
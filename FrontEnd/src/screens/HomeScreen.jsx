@@ -424,7 +424,7 @@ const App = ({/*route,*/ navigation }) => {
                     throw new Error('Failed to generate presigned URLs');
                 }
 
-                const { user_presigned_url, general_presigned_url } = s3Response.data;
+                const { user_presigned_url } = s3Response.data;
 
                 // Upload file to user-specific folder
                 const userUploadResponse = await fetch(user_presigned_url, {
@@ -439,18 +439,8 @@ const App = ({/*route,*/ navigation }) => {
                     throw new Error('Failed to upload to user folder');
                 }
 
-                // Upload file to general folder
-                const generalUploadResponse = await fetch(general_presigned_url, {
-                    method: 'PUT',
-                    headers: {
-                        'Content-Type': file.type,
-                    },
-                    body: file
-                });
-
-                if (!generalUploadResponse.ok) {
-                    throw new Error('Failed to upload to general folder');
-                }
+                // Copy to the general folder server side (no second upload from the device)
+                await api.post(`/aws/upload_complete/${encodedEmail}/${file_type}/`);
 
                 Alert.alert('Success', 'File uploaded successfully to S3 and processed!');
             } catch (s3Error) {